@@ -0,0 +1,39 @@
+"""
+Shared fixtures for the orchestration endpoint tests: the Flask JSON and SSE
+endpoints (test_orchestrator.py) and their ASGI versions (test_asgi_app.py)
+run the same request through the same stubs, so a change to the shared
+orchestration contract fails all of them together.
+"""
+
+import json
+
+USER = {'user_id': 7, 'email': 'patient@example.com', 'role': 'Patient'}
+AUTH_HEADERS = {'Authorization': 'Bearer test-token'}
+HEALTH_QUERY = {"query": "How is malaria spread?"}
+HEALTH_PROMPT = "PROMPT: How is malaria spread?"
+HEALTH_INTENT = {'intent': 'health_inquiry', 'collections': ['disease_data'], 'is_crisis': False,
+                 'needs_appointment': True}
+MALARIA_SOURCES = [{'source': 'disease_data/Malaria.txt', 'collection': 'disease_data', 'relevance': 0.9}]
+ANSWER_PIECES = ["Malaria is spread ", "by mosquitoes."]
+FALLBACK_ANSWER = "fallback answer"
+
+
+def health_intent(user_query, has_image=False) -> dict:
+    """Stand-in for the intent classifier: every query is a health inquiry needing an appointment."""
+    return dict(HEALTH_INTENT)
+
+
+def prepared_health_inquiry(user_query, collection_names, intent="health_inquiry", speculation=None):
+    """prepare_health_inquiry past retrieval: a fallback answer, its sources and the prompt."""
+    response = {"agent": "Health Inquiry Agent", "response_type": "informational",
+                "answer": FALLBACK_ANSWER, "sources": list(MALARIA_SOURCES)}
+    return response, f"PROMPT: {user_query}", None
+
+
+def parse_sse(body: str) -> list:
+    """[(event, data), ...] from a text/event-stream body."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
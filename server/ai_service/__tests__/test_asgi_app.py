@@ -0,0 +1,104 @@
+import os
+import threading
+from unittest.mock import patch
+import pytest
+from starlette.testclient import TestClient
+
+# main refuses to start without a token; lazy init keeps models from loading on import
+os.environ.setdefault('AI_SERVICE_AUTH_TOKEN', 'test-secret-token')
+os.environ.setdefault('LAZY_INIT_ENABLED', 'true')
+
+import main
+import asgi_app
+from orchestration_helpers import (
+    USER, AUTH_HEADERS, HEALTH_QUERY, HEALTH_PROMPT, MALARIA_SOURCES, ANSWER_PIECES,
+    health_intent, prepared_health_inquiry, parse_sse
+)
+
+
+@pytest.fixture
+def client():
+    # Used without `with`, so the lifespan (and its warmup) does not run
+    return TestClient(asgi_app.app)
+
+
+@pytest.fixture
+def llm_requests():
+    """Serve the async LLM calls from ANSWER_PIECES, recording the requests sent."""
+    sent = []
+
+    async def generate(llm_request, backend=None):
+        sent.append(llm_request)
+        return "".join(ANSWER_PIECES)
+
+    async def generate_stream(llm_request):
+        sent.append(llm_request)
+        for piece in ANSWER_PIECES:
+            yield piece
+
+    with patch.object(main, "LAZY_INIT_ENABLED", False), \
+            patch.object(main, "embedding_model", object()), \
+            patch.dict(main.collections, {"disease_data": object()}, clear=True), \
+            patch.object(asgi_app, "authenticate_token", return_value=(USER, None, None)), \
+            patch.object(asgi_app, "classify_intent_without_llm", side_effect=health_intent), \
+            patch.object(main, "prepare_health_inquiry", side_effect=prepared_health_inquiry), \
+            patch.object(asgi_app, "log_chat_to_database"), \
+            patch.object(asgi_app, "generate_llm_async", side_effect=generate), \
+            patch.object(asgi_app, "generate_llm_stream_async", side_effect=generate_stream):
+        yield sent
+
+# --- Test Suite ---
+
+def test_readiness_probe_and_agent_gate_during_warmup(client):
+    """
+    While the lazy warmup runs, /v1/health/ready (served by the mounted Flask
+    app) should report not_ready and the async agent endpoints should answer
+    503 with Retry-After; both should open once the service is ready.
+    """
+    with patch.object(main, "LAZY_INIT_ENABLED", True), \
+            patch.object(main, "service_ready", threading.Event()), \
+            patch.object(main, "start_background_warmup") as start_warmup:
+        response = client.get("/v1/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "not_ready"
+
+        response = client.post("/v1/agent/orchestrate", json=HEALTH_QUERY, headers=AUTH_HEADERS)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        assert start_warmup.called
+
+        main.service_ready.set()
+        response = client.get("/v1/health/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+
+def test_orchestrate_and_stream_share_the_flask_pipeline(client, llm_requests):
+    """
+    The async endpoints should answer a health query through the shared
+    orchestration steps, sending main's answer request to the LLM, and the
+    stream should end with the same body the JSON endpoint returns.
+    """
+    expected_request = main.answer_request(HEALTH_PROMPT, "health_inquiry")
+
+    response = client.post("/v1/agent/orchestrate", json=HEALTH_QUERY, headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "".join(ANSWER_PIECES) + main.APPOINTMENT_OFFER
+    assert (body["agent"], body["intent"], body["collections_used"]) == (
+        "Health Inquiry Agent", "health_inquiry", ["disease_data"]
+    )
+    assert body["user"] == USER
+    assert body["sources"] == MALARIA_SOURCES
+    assert llm_requests == [expected_request]
+
+    response = client.post("/v1/agent/orchestrate/stream", json=HEALTH_QUERY, headers=AUTH_HEADERS)
+    events = parse_sse(response.text)
+    assert [event for event, _ in events] == ["metadata", "sources", "token", "token", "token", "done"]
+    assert [data["text"] for event, data in events if event == "token"] == ANSWER_PIECES + [main.APPOINTMENT_OFFER]
+    assert events[-1][1] == body
+    assert llm_requests == [expected_request, expected_request]
+
+    response = client.post("/v1/agent/orchestrate", json={}, headers=AUTH_HEADERS)
+    assert response.status_code == 400
+    assert response.json() == {"error": "Query not provided"}
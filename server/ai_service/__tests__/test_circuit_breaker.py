@@ -0,0 +1,35 @@
+import time
+import pytest
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+# --- Test Suite ---
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    """
+    Once the error rate over the window reaches the threshold the breaker
+    should open and reject calls without running them. After the cool-down a
+    single probe is let through, and its success closes the breaker.
+    """
+    breaker = CircuitBreaker("test", slow_call_seconds=1.0, window=4, min_calls=4,
+                             error_rate=0.5, open_seconds=0.05, half_open_calls=1)
+
+    for ok in (True, False, True, False):
+        try:
+            with breaker.track():
+                if not ok:
+                    raise ConnectionError("backend down")
+        except ConnectionError:
+            pass
+    assert breaker.state == OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        with breaker.track():
+            calls.append("sent")
+    assert calls == []
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record(True, 0.01)
+    assert breaker.state == CLOSED
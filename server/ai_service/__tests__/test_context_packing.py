@@ -0,0 +1,37 @@
+from context_packing import pack_context, estimate_tokens
+
+# --- Test Suite ---
+
+def make_result(document, relevance, embedding=None):
+    return {'document': document, 'metadata': {}, 'collection': 'disease_data',
+            'relevance': relevance, 'distance': 1 - relevance, 'embedding': embedding}
+
+def test_near_duplicates_and_low_relevance_tail_are_dropped():
+    """
+    Chunks nearly identical to one already packed, and chunks after a large
+    relevance drop, should not reach the prompt.
+    """
+    results = [
+        make_result("Psoriasis causes red, scaly patches." * 5, 0.82, [1.0, 0.0, 0.0]),
+        make_result("Psoriasis causes red, scaly patches!" * 5, 0.81, [0.99, 0.05, 0.0]),
+        make_result("Treatment includes topical steroids." * 5, 0.78, [0.0, 1.0, 0.0]),
+        make_result("Diabetes is a metabolic disease." * 5, 0.41, [0.0, 0.0, 1.0])
+    ]
+
+    packed, stats = pack_context(results, token_budget=1000, min_chunks=1)
+
+    assert [r['relevance'] for r in packed] == [0.82, 0.78]
+    assert stats['dropped'] == {'duplicates': 1, 'relevance_gap': 1, 'budget': 0}
+    assert stats['tokens_saved'] == stats['tokens_before'] - stats['tokens_after'] > 0
+
+def test_context_is_trimmed_to_token_budget():
+    """
+    Packing should stop at the token budget but always keep the top chunk.
+    """
+    results = [make_result(f"chunk {i} " + "x" * 400, 0.8 - i * 0.01) for i in range(3)]
+
+    packed, stats = pack_context(results, token_budget=50)
+
+    assert len(packed) == 1
+    assert estimate_tokens(packed[0]['document']) <= 50
+    assert stats['dropped']['budget'] == 2
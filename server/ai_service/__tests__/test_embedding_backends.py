@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+import numpy as np
+from embedding_backends import OnnxEmbeddingBackend, ONNX_PARITY_THRESHOLD, check_parity
+
+PAD_ID = 0
+# Token id -> per-token output of the transformer; padding gets a huge vector
+# so that any leak into the pooled embedding shows up
+TOKEN_OUTPUTS = np.array([
+    [100.0, -100.0, 100.0],
+    [1.0, 0.0, 0.0],
+    [0.0, 2.0, 0.0],
+    [0.0, 0.0, 3.0],
+    [1.0, 1.0, 1.0]
+], dtype=np.float32)
+
+
+class StubTokenizer:
+    """Whitespace tokenizer over TOKEN_OUTPUTS' ids, padding the batch to its longest row."""
+
+    vocabulary = {"fever": 1, "rash": 2, "cough": 3, "fatigue": 4}
+
+    def encode_batch(self, batch):
+        rows = [[self.vocabulary[word] for word in text.split()] for text in batch]
+        length = max(len(row) for row in rows)
+        return [
+            SimpleNamespace(
+                ids=row + [PAD_ID] * (length - len(row)),
+                attention_mask=[1] * len(row) + [0] * (length - len(row)),
+                type_ids=[0] * length
+            )
+            for row in rows
+        ]
+
+
+class StubSession:
+    """InferenceSession returning TOKEN_OUTPUTS rows for the input ids, recording its feeds."""
+
+    def __init__(self):
+        self.feeds = []
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        return [TOKEN_OUTPUTS[feeds["input_ids"]]]
+
+
+class FixedEncoder:
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, sentences):
+        return self.vectors[:len(sentences)].copy()
+
+
+def onnx_backend(input_names=("input_ids", "attention_mask", "token_type_ids")) -> OnnxEmbeddingBackend:
+    """An OnnxEmbeddingBackend on the stubs, skipping the model files and onnxruntime."""
+    backend = OnnxEmbeddingBackend.__new__(OnnxEmbeddingBackend)
+    backend.tokenizer = StubTokenizer()
+    backend.session = StubSession()
+    backend.input_names = set(input_names)
+    return backend
+
+
+def unit(vector) -> list:
+    vector = np.asarray(vector, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+# --- Test Suite ---
+
+def test_mean_pooling_ignores_padding_and_outputs_unit_vectors():
+    """
+    Each row should be the L2-normalized mean of its real tokens' outputs,
+    whatever padding the batch adds; a single string should come back as a
+    1-D vector and an empty batch as no rows.
+    """
+    backend = onnx_backend()
+
+    vectors = backend.encode(["fever", "fever rash cough"])
+    assert vectors.shape == (2, 3)
+    assert np.allclose(vectors[0], unit([1.0, 0.0, 0.0]))
+    assert np.allclose(vectors[1], unit([1 / 3, 2 / 3, 1.0]))
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+    single = backend.encode("fever")
+    assert single.shape == (3,)
+    assert np.allclose(single, vectors[0])
+    assert backend.encode([]).shape[0] == 0
+
+    assert set(backend.session.feeds[0]) == {"input_ids", "attention_mask", "token_type_ids"}
+    text_only = onnx_backend(("input_ids", "attention_mask"))
+    text_only.encode(["fatigue", "fever rash"])
+    assert set(text_only.session.feeds[0]) == {"input_ids", "attention_mask"}
+
+
+def test_check_parity_passes_close_backends_and_fails_below_threshold():
+    """
+    Backends whose vectors differ only in scale or by small noise should
+    pass; one sentence drifting below the threshold should fail the check
+    and be reported as the minimum cosine.
+    """
+    sentences = ["fever", "rash", "cough"]
+    reference = FixedEncoder([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+
+    close = FixedEncoder([[2.0, 0.01, 0.0], [0.0, 0.5, 0.01], [0.01, 0.0, 3.0]])
+    report = check_parity(reference, close, sentences, threshold=0.98)
+    assert report["passed"]
+    assert len(report["cosines"]) == 3 and report["min_cosine"] >= 0.98
+
+    drifted = FixedEncoder([[1.0, 0.0, 0.0], [0.0, 0.8, 0.6], [0.0, 0.0, 1.0]])
+    report = check_parity(reference, drifted, sentences)
+    assert report["threshold"] == ONNX_PARITY_THRESHOLD
+    assert not report["passed"]
+    assert report["min_cosine"] == report["cosines"][1] == 0.8
@@ -0,0 +1,57 @@
+from embedding_cache import QueryEmbeddingCache, PersistentEmbeddingCache, normalize_query
+
+# --- Test Suite ---
+
+def test_normalized_queries_share_an_entry():
+    """
+    Queries differing only in case and whitespace should hit the same entry.
+    """
+    cache = QueryEmbeddingCache(max_size=4)
+    cache.put("What are symptoms of diabetes", [0.1, 0.2])
+
+    assert normalize_query("  what ARE symptoms\tof diabetes ") == "what are symptoms of diabetes"
+    assert cache.get("what are  symptoms of DIABETES") == [0.1, 0.2]
+    assert cache.get("what are symptoms of asthma") is None
+
+def test_least_recently_used_entry_is_evicted():
+    """
+    Once full, the cache should evict the entry that was used least recently.
+    """
+    cache = QueryEmbeddingCache(max_size=2)
+
+    assert cache.put("fever", [1.0]) is False
+    assert cache.put("cough", [2.0]) is False
+
+    # Touch 'fever' so 'cough' becomes the LRU entry
+    cache.get("fever")
+
+    assert cache.put("headache", [3.0]) is True
+    assert len(cache) == 2
+    assert cache.get("cough") is None
+    assert cache.get("fever") == [1.0]
+    assert cache.get("headache") == [3.0]
+
+def test_persistent_cache_survives_reopen_and_is_scoped_by_model(tmp_path):
+    """
+    Vectors written by one cache instance should be readable by a new one,
+    but only for the same model id.
+    """
+    path = str(tmp_path / "embeddings.sqlite3")
+    PersistentEmbeddingCache(path).put("minilm:torch", "What is Dolo 650", [0.5, 0.25])
+
+    reopened = PersistentEmbeddingCache(path)
+
+    assert reopened.get("minilm:torch", "what is  dolo 650") == [0.5, 0.25]
+    assert reopened.get("minilm:onnx-int8", "what is dolo 650") is None
+
+def test_persistent_cache_evicts_least_recently_used(tmp_path):
+    """
+    Past max_entries, the rows used least recently should be deleted.
+    """
+    cache = PersistentEmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=2)
+    cache.put_many("m", ["fever", "cough"], [[1.0], [2.0]])
+    cache.get_many("m", ["fever"])
+
+    assert cache.put("m", "headache", [3.0]) == 1
+    assert len(cache) == 2
+    assert cache.get_many("m", ["fever", "cough", "headache"])[1] is None
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from embedding_dispatcher import EmbeddingBatcher
+
+
+class RecordingModel:
+    """Encodes each text as [len(text), first char code] and records every batch."""
+
+    name = "recording"
+
+    def __init__(self, fail_on: str = None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def encode(self, sentences):
+        with self.lock:
+            self.batches.append(list(sentences))
+        if self.fail_on in sentences:
+            raise RuntimeError("model crashed")
+        return np.array([[len(text), ord(text[0])] for text in sentences], dtype=np.float32)
+
+# --- Test Suite ---
+
+def test_concurrent_encodes_are_batched_and_results_routed_to_callers():
+    """
+    Concurrent single-query encodes should be grouped into batches no larger
+    than max_batch_size, and every caller should get the vector for its own
+    text. Batched calls bypass the queue.
+    """
+    model = RecordingModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=50)
+    texts = [chr(ord("a") + i) * (i + 1) for i in range(12)]
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        vectors = list(pool.map(batcher.encode, texts))
+
+    for text, vector in zip(texts, vectors):
+        assert vector.tolist() == [len(text), ord(text[0])]
+    assert sorted(text for batch in model.batches for text in batch) == sorted(texts)
+    assert all(len(batch) <= 4 for batch in model.batches)
+    assert len(model.batches) < len(texts)
+
+    model.batches.clear()
+    assert batcher.encode(["x", "yy"]).tolist() == [[1, ord("x")], [2, ord("y")]]
+    assert model.batches == [["x", "yy"]]
+
+
+def test_model_failure_is_raised_in_every_caller_of_the_batch():
+    """
+    When the batched encode fails, each request in that batch should see
+    the exception, and the batcher should keep serving later requests.
+    """
+    model = RecordingModel(fail_on="boom")
+    batcher = EmbeddingBatcher(model, max_batch_size=8, max_wait_ms=200)
+    start = threading.Barrier(3)
+
+    def encode(text):
+        start.wait()
+        return batcher.encode(text)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(encode, text) for text in ("boom", "fever", "cough")]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    assert sorted(model.batches[0]) == ["boom", "cough", "fever"]
+    assert batcher.encode("rash").tolist() == [4, ord("r")]
@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+from embedding_dispatcher import EmbeddingBatcher
+from embedding_server import EmbeddingServer, EmbeddingServerClient
+
+
+class FakeModel:
+    """Encodes each text as sign * [len(text), number of words]."""
+
+    def __init__(self, sign: float = 1.0):
+        self.sign = sign
+        self.calls = 0
+
+    def encode(self, sentences):
+        self.calls += 1
+        texts = [sentences] if isinstance(sentences, str) else sentences
+        vectors = self.sign * np.array([[len(text), len(text.split())] for text in texts], dtype=np.float32)
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+
+def serve(socket_path: str):
+    EmbeddingServer(socket_path, EmbeddingBatcher(FakeModel(), max_batch_size=8, max_wait_ms=5)).serve_forever()
+
+
+def start_sidecar(socket_path: str):
+    """Run the sidecar in its own process, as in production, so it can be killed."""
+    process = multiprocessing.get_context("fork").Process(target=serve, args=(socket_path,), daemon=True)
+    process.start()
+    deadline = time.time() + 5
+    while not os.path.exists(socket_path) and time.time() < deadline:
+        time.sleep(0.01)
+    return process
+
+
+def stop_sidecar(process, socket_path: str):
+    process.kill()
+    process.join()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+# --- Test Suite ---
+
+def test_client_round_trip_and_local_fallback(tmp_path):
+    """
+    The client should get the sidecar's vectors for single and batched
+    encodes. Once the sidecar dies it should use the in-process model
+    (negated vectors here), and go back to the sidecar when the retry
+    interval has passed.
+    """
+    socket_path = str(tmp_path / "embedding.sock")
+    client = EmbeddingServerClient(socket_path, timeout_seconds=2, retry_seconds=0.3)
+    client.fallback_model = FakeModel(sign=-1.0)
+
+    sidecar = start_sidecar(socket_path)
+    try:
+        assert client.encode("chest pain").tolist() == [10, 2]
+        assert client.encode(["fever", "dry cough"]).tolist() == [[5, 1], [9, 2]]
+    finally:
+        stop_sidecar(sidecar, socket_path)
+
+    assert client.encode("chest pain").tolist() == [-10, -2]
+    assert client.encode(["rash"]).tolist() == [[-4, -1]]
+    assert client.fallback_model.calls == 2
+
+    sidecar = start_sidecar(socket_path)
+    try:
+        assert client.encode("headache").tolist() == [-8, -1]  # still inside the retry interval
+        time.sleep(0.35)
+        assert client.encode("headache").tolist() == [8, 1]
+    finally:
+        stop_sidecar(sidecar, socket_path)
@@ -0,0 +1,105 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+import http_client
+from http_client import PooledHTTPAdapter, get_session, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 handler that records which client connection served each request."""
+
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def do_GET(self):
+        KeepAliveHandler.client_ports.append(self.client_address[1])
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    KeepAliveHandler.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def pooled_session() -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", PooledHTTPAdapter(pool_connections=1, pool_maxsize=2))
+    return session
+
+# --- Test Suite ---
+
+def test_session_is_shared_per_process_and_recreated_after_fork():
+    """
+    get_session should hand out one session per process, with the pooled
+    adapter mounted, and build a new one once os.getpid() changes.
+    """
+    with patch.object(http_client, "_session", None), patch.object(http_client, "_session_pid", None):
+        with patch.object(http_client.os, "getpid", return_value=1000):
+            parent_session = get_session()
+            assert get_session() is parent_session
+            assert isinstance(parent_session.get_adapter("http://localhost"), PooledHTTPAdapter)
+
+        with patch.object(http_client.os, "getpid", return_value=1001):
+            child_session = get_session()
+            assert child_session is not parent_session
+            assert get_session() is child_session
+
+
+def test_default_timeout_only_when_none_given_and_active_count_recovers():
+    """
+    Requests sent without a timeout should get (HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT) and explicit timeouts should be kept. The in-flight
+    count should go back to 0 when the request raises.
+    """
+    session = pooled_session()
+    adapter = session.get_adapter("http://localhost")
+    timeouts = []
+
+    def refuse(request, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        raise requests.ConnectionError("connection refused")
+
+    with patch.object(HTTPAdapter, "send", side_effect=refuse), \
+            patch.object(http_client, "log_http_pool_active") as log_active:
+        for timeout in (None, (1, 2), 5):
+            with pytest.raises(requests.ConnectionError):
+                session.get("http://localhost:9/v1/health", timeout=timeout)
+
+    assert timeouts == [(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), (1, 2), 5]
+    assert adapter.active["localhost:9"] == 0
+    assert [call.args for call in log_active.call_args_list] == [("localhost:9", 1), ("localhost:9", 0)] * 3
+
+
+def test_keep_alive_connection_is_reused_and_checkouts_reported(local_server):
+    """
+    Sequential requests to one host should reuse the same keep-alive
+    connection, and each pool checkout should report its wait time and the
+    idle connections available: none for the first request, one after.
+    """
+    session = pooled_session()
+
+    with patch.object(http_client, "log_http_pool_checkout") as log_checkout:
+        for _ in range(3):
+            assert session.get(f"{local_server}/v1/health").text == "ok"
+
+    assert len(set(KeepAliveHandler.client_ports)) == 1
+    host = local_server.split("//")[1]
+    assert [call.args[0] for call in log_checkout.call_args_list] == [host] * 3
+    assert [call.args[2] for call in log_checkout.call_args_list] == [0, 1, 1]
+    assert all(call.args[1] >= 0 for call in log_checkout.call_args_list)
@@ -0,0 +1,31 @@
+import numpy as np
+from intent_classifier import IntentClassifier, INTENT_CLASSIFIER_THRESHOLD
+
+# --- Test Suite ---
+
+def test_nearest_centroid_maps_labels_to_intent_data(tmp_path):
+    """
+    A query close to one label's exemplars should be classified confidently
+    and map to that label's intent data; a query between two labels should
+    fall below the threshold so the LLM decides. The artifact should survive
+    a save/load round trip.
+    """
+    exemplars = {
+        "medicine_inquiry": {"collections": ["medicines"]},
+        "care_coordination": {"collections": [], "needs_appointment": True}
+    }
+    embeddings_by_label = {
+        "medicine_inquiry": np.array([[1.0, 0.1, 0.0], [1.0, -0.1, 0.0]]),
+        "care_coordination": np.array([[0.0, 0.1, 1.0], [0.0, -0.1, 1.0]])
+    }
+    path = str(tmp_path / "intent_classifier.npz")
+    IntentClassifier.build(exemplars, embeddings_by_label, "test-model").save(path)
+    classifier = IntentClassifier.load(path)
+
+    label, confidence = classifier.classify([0.9, 0.0, 0.1])
+    assert label == "medicine_inquiry" and confidence >= INTENT_CLASSIFIER_THRESHOLD
+    assert classifier.outputs["care_coordination"]["needs_appointment"] is True
+    assert classifier.model_id == "test-model"
+
+    _, confidence = classifier.classify([1.0, 0.0, 1.0])
+    assert confidence < INTENT_CLASSIFIER_THRESHOLD
@@ -0,0 +1,33 @@
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+# --- Test Suite ---
+
+def test_exact_drug_and_dosage_terms_rank_first(tmp_path):
+    """
+    BM25 should rank chunks containing the exact drug name and dosage first,
+    honour the subset filter, and survive a save/load round trip.
+    """
+    index = BM25Index.build(
+        ids=["dolo", "azee", "diabetes", "fever"],
+        documents=[
+            "Dolo 650 tablet contains paracetamol 650mg",
+            "Azee 500 tablet contains azithromycin 500mg",
+            "Common symptoms of diabetes include thirst",
+            "Paracetamol is used for fever"
+        ],
+        subsets=["medicines", "medicines", "disease_data", "disease_data"]
+    )
+    index.save(str(tmp_path))
+    index = BM25Index.load(str(tmp_path))
+
+    assert [chunk_id for chunk_id, _ in index.search("paracetamol 650mg", 3)] == ["dolo", "fever"]
+    assert [chunk_id for chunk_id, _ in index.search("paracetamol", 3, subsets=["disease_data"])] == ["fever"]
+    assert index.search("unrelated words", 3) == []
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """
+    A chunk ranked by both lists should outrank chunks found by only one.
+    """
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60)
+
+    assert [chunk_id for chunk_id, _ in fused] == ["b", "a", "c"]
@@ -0,0 +1,152 @@
+import os
+import time
+from unittest.mock import patch
+import pytest
+
+# main refuses to start without a token; lazy init keeps models from loading on import
+os.environ.setdefault('AI_SERVICE_AUTH_TOKEN', 'test-secret-token')
+os.environ.setdefault('LAZY_INIT_ENABLED', 'true')
+
+import main
+from llm_cache import LLMCache
+
+INTENT_REPLY = '{"intent": "health_inquiry", "collections": ["disease_data"], "needs_appointment": false}'
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the two Redis calls the cache makes."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+class BrokenRedis:
+    def get(self, key):
+        raise ConnectionError("redis down")
+
+    def set(self, key, value, ex=None):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture
+def fresh_llm_cache():
+    """An L1-only cache on main, primary backend openai_compat, with every backend call counted."""
+    requests = []
+
+    def generate_llm(llm_request, backend=None):
+        requests.append(llm_request)
+        return f"  reply {len(requests)}  "
+
+    with patch.object(main, "llm_cache", LLMCache(ttl_seconds=60, max_entries=10)), \
+            patch.object(main, "use_gemini", False), \
+            patch.object(main, "single_flight", None), \
+            patch.object(main, "generate_llm", side_effect=generate_llm):
+        yield main.llm_cache, requests
+
+# --- Test Suite ---
+
+def test_key_separates_backend_model_prompt_and_input_until_ttl_or_eviction():
+    """
+    An output should only be served for the same backend, model, system
+    prompt and (stripped) user input; it should expire after the TTL, and
+    the least recently used entry should go once max_entries is exceeded.
+    """
+    cache = LLMCache(ttl_seconds=0.2, max_entries=2)
+    cache.set("gemini", "flash", "Classify intent.", "fever and rash", "health_inquiry")
+
+    assert cache.get("gemini", "flash", "Classify intent.", "  fever and rash ") == ("health_inquiry", "l1")
+    assert cache.get("openai_compat", "flash", "Classify intent.", "fever and rash") == (None, None)
+    assert cache.get("gemini", "qwen3", "Classify intent.", "fever and rash") == (None, None)
+    assert cache.get("gemini", "flash", "Classify intent v2.", "fever and rash") == (None, None)
+    assert cache.get("gemini", "flash", "Classify intent.", "fever and cough") == (None, None)
+
+    time.sleep(0.25)
+    assert cache.get("gemini", "flash", "Classify intent.", "fever and rash") == (None, None)
+
+    cache.ttl_seconds = 60
+    cache.set("gemini", "flash", "", "first", "1")
+    cache.set("gemini", "flash", "", "second", "2")
+    cache.get("gemini", "flash", "", "first")  # first is now most recent
+    cache.set("gemini", "flash", "", "third", "3")
+    assert cache.get("gemini", "flash", "", "first") == ("1", "l1")
+    assert cache.get("gemini", "flash", "", "second") == (None, None)
+    assert len(cache.entries) == 2
+
+
+def test_l2_hit_is_promoted_and_redis_failure_degrades_to_l1():
+    """
+    An output cached by another worker should be served from Redis once and
+    then from L1; with Redis failing, reads and writes should still work
+    from L1.
+    """
+    redis_client = FakeRedis()
+    writer, reader = LLMCache(), LLMCache()
+    writer.redis_client = reader.redis_client = redis_client
+
+    writer.set("gemini", "flash", "Classify intent.", "fever", "health_inquiry")
+    assert reader.get("gemini", "flash", "Classify intent.", "fever") == ("health_inquiry", "l2")
+    redis_client.values.clear()
+    assert reader.get("gemini", "flash", "Classify intent.", "fever") == ("health_inquiry", "l1")
+
+    cache = LLMCache()
+    cache.redis_client = BrokenRedis()
+    assert cache.get("gemini", "flash", "Classify intent.", "fever") == (None, None)
+    cache.set("gemini", "flash", "Classify intent.", "fever", "health_inquiry")
+    assert cache.get("gemini", "flash", "Classify intent.", "fever") == ("health_inquiry", "l1")
+
+
+def test_repeated_deterministic_calls_skip_the_backend(fresh_llm_cache):
+    """
+    A second identical call_model or get_specialization call should be
+    answered from the cache without reaching generate_llm.
+    """
+    cache, requests = fresh_llm_cache
+
+    assert main.call_model("Classify intent.", "fever and rash") == "reply 1"
+    assert main.call_model("Classify intent.", "fever and rash") == "reply 1"
+    assert main.get_specialization("Patient has a rash") == "reply 2"
+    assert main.get_specialization("Patient has a rash") == "reply 2"
+    assert main.call_model("Classify intent.", "fever and cough") == "reply 3"
+
+    assert [request["messages"][-1]["content"] for request in requests] == [
+        "fever and rash", "Patient has a rash", "fever and cough"
+    ]
+
+
+def test_hedged_win_is_stored_under_the_backend_that_produced_it(fresh_llm_cache):
+    """
+    When the hedge to the other backend wins, its output should be cached
+    for that backend and model only, not for the primary.
+    """
+    cache, _ = fresh_llm_cache
+
+    with patch.object(main, "route_llm_call", return_value=("health_inquiry", "gemini")):
+        main.call_model("Classify intent.", "fever and rash")
+
+    assert cache.get("gemini", main.GEMINI_MODEL, "Classify intent.", "fever and rash") == ("health_inquiry", "l1")
+    assert main.lookup_llm_cache("intent", "Classify intent.", "fever and rash") is None
+
+
+def test_intent_reply_is_cached_only_once_it_parses(fresh_llm_cache):
+    """
+    An intent reply that parse_intent_response rejects should fall back to
+    default_intent without being cached, so the next request asks the LLM
+    again; a reply that parses should be cached.
+    """
+    cache, requests = fresh_llm_cache
+    replies = iter(["Sorry, I cannot help with that.", INTENT_REPLY])
+
+    with patch.dict(main.collections, {"disease_data": object(), "medicines": object()}, clear=True), \
+            patch.object(main, "classify_intent_without_llm", return_value=None), \
+            patch.object(main, "route_llm_call", side_effect=lambda call_site, generate, request: (next(replies), "openai_compat")):
+        assert main.determine_intent("fever and rash") == main.default_intent()
+        assert not cache.entries
+
+        assert main.determine_intent("fever and rash")["collections"] == ["disease_data"]
+        assert main.determine_intent("fever and rash")["intent"] == "health_inquiry"  # from the cache
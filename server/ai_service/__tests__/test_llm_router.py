@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+import pytest
+import circuit_breaker
+from circuit_breaker import CircuitBreaker
+from llm_router import LLMRouter
+from monitoring import metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    """Fresh breakers per test so failures here never open the shared ones."""
+    with patch.dict(circuit_breaker.breakers, {
+        name: CircuitBreaker(name, slow_call_seconds=30) for name in ("gemini", "openai_compat")
+    }):
+        yield
+
+
+def fake_backends(delays: dict, failures: tuple = ()):
+    """fn(backend) that takes `delays[backend]` seconds and raises for backends in `failures`."""
+    def call(backend):
+        time.sleep(delays.get(backend, 0))
+        if backend in failures:
+            raise ConnectionError(f"{backend} down")
+        return f"answer from {backend}"
+    return call
+
+
+def hedging_router(**kwargs):
+    return LLMRouter(hedging_enabled=True, min_delay=0.01, default_delay=0.05, min_samples=5, **kwargs)
+
+# --- Test Suite ---
+
+def test_slow_primary_is_hedged_and_failed_primary_fails_over():
+    """
+    A primary slower than the hedge delay should be raced against the other
+    backend and lose; a primary that errors should fail over; when both
+    backends fail the error should reach the caller.
+    """
+    router = hedging_router()
+
+    result, backend = router.call("answer", "gemini", fake_backends({"gemini": 0.5}))
+    assert (result, backend) == ("answer from openai_compat", "openai_compat")
+
+    result, backend = router.call("answer", "gemini", fake_backends({}, failures=("gemini",)))
+    assert (result, backend) == ("answer from openai_compat", "openai_compat")
+
+    with pytest.raises(ConnectionError):
+        router.call("answer", "gemini", fake_backends({}, failures=("gemini", "openai_compat")))
+
+    async def slow_primary_async():
+        async def call(backend):
+            await asyncio.sleep(0.5 if backend == "gemini" else 0)
+            return f"answer from {backend}"
+        return await router.call_async("answer", "gemini", call)
+
+    assert asyncio.run(slow_primary_async()) == ("answer from openai_compat", "openai_compat")
+
+
+def test_hedge_delay_tracks_p95_and_full_pool_skips_hedging():
+    """
+    The hedge delay should follow the primary's recent p95 once enough
+    samples exist. Losing calls still running in the background take up
+    hedge workers; once the pool is full, calls go straight to the primary.
+    """
+    router = hedging_router(max_workers=2)
+    assert router.hedge_delay("gemini", "intent") == 0.05
+    for duration in (0.1, 0.2, 0.3, 0.4, 2.0):
+        router.latencies[("gemini", "intent")].append(duration)
+    assert router.hedge_delay("gemini", "intent") == 0.4
+
+    release = threading.Event()
+    saturated_before = metrics.llm_hedge_events['answer']['saturated'] if metrics else 0
+
+    def stuck_primary(backend):
+        if backend == "gemini":
+            release.wait()
+        return f"answer from {backend}"
+
+    # The hedge wins; the losing primary keeps one worker busy
+    assert router.call("answer", "gemini", stuck_primary)[1] == "openai_compat"
+    # Another stuck primary fills the pool, so it is not hedged
+    caller = threading.Thread(target=router.call, args=("answer", "gemini", stuck_primary))
+    caller.start()
+    time.sleep(0.1)
+    assert router.in_flight == 2
+    assert router.call("answer", "openai_compat", fake_backends({})) == ("answer from openai_compat", "openai_compat")
+    if metrics is not None:
+        assert metrics.llm_hedge_events['answer']['saturated'] - saturated_before == 2
+
+    release.set()
+    caller.join(timeout=1)
+    time.sleep(0.05)
+    assert router.in_flight == 0
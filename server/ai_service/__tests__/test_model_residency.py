@@ -0,0 +1,48 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from model_residency import ModelResidency
+from monitoring import metrics
+
+# --- Test Suite ---
+
+def test_prewarm_sends_per_model_keep_alive_and_cold_loads_are_counted():
+    """
+    Pre-warming should load every model with its own keep_alive (numeric
+    values sent as seconds), and only loads above the threshold reported by
+    later requests should count as cold starts.
+    """
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            requests_seen.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            body = json.dumps({'done': True, 'load_duration': 2_000_000_000}).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        residency = ModelResidency(f"http://127.0.0.1:{server.server_port}", keep_alive="30m",
+                                   model_keep_alive={'vision:3b': '-1'}, cold_load_threshold_ms=500)
+        residency.prewarm(['text:0.6b', 'vision:3b'])
+    finally:
+        server.shutdown()
+
+    assert requests_seen == [
+        {'model': 'text:0.6b', 'keep_alive': '30m'},
+        {'model': 'vision:3b', 'keep_alive': -1}
+    ]
+
+    residency.observe('vision:3b', {'load_duration': 20_000_000})  # warm
+    residency.observe('vision:3b', {'load_duration': 3_000_000_000})  # evicted and reloaded
+    if metrics is not None:
+        stats = metrics.get_metrics_summary()['model_residency']['vision:3b']
+        assert stats['prewarms'] == 1 and stats['cold_starts'] == 1
+        assert stats['cold_start_rate'] == 50.0
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from numpy_index import NumpyCollection, export_numpy_index
+
+
+class FakeChromaCollection:
+    """Just enough of a Chroma collection for export_numpy_index."""
+
+    def __init__(self, name: str, embeddings: np.ndarray, labels: list):
+        self.name = name
+        self.metadata = {}
+        self.embeddings = embeddings
+        self.labels = labels
+
+    def get(self, include: list) -> dict:
+        return {
+            "ids": [f"doc-{i}" for i in range(len(self.embeddings))],
+            "embeddings": self.embeddings.tolist(),
+            "documents": [f"document {i}" for i in range(len(self.embeddings))],
+            "metadatas": [{"collection": label, "source": f"{label}/{i}.txt"} for i, label in enumerate(self.labels)]
+        }
+
+
+@pytest.fixture
+def index(tmp_path):
+    """
+    200 random vectors in two subsets, plus the query whose five nearest
+    rows (10-14, all in subset 'a') are near-copies of it. Rows 20-22 in
+    subset 'b' are looser copies, so they lead once 'a' is filtered out.
+    """
+    rng = np.random.default_rng(7)
+    embeddings = rng.normal(size=(200, 32)).astype(np.float32)
+    query = rng.normal(size=32).astype(np.float32)
+    embeddings[10:15] = query + rng.normal(scale=0.05, size=(5, 32))
+    embeddings[20:23] = query + rng.normal(scale=0.4, size=(3, 32))
+    labels = ["a" if i % 3 else "b" for i in range(200)]
+    labels[10:15] = ["a"] * 5
+    labels[20:23] = ["b"] * 3
+    index_dir = export_numpy_index(FakeChromaCollection("clinico_test", embeddings, labels), str(tmp_path))
+    return index_dir, embeddings, labels, query
+
+
+def brute_force(embeddings: np.ndarray, query: np.ndarray, n_results: int, allowed=None) -> tuple:
+    """Reference top-k as (ids, cosine distances)."""
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = normalized @ (query / np.linalg.norm(query))
+    rows = [i for i in np.argsort(-similarities) if allowed is None or allowed[i]][:n_results]
+    return [f"doc-{i}" for i in rows], [1.0 - similarities[i] for i in rows]
+
+# --- Test Suite ---
+
+def test_exact_search_matches_brute_force_with_and_without_filter(index):
+    """
+    Exact search over the memory-mapped matrix should return the same rows
+    and cosine distances as a brute-force search, and a `collection` filter
+    should exclude rows outside the subset, including the overall top hit.
+    """
+    index_dir, embeddings, labels, query = index
+    collection = NumpyCollection(index_dir, quantization="none")
+
+    result = collection.query(query_embeddings=[query.tolist()], n_results=5)
+    expected_ids, expected_distances = brute_force(embeddings, query, 5)
+    assert result["ids"][0] == expected_ids
+    assert np.allclose(result["distances"][0], expected_distances, atol=1e-5)
+    assert result["documents"][0][0] == f"document {expected_ids[0].split('-')[1]}"
+
+    result = collection.query(query_embeddings=[query.tolist()], n_results=5, where={"collection": "b"})
+    expected_ids, expected_distances = brute_force(embeddings, query, 5, [label == "b" for label in labels])
+    assert result["ids"][0] == expected_ids
+    assert np.allclose(result["distances"][0], expected_distances, atol=1e-5)
+    assert all(metadata["collection"] == "b" for metadata in result["metadatas"][0])
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantized_search_rescores_to_exact_results(index, quantization):
+    """
+    The first pass over int8 or binary codes only has to shortlist the true
+    neighbours; after full-precision rescoring the rows and distances should
+    match brute force, with and without a filter that excludes the top hits.
+    """
+    index_dir, embeddings, labels, query = index
+    collection = NumpyCollection(index_dir, quantization=quantization, rescore_factor=4)
+    assert collection.quantization == quantization
+
+    result = collection.query(query_embeddings=[query.tolist()], n_results=5)
+    expected_ids, expected_distances = brute_force(embeddings, query, 5)
+    assert result["ids"][0] == expected_ids
+    assert np.allclose(result["distances"][0], expected_distances, atol=1e-5)
+
+    # The near-copies in 'a' must not leak through the shortlist
+    result = collection.query(query_embeddings=[query.tolist()], n_results=3, where={"collection": "b"})
+    expected_ids, expected_distances = brute_force(embeddings, query, 3, [label == "b" for label in labels])
+    assert sorted(expected_ids) == ["doc-20", "doc-21", "doc-22"]
+    assert result["ids"][0] == expected_ids
+    assert np.allclose(result["distances"][0], expected_distances, atol=1e-5)
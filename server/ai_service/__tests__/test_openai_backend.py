@@ -0,0 +1,60 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from openai_backend import OpenAICompatibleBackend
+
+# --- Test Suite ---
+
+def test_backend_applies_agent_settings_and_caps_in_flight_requests():
+    """
+    Each request should carry the model and max_tokens configured for its
+    agent plus the API key, and no more than `max_concurrency` requests
+    should reach the server at once however many callers there are.
+    """
+    payloads = []
+    state = {'in_flight': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            with lock:
+                payloads.append((payload, self.headers.get('Authorization')))
+                state['in_flight'] += 1
+                state['peak'] = max(state['peak'], state['in_flight'])
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+
+            body = json.dumps({'choices': [{'message': {'content': payload['model']}}]}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        backend = OpenAICompatibleBackend(
+            f"http://127.0.0.1:{server.server_port}/v1", "small-model", api_key="secret",
+            max_concurrency=2, agent_models={'health_inquiry': 'large-model'},
+            agent_max_tokens={'intent': '64'}
+        )
+        messages = [{'role': 'user', 'content': 'hello'}]
+
+        assert backend.chat(messages, 0.0, 'health_inquiry') == 'large-model'
+        assert backend.chat(messages, 0.0, 'intent') == 'small-model'
+        assert payloads[1][0]['max_tokens'] == 64 and 'max_tokens' not in payloads[0][0]
+        assert payloads[0][1] == 'Bearer secret'
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: backend.chat(messages, 0.0), range(8)))
+        assert state['peak'] <= 2
+    finally:
+        server.shutdown()
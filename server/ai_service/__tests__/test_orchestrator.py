@@ -0,0 +1,305 @@
+import json
+import os
+import time
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pytest
+
+# main refuses to start without a token; lazy init keeps models from loading on import
+os.environ.setdefault('AI_SERVICE_AUTH_TOKEN', 'test-secret-token')
+os.environ.setdefault('LAZY_INIT_ENABLED', 'true')
+
+import main
+from intent_classifier import IntentClassifier, INTENT_EXEMPLARS_FILE
+from orchestration_helpers import (
+    USER, AUTH_HEADERS, HEALTH_QUERY, HEALTH_PROMPT, MALARIA_SOURCES, ANSWER_PIECES, FALLBACK_ANSWER,
+    health_intent, prepared_health_inquiry, parse_sse
+)
+
+# ingest.py creates one collection per knowledge base subdirectory
+KNOWLEDGE_BASE_COLLECTIONS = sorted(os.listdir(os.path.join(os.path.dirname(main.__file__), "knowledge_base")))
+
+
+@pytest.fixture
+def loaded_collections():
+    """Stand-in collections under the names ingest.py gives the real ones."""
+    with patch.dict(main.collections, {name: object() for name in KNOWLEDGE_BASE_COLLECTIONS}, clear=True):
+        yield main.collections
+
+class StubCollection:
+    """Chroma-shaped collection answering after `delay` seconds with fixed distances."""
+
+    def __init__(self, name: str, distances: list, delay: float = 0.0):
+        self.name = f"clinico_{name}"
+        self.subset = name
+        self.distances = distances
+        self.delay = delay
+
+    def query(self, query_embeddings, n_results, include, where=None):
+        time.sleep(self.delay)
+        rows = range(min(n_results, len(self.distances)))
+        return {
+            'ids': [[f"{self.subset}-{i}" for i in rows]],
+            'documents': [[f"{self.subset} document {i}" for i in rows]],
+            'metadatas': [[{'source': f"{self.subset}/{i}.txt"} for i in rows]],
+            'distances': [[self.distances[i] for i in rows]]
+        }
+
+class StubUnifiedCollection:
+    """Chroma-shaped unified collection over (subset, distance) rows, recording each query's filter."""
+
+    name = "clinico_unified"
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.queries = []
+
+    def matching(self, where: dict) -> list:
+        subsets = where["collection"]
+        subsets = subsets["$in"] if isinstance(subsets, dict) else [subsets]
+        return [i for i, (subset, _) in enumerate(self.rows) if subset in subsets]
+
+    def get(self, where, include):
+        return {'ids': [f"unified-{i}" for i in self.matching(where)]}
+
+    def query(self, query_embeddings, n_results, include, where):
+        self.queries.append({'where': where, 'n_results': n_results})
+        matches = sorted(self.matching(where), key=lambda i: self.rows[i][1])[:n_results]
+        return {
+            'ids': [[f"unified-{i}" for i in matches]],
+            'documents': [[f"unified document {i}" for i in matches]],
+            'metadatas': [[{'source': f"{self.rows[i][0]}/{i}.txt", 'collection': self.rows[i][0]} for i in matches]],
+            'distances': [[self.rows[i][1] for i in matches]]
+        }
+
+@pytest.fixture
+def agent_client(loaded_collections):
+    """Flask test client past the startup gate and auth, with chat logging captured."""
+    with patch.object(main, "LAZY_INIT_ENABLED", False), \
+            patch.object(main, "embedding_model", object()), \
+            patch.object(main, "authenticate_token", return_value=(USER, None, None)), \
+            patch.object(main, "determine_intent", side_effect=health_intent), \
+            patch.object(main, "prepare_health_inquiry", side_effect=prepared_health_inquiry), \
+            patch.object(main, "log_chat_to_database") as chat_log:
+        yield main.app.test_client(), chat_log
+
+# --- Test Suite ---
+
+def test_classifier_routes_every_label_to_real_collections(loaded_collections):
+    """
+    Every exemplar label should resolve through classify_intent_locally and
+    build_intent_data to exactly the collections it names, all of which
+    exist, rather than to build_intent_data's catch-all fallback. The LLM
+    intent prompt should offer the same collection names.
+    """
+    with open(INTENT_EXEMPLARS_FILE) as f:
+        exemplars = json.load(f)["labels"]
+    labels = sorted(exemplars)
+    one_hot = np.eye(len(labels))
+    classifier = IntentClassifier.build(
+        exemplars, {label: one_hot[[i]] for i, label in enumerate(labels)}, "test-model"
+    )
+
+    with patch.object(main, "intent_classifier", classifier):
+        for i, label in enumerate(labels):
+            with patch.object(main, "embed_query", return_value=one_hot[i].tolist()):
+                intent_data = main.classify_intent_locally(exemplars[label]["examples"][0])
+
+            assert intent_data["intent"] == exemplars[label].get("intent", label)
+            if intent_data["intent"] in ("care_coordination", "unclear"):
+                continue
+            assert intent_data["collections"] == exemplars[label]["collections"]
+            assert set(intent_data["collections"]) <= set(KNOWLEDGE_BASE_COLLECTIONS)
+
+    for name in KNOWLEDGE_BASE_COLLECTIONS:
+        assert f"'{name}'" in main.build_intent_prompt()
+
+
+def test_health_query_speculation_is_started_and_reused(loaded_collections):
+    """
+    With no classifier loaded, a health query should start retrieving over
+    the default speculative collections while the LLM classifies it, and the
+    Health Inquiry Agent should reuse that retrieval instead of running its
+    own.
+    """
+    retrievals = []
+
+    def retrieve(user_query, collection_names, n_results=3, intent=None):
+        retrievals.append(list(collection_names))
+        return {
+            'results': [{'document': 'Hypertension is...', 'metadata': {'source': 'disease_data/Hypertension.txt'},
+                         'collection': 'disease_data', 'relevance': 0.9}],
+            'context': 'Hypertension is...'
+        }
+
+    llm_intent = '{"intent": "health_inquiry", "collections": ["disease_data"], "needs_appointment": false}'
+    with patch.object(main, "SPECULATIVE_RETRIEVAL_ENABLED", True), \
+            patch.object(main, "intent_classifier", None), \
+            patch.object(main, "generate_llm", return_value=llm_intent), \
+            patch.object(main, "retrieve_context_from_collections", side_effect=retrieve), \
+            patch.object(main, "get_final_answer", return_value="High blood pressure is usually caused by..."):
+        query = "What causes high blood pressure?"
+        intent_data = main.determine_intent(query)
+        speculation = intent_data['speculation']
+        response = main.route_agent(query, intent_data)
+        main.finish_speculative_retrieval(intent_data)
+
+    assert speculation['collections'] == ['disease_data']
+    assert speculation['used']
+    assert retrievals == [['disease_data']]
+    assert response['answer'] == "High blood pressure is usually caused by..."
+
+
+def test_parallel_retrieval_merges_deterministically_and_skips_caching_partial_results():
+    """
+    Results should be merged in request order before the stable relevance
+    sort, so ties come out the same whichever collection answers first. A
+    collection that misses the deadline should be dropped, and the partial
+    result should not be cached.
+    """
+    cache = MagicMock()
+    cache.get.return_value = (None, None)
+
+    def retrieve(stubs: dict) -> dict:
+        with patch.dict(main.collections, stubs, clear=True), \
+                patch.object(main, "embed_query", return_value=[0.1, 0.2, 0.3]), \
+                patch.object(main, "RETRIEVAL_TIMEOUT_SECONDS", 0.3), \
+                patch.object(main, "retrieval_cache", cache):
+            return main.retrieve_context_from_collections("fever and rash", list(stubs), n_results=2)
+
+    orders = []
+    for disease_delay, medicine_delay in ((0.1, 0.0), (0.0, 0.1)):
+        retrieval = retrieve({
+            'disease_data': StubCollection('disease_data', [0.2, 0.4], delay=disease_delay),
+            'medicines': StubCollection('medicines', [0.2, 0.3], delay=medicine_delay)
+        })
+        orders.append([r['metadata']['source'] for r in retrieval['results']])
+    assert orders[0] == orders[1] == ['disease_data/0.txt', 'medicines/0.txt', 'medicines/1.txt', 'disease_data/1.txt']
+    assert cache.set.call_count == 2
+
+    cache.set.reset_mock()
+    retrieval = retrieve({
+        'disease_data': StubCollection('disease_data', [0.2, 0.4]),
+        'mental_health': StubCollection('mental_health', [0.1], delay=1.0)
+    })
+    assert [r['collection'] for r in retrieval['results']] == ['disease_data', 'disease_data']
+    assert retrieval['context'] == "disease_data document 0\n---\ndisease_data document 1"
+    cache.set.assert_not_called()
+
+
+def test_stream_sends_metadata_sources_tokens_then_the_json_endpoint_body(agent_client):
+    """
+    The stream should send metadata and sources before the answer, one token
+    event per generated piece followed by the appointment offer, then `done`
+    with the body /v1/agent/orchestrate returns for the same answer. The time
+    of the first token should reach the TTFT metric.
+    """
+    client, chat_log = agent_client
+
+    def stream_final_answer(prompt, agent):
+        assert (prompt, agent) == (HEALTH_PROMPT, "health_inquiry")
+        yield from ANSWER_PIECES
+
+    with patch.object(main, "stream_final_answer", side_effect=stream_final_answer), \
+            patch.object(main, "log_streamed_request") as log_streamed_request:
+        request_start = time.time()
+        response = client.post("/v1/agent/orchestrate/stream", json=HEALTH_QUERY, headers=AUTH_HEADERS)
+        events = parse_sse(response.get_data(as_text=True))
+
+    assert response.mimetype == "text/event-stream"
+    assert [event for event, _ in events] == ["metadata", "sources", "token", "token", "token", "done"]
+    assert events[0][1] == {"agent": "Health Inquiry Agent", "response_type": "informational",
+                            "intent": "health_inquiry", "collections_used": ["disease_data"], "has_image": False}
+    assert events[1][1] == {"sources": MALARIA_SOURCES}
+    streamed = "".join(data["text"] for event, data in events if event == "token")
+    assert streamed == "".join(ANSWER_PIECES) + main.APPOINTMENT_OFFER
+
+    done = events[-1][1]
+    assert done["answer"] == streamed
+    assert chat_log.call_args_list[-1].args == (USER['user_id'], streamed, 'AI')
+
+    endpoint, user_id, start_time, first_token_time = log_streamed_request.call_args.args
+    assert (endpoint, user_id) == ("orchestrate_agent_stream", USER['user_id'])
+    assert request_start <= start_time <= first_token_time <= time.time()
+    assert log_streamed_request.call_args.kwargs == {"agent_name": "Health Inquiry Agent", "intent": "health_inquiry"}
+
+    with patch.object(main, "get_final_answer", return_value="".join(ANSWER_PIECES)):
+        response = client.post("/v1/agent/orchestrate", json=HEALTH_QUERY, headers=AUTH_HEADERS)
+    assert response.get_json() == done
+
+
+def test_interrupted_stream_keeps_partial_answer_and_failed_one_falls_back(agent_client):
+    """
+    An LLM stream failing after some tokens should end with an `error` event
+    and keep the partial answer; one failing before any token should send the
+    agent's fallback answer as a single token, which also counts as the
+    first token.
+    """
+    client, _ = agent_client
+
+    def interrupted(prompt, agent):
+        yield "Malaria is "
+        raise ConnectionError("backend went away")
+
+    def unavailable(prompt, agent):
+        raise ConnectionError("backend down")
+        yield
+
+    with patch.object(main, "stream_final_answer", side_effect=interrupted):
+        events = parse_sse(client.post("/v1/agent/orchestrate/stream", json=HEALTH_QUERY,
+                                       headers=AUTH_HEADERS).get_data(as_text=True))
+    assert [event for event, _ in events] == ["metadata", "sources", "token", "error", "token", "done"]
+    assert events[-1][1]["answer"] == "Malaria is " + main.APPOINTMENT_OFFER
+
+    with patch.object(main, "stream_final_answer", side_effect=unavailable), \
+            patch.object(main, "log_streamed_request") as log_streamed_request:
+        events = parse_sse(client.post("/v1/agent/orchestrate/stream", json=HEALTH_QUERY,
+                                       headers=AUTH_HEADERS).get_data(as_text=True))
+    assert [event for event, _ in events] == ["metadata", "sources", "token", "token", "done"]
+    assert events[2][1] == {"text": FALLBACK_ANSWER}
+    assert log_streamed_request.call_args.args[3] is not None
+
+
+def test_unified_subsets_share_one_filtered_search_beside_split_collections():
+    """
+    Unified subsets should be served by a single search over the unified
+    collection: an equality filter for one subset, `$in` for several, with
+    n_results scaled by the subset count. Each hit should be tagged with the
+    subset from its metadata, alongside hits from split collections.
+    UnifiedSubset should scope count and query to its own subset.
+    """
+    unified = StubUnifiedCollection([
+        ('disease_data', 0.1), ('disease_data', 0.5), ('mental_health', 0.2),
+        ('mental_health', 0.3), ('medicines', 0.05)
+    ])
+    disease_data = main.UnifiedSubset(unified, 'disease_data')
+    assert disease_data.name == "clinico_unified[disease_data]"
+    assert disease_data.count() == 2
+    assert main.UnifiedSubset(unified, 'medicines').count() == 1
+    disease_data.query(query_embeddings=[[0.1]], n_results=5, include=[])
+    assert unified.queries.pop() == {'where': {'collection': 'disease_data'}, 'n_results': 5}
+
+    stubs = {
+        'disease_data': disease_data,
+        'mental_health': main.UnifiedSubset(unified, 'mental_health'),
+        'medicines': StubCollection('medicines', [0.15, 0.4])
+    }
+    with patch.dict(main.collections, stubs, clear=True), \
+            patch.object(main, "unified_collection", unified), \
+            patch.object(main, "HYBRID_RETRIEVAL_ENABLED", False), \
+            patch.object(main, "retrieval_cache", None), \
+            patch.object(main, "embed_query", return_value=[0.1, 0.2, 0.3]):
+        retrieval = main.retrieve_context_from_collections(
+            "feeling low with a fever", ['disease_data', 'mental_health', 'medicines'], n_results=2
+        )
+        assert unified.queries == [{'where': {'collection': {'$in': ['disease_data', 'mental_health']}}, 'n_results': 4}]
+        assert [(r['collection'], r['metadata']['source']) for r in retrieval['results']] == [
+            ('disease_data', 'disease_data/0.txt'), ('medicines', 'medicines/0.txt'),
+            ('mental_health', 'mental_health/2.txt'), ('mental_health', 'mental_health/3.txt'),
+            ('medicines', 'medicines/1.txt'), ('disease_data', 'disease_data/1.txt')
+        ]
+
+        unified.queries.clear()
+        retrieval = main.retrieve_context_from_collections("feeling low", ['mental_health', 'medicines'], n_results=2)
+        assert unified.queries == [{'where': {'collection': 'mental_health'}, 'n_results': 2}]
+        assert {r['collection'] for r in retrieval['results']} == {'mental_health', 'medicines'}
@@ -0,0 +1,68 @@
+import time
+from retrieval_cache import RetrievalCache, write_index_version
+
+RETRIEVAL = {
+    "results": [{"document": "Malaria spreads through mosquito bites.", "collection": "disease_data", "relevance": 0.8}],
+    "context": "Malaria spreads through mosquito bites."
+}
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the two Redis calls the cache makes."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+# --- Test Suite ---
+
+def test_hits_misses_expiry_and_index_version_invalidation(tmp_path):
+    """
+    A stored retrieval should be served for the same (normalized) query and
+    parameters only; it should expire after the TTL, and a new index version
+    or embedding model should make earlier entries unreachable.
+    """
+    version_path = str(tmp_path / "index_version")
+    write_index_version(version_path)
+    cache = RetrievalCache(ttl_seconds=0.3, index_version_path=version_path, model_id="minilm:torch")
+
+    cache.set("What causes malaria?", ["disease_data"], 3, RETRIEVAL)
+    assert cache.get("  what causes MALARIA? ", ["disease_data"], 3) == (RETRIEVAL, "l1")
+    assert cache.get("What causes malaria?", ["disease_data", "medicines"], 3) == (None, None)
+    assert cache.get("What causes malaria?", ["disease_data"], 5) == (None, None)
+    assert cache.get("What causes malaria?", ["disease_data"], 3, token_budget=800) == (None, None)
+
+    other_model = RetrievalCache(ttl_seconds=0.3, index_version_path=version_path, model_id="minilm:onnx-int8")
+    other_model.entries = cache.entries
+    assert other_model.get("What causes malaria?", ["disease_data"], 3) == (None, None)
+
+    time.sleep(0.01)  # a distinct file mtime
+    write_index_version(version_path)
+    assert cache.get("What causes malaria?", ["disease_data"], 3) == (None, None)
+
+    cache.set("What causes malaria?", ["disease_data"], 3, RETRIEVAL)
+    time.sleep(0.35)
+    assert cache.get("What causes malaria?", ["disease_data"], 3) == (None, None)
+
+
+def test_l2_hit_is_promoted_into_l1(tmp_path):
+    """
+    A retrieval cached by another worker should be served from Redis once
+    and then from this worker's L1.
+    """
+    version_path = str(tmp_path / "index_version")
+    write_index_version(version_path)
+    redis_client = FakeRedis()
+    writer = RetrievalCache(index_version_path=version_path, model_id="minilm:torch")
+    reader = RetrievalCache(index_version_path=version_path, model_id="minilm:torch")
+    writer.redis_client = reader.redis_client = redis_client
+
+    writer.set("What causes malaria?", ["disease_data"], 3, RETRIEVAL)
+    assert reader.get("What causes malaria?", ["disease_data"], 3) == (RETRIEVAL, "l2")
+    redis_client.values.clear()
+    assert reader.get("What causes malaria?", ["disease_data"], 3) == (RETRIEVAL, "l1")
@@ -0,0 +1,48 @@
+import time
+from semantic_cache import InMemorySemanticCache, is_cacheable_intent
+
+RESPONSE = {"agent": "Health Inquiry Agent", "answer": "Diabetes symptoms include thirst...", "sources": []}
+
+# --- Test Suite ---
+
+def test_paraphrase_hits_above_threshold_within_scope_until_ttl():
+    """
+    A query embedding close enough to a cached one should be served its
+    answer, a less similar one or one with another intent or collection set
+    should miss, and entries should expire after the TTL.
+    """
+    cache = InMemorySemanticCache(threshold=0.95, ttl_seconds=0.2, max_entries=10)
+    cache.store("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0], RESPONSE)
+
+    response, similarity = cache.lookup("health_inquiry", ["disease_data"], [0.99, 0.1, 0.0])
+    assert response == RESPONSE and similarity >= 0.95
+    response["answer"] = "changed by the caller"
+    assert cache.lookup("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0])[0] == RESPONSE
+
+    response, similarity = cache.lookup("health_inquiry", ["disease_data"], [0.8, 0.6, 0.0])
+    assert response is None and similarity < 0.95
+    assert cache.lookup("medicine_inquiry", ["disease_data"], [1.0, 0.0, 0.0])[0] is None
+    assert cache.lookup("health_inquiry", ["disease_data", "medicines"], [1.0, 0.0, 0.0])[0] is None
+
+    time.sleep(0.25)
+    assert cache.lookup("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0])[0] is None
+    assert not cache.entries
+
+
+def test_excluded_intents_bypass_and_lru_eviction():
+    """
+    Crisis, mental wellness and image intents should never be cached, and
+    the least recently used entry should be evicted when the cache is full.
+    """
+    assert is_cacheable_intent("health_inquiry")
+    assert not is_cacheable_intent("mental_wellness")
+    assert not is_cacheable_intent("health_inquiry_with_image")
+
+    cache = InMemorySemanticCache(threshold=0.95, ttl_seconds=60, max_entries=2)
+    cache.store("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0], {"answer": "first"})
+    cache.store("health_inquiry", ["disease_data"], [0.0, 1.0, 0.0], {"answer": "second"})
+    cache.lookup("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0])  # first is now most recent
+    cache.store("health_inquiry", ["disease_data"], [0.0, 0.0, 1.0], {"answer": "third"})
+
+    assert cache.lookup("health_inquiry", ["disease_data"], [1.0, 0.0, 0.0])[0] == {"answer": "first"}
+    assert cache.lookup("health_inquiry", ["disease_data"], [0.0, 1.0, 0.0])[0] is None
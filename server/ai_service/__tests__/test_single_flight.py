@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from single_flight import SingleFlight
+
+# --- Test Suite ---
+
+def test_concurrent_sync_calls_share_one_call_and_its_failure():
+    """
+    Threads asking for the same key while a call is running should share its
+    result (or its exception) instead of making their own call.
+    """
+    group = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def call():
+        calls.append(1)
+        release.wait()
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(group.do, "answer", "key", call) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        assert [future.result() for future in futures] == ["answer"] * 5
+    assert len(calls) == 1
+
+    def fail():
+        time.sleep(0.1)
+        raise ConnectionError("backend down")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(group.do, "answer", "key", fail) for _ in range(3)]
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result()
+    assert group.flights == {}
+
+
+def test_async_followers_survive_leader_cancellation_and_share_failures():
+    """
+    Tasks awaiting the same key should share one call. Cancelling the task
+    that started it (e.g. its client disconnected) must not cancel the
+    others, and a failing call should raise in every waiter.
+    """
+    async def scenario():
+        group = SingleFlight()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "answer"
+
+        leader = asyncio.ensure_future(group.do_async("answer", "key", call))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(group.do_async("answer", "key", call)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        leader.cancel()
+        assert await asyncio.gather(*followers) == ["answer"] * 3
+        assert leader.cancelled() and len(calls) == 1
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise ConnectionError("backend down")
+
+        results = await asyncio.gather(*[group.do_async("answer", "other", fail) for _ in range(3)],
+                                       return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+        # With every waiter gone the call itself is cancelled
+        abandoned = asyncio.ensure_future(group.do_async("answer", "abandoned", call))
+        await asyncio.sleep(0.02)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        assert group.async_flights == {} and len(calls) == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,137 @@
+import os
+from threading import Event
+from unittest.mock import patch
+import pytest
+
+# main refuses to start without a token; lazy init keeps models from loading on import
+os.environ.setdefault('AI_SERVICE_AUTH_TOKEN', 'test-secret-token')
+os.environ.setdefault('LAZY_INIT_ENABLED', 'true')
+
+import main
+
+# /v1/health flag -> the main attribute holding the component when it was built
+HEALTH_COMPONENT_FLAGS = {
+    "semantic_cache": "semantic_answer_cache",
+    "retrieval_cache": "retrieval_cache",
+    "llm_cache": "llm_cache"
+}
+
+
+@pytest.fixture
+def fresh_startup_state():
+    """Readiness state as a process sees it before initialization."""
+    with patch.object(main, "service_ready", Event()), \
+            patch.object(main, "service_state", {"phase": "starting", "error": None, "phases": {}}):
+        yield main.service_state
+
+
+@pytest.fixture
+def warming_up(fresh_startup_state):
+    """Lazy mode with the warmup still running (it is never actually started)."""
+    with patch.object(main, "LAZY_INIT_ENABLED", True), \
+            patch.object(main, "start_background_warmup") as start_warmup:
+        yield main.app.test_client(), start_warmup
+
+
+@pytest.fixture
+def stub_loaders():
+    """Startup with every loader stubbed and the optional phases off."""
+    with patch.object(main, "load_embedding_model") as load_embedding_model, \
+            patch.object(main, "load_collections") as load_collections, \
+            patch.object(main, "load_lexical_index") as load_lexical_index, \
+            patch.object(main, "warm_up") as warm_up, \
+            patch.object(main, "HYBRID_RETRIEVAL_ENABLED", False), \
+            patch.object(main, "INTENT_CLASSIFIER_ENABLED", False), \
+            patch.object(main, "model_residency", None):
+        yield load_embedding_model, load_collections, load_lexical_index, warm_up
+
+# --- Test Suite ---
+
+def test_agent_endpoints_wait_for_warmup_while_health_and_metrics_stay_open(warming_up):
+    """
+    Until the service is ready, agent endpoints should answer 503 with
+    Retry-After before authentication runs, while /v1/health* and
+    /v1/metrics* are served; readiness should report not_ready.
+    """
+    client, start_warmup = warming_up
+
+    for path in ("/v1/agent/orchestrate", "/v1/agent/orchestrate/stream", "/v1/agent/analyze-image"):
+        response = client.post(path, json={"query": "How is malaria spread?"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        assert response.get_json() == {"error": "Service is warming up. Please retry shortly.", "phase": "starting"}
+    assert start_warmup.called
+
+    assert client.get("/v1/health/live").status_code == 200
+    assert client.get("/v1/health").status_code == 200
+    response = client.get("/v1/health/ready")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "not_ready"
+    response = client.get("/v1/metrics")
+    assert response.status_code == (200 if main.metrics else 503)
+    assert "Retry-After" not in response.headers
+
+    main.service_ready.set()
+    assert client.get("/v1/health/ready").status_code == 200
+    assert client.post("/v1/agent/orchestrate", json={"query": "How is malaria spread?"}).status_code == 403
+
+
+def test_initialization_records_each_phase_then_marks_ready(fresh_startup_state, stub_loaders):
+    """
+    initialize_service should record a duration for every phase it runs,
+    including optional ones once enabled, and set service_ready last.
+    """
+    *_, load_lexical_index, warm_up = stub_loaders
+
+    main.initialize_service(warmup=True)
+    assert list(fresh_startup_state["phases"]) == ["embedding_model", "collections", "warmup", "time_to_ready"]
+    assert all(duration >= 0 for duration in fresh_startup_state["phases"].values())
+    assert fresh_startup_state["phase"] == "ready"
+    assert fresh_startup_state["error"] is None
+    assert main.service_ready.is_set()
+    warm_up.assert_called_once()
+    load_lexical_index.assert_not_called()
+
+    main.service_ready.clear()
+    fresh_startup_state["phases"].clear()
+    with patch.object(main, "HYBRID_RETRIEVAL_ENABLED", True):
+        main.initialize_service()
+    assert list(fresh_startup_state["phases"]) == ["embedding_model", "collections", "lexical_index", "time_to_ready"]
+
+
+def test_initialization_failure_is_reported_without_marking_ready(fresh_startup_state, stub_loaders):
+    """
+    A loader failing should leave the service not ready, with the error and
+    the failed phase reported by /v1/health/ready.
+    """
+    _, load_collections, *_ = stub_loaders
+    load_collections.side_effect = ValueError("Collection 'clinico_disease_data' not found")
+
+    main.initialize_service(warmup=True)
+    assert not main.service_ready.is_set()
+    assert fresh_startup_state["phase"] == "failed"
+    assert fresh_startup_state["error"] == "Collection 'clinico_disease_data' not found"
+    assert list(fresh_startup_state["phases"]) == ["embedding_model"]
+
+    with patch.object(main, "LAZY_INIT_ENABLED", False):
+        response = main.app.test_client().get("/v1/health/ready")
+    assert response.status_code == 503
+    assert response.get_json()["error"] == "Collection 'clinico_disease_data' not found"
+
+
+def test_health_reports_the_components_actually_in_use():
+    """
+    /v1/health should report whether each optional component was built,
+    not the environment variable that asked for it.
+    """
+    client = main.app.test_client()
+    with patch.object(main, "LAZY_INIT_ENABLED", False):
+        for flag, component in HEALTH_COMPONENT_FLAGS.items():
+            for built in (None, object()):
+                with patch.object(main, component, built):
+                    health = client.get("/v1/health").get_json()
+                assert health[flag] == str(built is not None).lower(), flag
+
+        for enabled in (False, True):
+            with patch.object(main, "CIRCUIT_BREAKER_ENABLED", enabled):
+                assert client.get("/v1/health").get_json()["circuit_breaker"] == str(enabled).lower()
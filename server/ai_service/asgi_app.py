@@ -0,0 +1,315 @@
+"""
+ASGI Module for AI Service
+Async entry point for the orchestration pipeline. LLM calls go through async
+HTTP clients so one process can hold many in-flight requests, while embedding,
+retrieval, image decoding and the care coordination flow run in the thread
+pool. Every other endpoint is served by the Flask app mounted underneath.
+
+Usage:
+    poetry run uvicorn asgi_app:app --port 5001 --workers 3
+"""
+
+import os
+import time
+import warnings
+from contextlib import asynccontextmanager
+from functools import wraps
+import anyio
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+import main
+from main import (
+    GEMINI_MODEL, LLM_ERROR_ANSWER,
+    authenticate_token, classify_intent_without_llm, build_intent_prompt, parse_intent_response,
+    default_intent, start_speculative_retrieval, continues_care_coordination, dispatch_request,
+    complete_llm_agent, parse_orchestration_request, print_request_banner, add_response_metadata,
+    log_orchestration, log_chat_to_database, AnswerStream, answer_request, deterministic_request,
+    llm_flight_key, lookup_llm_cache, store_llm_cache, primary_backend
+)
+from llm_router import llm_router
+from circuit_breaker import get_breaker
+from http_client import close_async_client
+from rate_limiter import async_rate_limit
+from monitoring import async_monitor_request, log_agent_usage
+
+with warnings.catch_warnings():
+    # Deprecated in favour of a2wsgi, which is not a dependency; still fine for the Flask fallback
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+# Configuration
+ASGI_THREADPOOL_SIZE = int(os.getenv("ASGI_THREADPOOL_SIZE", "100"))  # threads for embedding, retrieval and blocking agents
+
+
+# --- Async LLM Calls ---
+# Counterparts of the main.py functions of the same name; the requests they
+# send are built by main.answer_request and main.deterministic_request
+async def coalesce_llm_call_async(call_site: str, parts: tuple, coro_fn, agent: str = None):
+    if main.single_flight is None:
+        return await coro_fn()
+    return await main.single_flight.do_async(call_site, llm_flight_key(call_site, parts, agent), coro_fn)
+
+
+async def route_llm_call_async(call_site: str, generate, *args) -> tuple:
+    return await llm_router.call_async(call_site, primary_backend(), lambda backend: generate(*args, backend))
+
+
+async def generate_llm_async(llm_request: dict, backend: str = None) -> str:
+    if (backend or primary_backend()) == "gemini":
+        response = await main.get_genai_client().aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=llm_request["contents"],
+            config=llm_request["gemini_config"]
+        )
+        return response.text
+
+    return await main.llm_backend.achat(llm_request["messages"], llm_request["temperature"], llm_request["agent"])
+
+
+async def generate_llm_stream_async(llm_request: dict):
+    if main.use_gemini:
+        stream = await main.get_genai_client().aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=llm_request["contents"],
+            config=llm_request["gemini_config"]
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+        return
+
+    async for piece in main.llm_backend.astream_chat(
+        llm_request["messages"], llm_request["temperature"], llm_request["agent"]
+    ):
+        yield piece
+
+
+async def call_model_async(system_prompt: str, user_query: str, call_site: str = "intent", parse=None):
+    # The cache may go to Redis, so it is consulted off the event loop
+    cached = await run_in_threadpool(lookup_llm_cache, call_site, system_prompt, user_query)
+    if cached is not None:
+        return parse(cached) if parse else cached
+
+    content, backend = await coalesce_llm_call_async(
+        call_site, (system_prompt, user_query),
+        lambda: route_llm_call_async(
+            call_site, generate_llm_async, deterministic_request(system_prompt, user_query, call_site)
+        ),
+        call_site
+    )
+    content = content.strip()
+    output = parse(content) if parse else content
+    await run_in_threadpool(store_llm_cache, call_site, system_prompt, user_query, content, backend)
+    return output
+
+
+async def get_final_answer_async(prompt: str, agent: str = "answer") -> str:
+    try:
+        content, _ = await coalesce_llm_call_async(
+            "answer", (prompt,),
+            lambda: route_llm_call_async("answer", generate_llm_async, answer_request(prompt, agent)), agent
+        )
+        return content
+    except Exception as e:
+        print("Error generating answer:", e)
+        return LLM_ERROR_ANSWER
+
+
+async def stream_final_answer_async(prompt: str, agent: str = "answer"):
+    with get_breaker(primary_backend()).track(count_slow=False):
+        async for piece in generate_llm_stream_async(answer_request(prompt, agent)):
+            yield piece
+
+
+# --- Async Orchestration ---
+async def determine_intent_async(user_query: str, has_image: bool = False) -> dict:
+    print(f"🎯 Orchestrator: Determining intent for query: '{user_query}' (Image: {has_image})")
+
+    # The embedding classifier is CPU-bound
+    intent_data = await run_in_threadpool(classify_intent_without_llm, user_query, has_image)
+    if intent_data is not None:
+        return intent_data
+
+    speculation = None if has_image else await run_in_threadpool(start_speculative_retrieval, user_query)
+    try:
+        intent_data = await call_model_async(
+            build_intent_prompt(has_image), user_query,
+            parse=lambda content: parse_intent_response(content, user_query, has_image)
+        )
+    except Exception as e:
+        print(f"  -> Error during intent classification: {e}")
+        intent_data = default_intent(has_image)
+
+    if speculation is not None:
+        intent_data['speculation'] = speculation
+    return intent_data
+
+
+async def dispatch_request_async(fields: dict) -> tuple:
+    """main.dispatch_request with the intent LLM call awaited rather than blocking a thread."""
+    intent_data = None
+    if not continues_care_coordination(fields):
+        intent_data = await determine_intent_async(fields['user_query'], fields['has_image'])
+    return await run_in_threadpool(dispatch_request, fields, intent_data)
+
+
+# --- Async Decorators ---
+def async_verify_user_token(f):
+    """Async equivalent of main.verify_user_token; the user is kept on request.state."""
+    @wraps(f)
+    async def decorated_function(request, *args, **kwargs):
+        user, error, status_code = authenticate_token(request.headers.get('Authorization'))
+        if error:
+            return JSONResponse(error, status_code=status_code)
+
+        request.state.user = user
+        return await f(request, *args, **kwargs)
+
+    return decorated_function
+
+
+def require_service_ready(f):
+    """Async equivalent of main.ensure_service_ready for the lazy startup mode."""
+    @wraps(f)
+    async def decorated_function(request, *args, **kwargs):
+        if main.LAZY_INIT_ENABLED and not main.service_ready.is_set():
+            main.start_background_warmup()
+            return JSONResponse({
+                "error": "Service is warming up. Please retry shortly.",
+                "phase": main.service_state["phase"]
+            }, status_code=503, headers={"Retry-After": "5"})
+
+        return await f(request, *args, **kwargs)
+
+    return decorated_function
+
+
+async def read_orchestration_request(request) -> tuple:
+    """
+    main.parse_orchestration_request for a Starlette request; image decoding is CPU-bound.
+    Returns (fields: dict, None) or (None, error_response).
+    """
+    fields, error, status_code = await run_in_threadpool(parse_orchestration_request, await request.json())
+    if error:
+        return None, JSONResponse(error, status_code=status_code)
+    return fields, None
+
+
+# --- Endpoints ---
+@require_service_ready
+@async_verify_user_token
+@async_rate_limit
+@async_monitor_request
+async def orchestrate_agent(request):
+    """Async equivalent of POST /v1/agent/orchestrate."""
+    fields, error_response = await read_orchestration_request(request)
+    if error_response is not None:
+        return error_response
+
+    user = request.state.user
+
+    try:
+        print_request_banner(user, fields, "async")
+        await run_in_threadpool(log_chat_to_database, user['user_id'], fields['user_query'], 'User')
+
+        response_data, prepared, intent_data = await dispatch_request_async(fields)
+        if prepared is not None:
+            answer = await get_final_answer_async(prepared['prompt'], prepared['intent']) if prepared['prompt'] else None
+            response_data = await run_in_threadpool(complete_llm_agent, prepared, answer)
+
+        await run_in_threadpool(log_chat_to_database, user['user_id'], response_data.get('answer', ''), 'AI')
+        add_response_metadata(response_data, fields, intent_data, user)
+
+        print(f"\n✅ Response by: {response_data['agent']}")
+        print(f"{'='*80}\n")
+
+        log_agent_usage(
+            response_data['agent'], intent=response_data['intent'],
+            start_time=getattr(request.state, 'start_time', None)
+        )
+        log_orchestration(response_data, intent_data)
+
+        return JSONResponse(response_data)
+
+    except Exception as e:
+        print(f"❌ Error during orchestration: {e}")
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({"error": "An error occurred while processing your request."}, status_code=500)
+
+
+@require_service_ready
+@async_verify_user_token
+@async_rate_limit
+async def orchestrate_agent_stream(request):
+    """Async equivalent of POST /v1/agent/orchestrate/stream (see main.AnswerStream)."""
+    start_time = time.time()
+    fields, error_response = await read_orchestration_request(request)
+    if error_response is not None:
+        return error_response
+
+    user = request.state.user
+
+    async def generate():
+        stream = AnswerStream(fields, user)
+
+        try:
+            print_request_banner(user, fields, "async stream")
+            await run_in_threadpool(log_chat_to_database, user['user_id'], fields['user_query'], 'User')
+
+            for event in stream.start(*await dispatch_request_async(fields)):
+                yield event
+
+            if stream.prompt is not None:
+                try:
+                    async for piece in stream_final_answer_async(stream.prompt, stream.prepared['intent']):
+                        yield stream.token(piece)
+                    await run_in_threadpool(stream.finish_answer)
+                except Exception as e:
+                    for event in stream.answer_failed(e):
+                        yield event
+            for event in stream.closing_tokens():
+                yield event
+
+            await run_in_threadpool(log_chat_to_database, user['user_id'], stream.response_data.get('answer', ''), 'AI')
+            yield stream.done()
+
+            log_orchestration(stream.response_data, stream.intent_data)
+
+        except Exception as e:
+            print(f"❌ Error during streamed orchestration: {e}")
+            import traceback
+            traceback.print_exc()
+            yield stream.failed()
+
+        finally:
+            stream.log_request('orchestrate_agent_stream', start_time)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ASGI_THREADPOOL_SIZE
+    if main.LAZY_INIT_ENABLED:
+        main.start_background_warmup()
+    print(f"✅ ASGI app ready (thread pool: {ASGI_THREADPOOL_SIZE})")
+    yield
+    await close_async_client()
+
+
+app = Starlette(
+    routes=[
+        Route('/v1/agent/orchestrate', orchestrate_agent, methods=['POST']),
+        Route('/v1/agent/orchestrate/stream', orchestrate_agent_stream, methods=['POST']),
+        # Health, metrics, image analysis and utility endpoints
+        Mount('/', app=WSGIMiddleware(main.app))
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,99 @@
+"""
+Benchmarks compressed NumPy index search (int8 / binary codes, with and without
+PCA) against exact search: recall@k, first-pass memory and per-query latency.
+
+Queries are stored chunk embeddings with a little Gaussian noise added, so each
+one resembles a real query landing near, but not exactly on, a chunk.
+
+Usage:
+    poetry run python benchmark_numpy_index.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from numpy_index import (
+    NUMPY_INDEX_DIR, NUMPY_RESCORE_FACTOR, EMBEDDINGS_FILE, MANIFEST_FILE,
+    NumpyCollection, write_vector_codes
+)
+
+BENCHMARK_QUERIES = 200
+BENCHMARK_K = 5
+QUERY_NOISE = 0.05
+PCA_DIMS = [0, 128]
+QUANTIZATIONS = ["int8", "binary"]
+
+
+def first_pass_bytes(collection: NumpyCollection) -> int:
+    """Bytes scanned by the first pass (codes plus PCA matrix, or the full matrix)."""
+    if collection.codes is None:
+        return int(collection.embeddings.nbytes)
+    pca_bytes = sum(int(array.nbytes) for array in collection.pca) if collection.pca is not None else 0
+    return int(collection.codes.nbytes) + pca_bytes
+
+
+def run_queries(collection: NumpyCollection, queries: np.ndarray) -> tuple:
+    """Returns (ids per query, latencies in ms)."""
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=BENCHMARK_K, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(result['ids'][0])
+    return ids, latencies
+
+
+def benchmark_index(index_dir: str):
+    exact = NumpyCollection(index_dir, quantization="none")
+    if exact.count() == 0:
+        print(f"Skipping empty index '{exact.name}'.")
+        return
+
+    rng = np.random.default_rng(0)
+    embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE))
+    sample = embeddings[rng.choice(embeddings.shape[0], size=min(BENCHMARK_QUERIES, embeddings.shape[0]), replace=False)]
+    queries = sample + rng.normal(scale=QUERY_NOISE, size=sample.shape).astype(np.float32)
+
+    expected, exact_latencies = run_queries(exact, queries)
+    full_bytes = first_pass_bytes(exact)
+
+    print(f"\n--- {exact.name}: {exact.count()} vectors x {embeddings.shape[1]} dims, "
+          f"recall@{BENCHMARK_K}, rescore factor {NUMPY_RESCORE_FACTOR} ---")
+    print(f"{'Variant':<16}{'Recall':>8}{'Memory KB':>12}{'Shrink':>8}{'Avg ms':>9}{'P95 ms':>9}")
+    print(f"{'exact':<16}{1.0:>8.3f}{full_bytes / 1024:>12.1f}{1.0:>7.1f}x"
+          f"{np.mean(exact_latencies):>9.3f}{np.percentile(exact_latencies, 95):>9.3f}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for pca_dim in PCA_DIMS:
+            variant_dir = os.path.join(scratch, f"pca{pca_dim}")
+            shutil.copytree(index_dir, variant_dir)
+            write_vector_codes(variant_dir, embeddings, pca_dim)
+
+            for quantization in QUANTIZATIONS:
+                collection = NumpyCollection(variant_dir, quantization=quantization)
+                actual, latencies = run_queries(collection, queries)
+                recall = np.mean([
+                    len(set(got) & set(want)) / max(len(want), 1) for got, want in zip(actual, expected)
+                ])
+                memory = first_pass_bytes(collection)
+                label = quantization + (f"+pca{pca_dim}" if collection.pca is not None else "")
+                print(f"{label:<16}{recall:>8.3f}{memory / 1024:>12.1f}{full_bytes / memory:>7.1f}x"
+                      f"{np.mean(latencies):>9.3f}{np.percentile(latencies, 95):>9.3f}")
+
+
+def main():
+    if not os.path.isdir(NUMPY_INDEX_DIR):
+        print(f"❌ NumPy index directory '{NUMPY_INDEX_DIR}' not found. Please run ingest.py first.")
+        sys.exit(1)
+
+    for entry in sorted(os.listdir(NUMPY_INDEX_DIR)):
+        index_dir = os.path.join(NUMPY_INDEX_DIR, entry)
+        if os.path.isfile(os.path.join(index_dir, MANIFEST_FILE)):
+            benchmark_index(index_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -59,6 +59,14 @@ else
     echo "⚠️  Warning: ingest.py not found. Skipping knowledge base ingestion."
 fi
 
+# Build the embedding intent classifier from the labeled exemplar queries
+echo "🎯 Building intent classifier..."
+if python3 intent_classifier.py; then
+    echo "✅ Intent classifier built."
+else
+    echo "⚠️  Warning: intent classifier build failed. Intents will be classified by the LLM."
+fi
+
 # Verify that the application can start without errors
 echo "🧪 Testing application import..."
 if python3 -c "import main; print('Application imports successfully')" &> /dev/null; then
@@ -0,0 +1,173 @@
+"""
+Circuit Breaker Module for AI Service
+Per-backend circuit breakers (Gemini, the OpenAI-compatible server, the Ollama
+vision model and the Node.js server) that open on a high error or slow-call
+rate so calls fail fast to their fallbacks instead of tying up a worker, then
+probe the backend again after a cool-down
+"""
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock
+from monitoring import log_circuit_breaker_transition, log_circuit_breaker_rejection
+
+# Configuration
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20"))  # recent calls considered
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "5"))
+CIRCUIT_BREAKER_ERROR_RATE = float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.5"))
+CIRCUIT_BREAKER_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8"))
+CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS", "30"))
+CIRCUIT_BREAKER_NODE_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_BREAKER_NODE_SLOW_CALL_SECONDS", "3"))
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1"))  # concurrent probes
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit '{name}' is open; skipping call")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through and their outcomes fill a sliding window; the
+    breaker opens once the window holds `min_calls` and the error or
+    slow-call rate reaches its threshold.
+    open: calls are rejected with CircuitOpenError for `open_seconds`.
+    half_open: up to `half_open_calls` probes go through; a fast success
+    closes the breaker, anything else re-opens it.
+    """
+
+    def __init__(self, name: str, slow_call_seconds: float,
+                 window: int = CIRCUIT_BREAKER_WINDOW,
+                 min_calls: int = CIRCUIT_BREAKER_MIN_CALLS,
+                 error_rate: float = CIRCUIT_BREAKER_ERROR_RATE,
+                 slow_call_rate: float = CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                 open_seconds: float = CIRCUIT_BREAKER_OPEN_SECONDS,
+                 half_open_calls: int = CIRCUIT_BREAKER_HALF_OPEN_CALLS):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.outcomes = deque(maxlen=window)  # (failed, slow) per call
+        self.state = CLOSED
+        self.opened_at = None
+        self.probes = 0
+        self.lock = Lock()
+
+    def _transition(self, state: str):
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.time()
+            print(f"⚠️  Circuit '{self.name}' opened; failing fast for {self.open_seconds:g}s")
+        elif state == CLOSED:
+            self.outcomes.clear()
+            print(f"✅ Circuit '{self.name}' closed")
+        self.probes = 0
+        log_circuit_breaker_transition(self.name, state)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (reserving a probe slot when half-open)."""
+        with self.lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_calls:
+                    return False
+                self.probes += 1
+            return True
+
+    def record(self, ok: bool, duration: float = None):
+        slow = duration is not None and duration > self.slow_call_seconds
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED if ok and not slow else OPEN)
+                return
+            if self.state == OPEN:
+                return
+
+            self.outcomes.append((not ok, slow))
+            if len(self.outcomes) < self.min_calls:
+                return
+            failures = sum(1 for failed, _ in self.outcomes if failed)
+            slow_calls = sum(1 for _, was_slow in self.outcomes if was_slow)
+            if (failures / len(self.outcomes) >= self.error_rate
+                    or slow_calls / len(self.outcomes) >= self.slow_call_rate):
+                self._transition(OPEN)
+
+    def release(self):
+        """Give back a probe slot for a call that ended without an outcome (e.g. cancelled)."""
+        with self.lock:
+            if self.state == HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    @contextmanager
+    def track(self, count_slow: bool = True):
+        """
+        Guard one backend call. Raises CircuitOpenError when the breaker is
+        open; exceptions from the block count as failures. Set count_slow to
+        False for streams, whose duration depends on the client.
+        """
+        if not CIRCUIT_BREAKER_ENABLED:
+            yield
+            return
+
+        if not self.allow():
+            log_circuit_breaker_rejection(self.name)
+            raise CircuitOpenError(self.name)
+
+        start_time = time.time()
+        try:
+            yield
+        except Exception:
+            self.record(False)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record(True, time.time() - start_time if count_slow else None)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            outcomes = list(self.outcomes)
+            return {
+                'state': self.state,
+                'recent_calls': len(outcomes),
+                'error_rate': round(sum(1 for failed, _ in outcomes if failed) / max(len(outcomes), 1), 3),
+                'slow_call_rate': round(sum(1 for _, slow in outcomes if slow) / max(len(outcomes), 1), 3),
+                'retry_in_seconds': round(max(0.0, self.opened_at + self.open_seconds - time.time()), 1)
+                if self.state == OPEN else 0
+            }
+
+
+# One breaker per backend, per worker process
+breakers = {
+    "gemini": CircuitBreaker("gemini", CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS),
+    "openai_compat": CircuitBreaker("openai_compat", CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS),
+    "vision": CircuitBreaker("vision", CIRCUIT_BREAKER_LLM_SLOW_CALL_SECONDS),
+    "node": CircuitBreaker("node", CIRCUIT_BREAKER_NODE_SLOW_CALL_SECONDS)
+}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    return breakers[name]
+
+
+def breaker_states() -> dict:
+    """Current state of every breaker, for health checks."""
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
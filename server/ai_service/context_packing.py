@@ -0,0 +1,114 @@
+"""
+Context Packing Module for AI Service
+Trims retrieved chunks to a per-agent token budget, dropping near-duplicates
+and low-relevance tails before they reach the LLM prompt
+"""
+
+import os
+import numpy as np
+from embedding_cache import normalize_query
+
+# Configuration
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "false").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.92"))  # cosine between chunks
+CONTEXT_RELEVANCE_GAP = float(os.getenv("CONTEXT_RELEVANCE_GAP", "0.15"))  # drop that ends the adaptive k
+CONTEXT_MIN_CHUNKS = int(os.getenv("CONTEXT_MIN_CHUNKS", "2"))
+CHARS_PER_TOKEN = 4
+
+# Per-agent budgets, e.g. "health_inquiry:1200,medicine_inquiry:800"
+CONTEXT_TOKEN_BUDGETS = {
+    intent.strip(): int(budget)
+    for intent, budget in (
+        entry.split(":", 1)
+        for entry in os.getenv(
+            "CONTEXT_TOKEN_BUDGETS",
+            "health_inquiry:1000,medicine_inquiry:750,mental_wellness:600,health_inquiry_with_image:750"
+        ).split(",")
+        if ":" in entry
+    )
+}
+
+CONTEXT_SEPARATOR = "\n---\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def get_context_budget(intent: str) -> int:
+    """Token budget for an agent's retrieved context."""
+    return CONTEXT_TOKEN_BUDGETS.get(intent, CONTEXT_TOKEN_BUDGET)
+
+
+def _unit(embedding):
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def pack_context(results: list, token_budget: int, dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+                 relevance_gap: float = CONTEXT_RELEVANCE_GAP, min_chunks: int = CONTEXT_MIN_CHUNKS) -> tuple:
+    """
+    Select chunks for the prompt from results sorted by relevance.
+
+    Chunks are taken in order until the relevance drops by more than
+    `relevance_gap` from the previous chunk (after `min_chunks`), skipping
+    any chunk whose embedding is within `dedup_threshold` cosine of one
+    already taken (or whose text is identical when no embedding is attached),
+    and stopping once `token_budget` is reached. The top chunk is always
+    kept, truncated if it alone exceeds the budget.
+
+    Returns:
+        (packed_results: list, stats: dict)
+    """
+    packed = []
+    kept_vectors = []
+    kept_texts = set()
+    used_tokens = 0
+    dropped = {'duplicates': 0, 'relevance_gap': 0, 'budget': 0}
+    previous_relevance = None
+
+    for position, result in enumerate(results):
+        if (previous_relevance is not None and len(packed) >= min_chunks
+                and previous_relevance - result['relevance'] > relevance_gap):
+            dropped['relevance_gap'] += len(results) - position
+            break
+
+        vector = _unit(result.get('embedding'))
+        text_key = normalize_query(result['document'])
+        if text_key in kept_texts or (
+            vector is not None and any(float(vector @ kept) >= dedup_threshold for kept in kept_vectors)
+        ):
+            dropped['duplicates'] += 1
+            continue
+
+        tokens = estimate_tokens(result['document']) + (estimate_tokens(CONTEXT_SEPARATOR) if packed else 0)
+        if used_tokens + tokens > token_budget:
+            if packed:
+                dropped['budget'] += 1
+                continue
+            result = dict(result, document=result['document'][:token_budget * CHARS_PER_TOKEN])
+            tokens = estimate_tokens(result['document'])
+
+        packed.append(result)
+        kept_texts.add(text_key)
+        if vector is not None:
+            kept_vectors.append(vector)
+        used_tokens += tokens
+        previous_relevance = result['relevance']
+
+    tokens_before = estimate_tokens(CONTEXT_SEPARATOR.join(r['document'] for r in results))
+    tokens_after = estimate_tokens(CONTEXT_SEPARATOR.join(r['document'] for r in packed))
+
+    return packed, {
+        'chunks_before': len(results),
+        'chunks_after': len(packed),
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_saved': tokens_before - tokens_after,
+        'token_budget': token_budget,
+        'dropped': dropped
+    }
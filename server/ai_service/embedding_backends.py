@@ -0,0 +1,133 @@
+"""
+Embedding Backends for AI Service
+Pluggable query encoders: PyTorch SentenceTransformer or ONNX Runtime (optionally int8-quantized)
+"""
+
+import json
+import os
+import numpy as np
+
+# Configuration
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()  # 'torch' or 'onnx'
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("models", "all-MiniLM-L6-v2-onnx"))
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "1"))
+ONNX_PARITY_THRESHOLD = float(os.getenv("ONNX_PARITY_THRESHOLD", "0.98"))
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+EMBEDDING_CONFIG_FILE = "embedding_config.json"
+
+
+class SentenceTransformerBackend:
+    """Reference PyTorch encoder (imports torch on load)."""
+
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def encode(self, sentences):
+        return self.model.encode(sentences)
+
+
+class OnnxEmbeddingBackend:
+    """
+    ONNX Runtime encoder for the exported MiniLM transformer.
+    Reproduces the SentenceTransformer pipeline (mean pooling + L2
+    normalization) without importing torch.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = ONNX_QUANTIZED,
+                 num_threads: int = ONNX_NUM_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        config = {}
+        config_path = os.path.join(model_dir, EMBEDDING_CONFIG_FILE)
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=config.get("max_seq_length", 256))
+        self.tokenizer.enable_padding(pad_id=config.get("pad_token_id", 0), pad_token=config.get("pad_token", "[PAD]"))
+
+        model_file = ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.model_file = model_file
+
+    def encode(self, sentences):
+        single = isinstance(sentences, str)
+        batch = [sentences] if single else list(sentences)
+        if not batch:
+            return np.empty((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(batch)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+        return pooled[0] if single else pooled
+
+
+def embedding_model_id(backend: str = EMBEDDING_BACKEND) -> str:
+    """Identifies the vectors a backend produces (used in persistent cache keys)."""
+    if backend == "onnx":
+        return f"{EMBEDDING_MODEL_NAME}:onnx{'-int8' if ONNX_QUANTIZED else ''}"
+    return f"{EMBEDDING_MODEL_NAME}:{backend}"
+
+
+def load_embedding_backend(backend: str = EMBEDDING_BACKEND):
+    """Create the configured embedding backend."""
+    if backend == "onnx":
+        return OnnxEmbeddingBackend()
+    if backend == "torch":
+        return SentenceTransformerBackend()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Use 'torch' or 'onnx'.")
+
+
+def check_parity(reference, candidate, sentences: list, threshold: float = ONNX_PARITY_THRESHOLD) -> dict:
+    """
+    Compare two backends on the same sentences.
+
+    Returns:
+        dict with per-sentence cosine similarities, the minimum and
+        whether every sentence met the threshold.
+    """
+    expected = np.asarray(reference.encode(sentences), dtype=np.float32)
+    actual = np.asarray(candidate.encode(sentences), dtype=np.float32)
+
+    expected /= np.clip(np.linalg.norm(expected, axis=1, keepdims=True), 1e-12, None)
+    actual /= np.clip(np.linalg.norm(actual, axis=1, keepdims=True), 1e-12, None)
+    cosines = (expected * actual).sum(axis=1)
+
+    return {
+        "cosines": [round(float(c), 6) for c in cosines],
+        "min_cosine": round(float(cosines.min()), 6),
+        "threshold": threshold,
+        "passed": bool(cosines.min() >= threshold)
+    }
@@ -0,0 +1,228 @@
+"""
+Embedding Cache Module for AI Service
+Bounded, thread-safe LRU cache mapping normalized query text to embedding vectors,
+plus a persistent SQLite tier shared by workers and ingest.py that survives restarts
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+# Configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+PERSISTENT_EMBEDDING_CACHE_ENABLED = os.getenv("PERSISTENT_EMBEDDING_CACHE_ENABLED", "false").lower() == "true"
+# Kept outside db/, which ingest.py deletes on every run
+PERSISTENT_EMBEDDING_CACHE_PATH = os.getenv(
+    "PERSISTENT_EMBEDDING_CACHE_PATH", os.path.join("cache", "embeddings.sqlite3")
+)
+PERSISTENT_EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("PERSISTENT_EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+SQLITE_MAX_VARIABLES = 500
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share an entry."""
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU cache of query embeddings."""
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, text: str):
+        """
+        Look up the embedding for a query.
+
+        Returns:
+            The cached embedding as a list, or None on a miss.
+        """
+        key = normalize_query(text)
+
+        with self.lock:
+            embedding = self.entries.get(key)
+            if embedding is None:
+                return None
+
+            self.entries.move_to_end(key)
+            return list(embedding)
+
+    def put(self, text: str, embedding) -> bool:
+        """
+        Store the embedding for a query.
+
+        Returns:
+            True if the least recently used entry was evicted to make room.
+        """
+        key = normalize_query(text)
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return False
+
+            self.entries[key] = tuple(embedding)
+
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                return True
+
+            return False
+
+    def clear(self):
+        """Drop all cached embeddings."""
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class PersistentEmbeddingCache:
+    """
+    SQLite-backed embedding cache keyed by model id + normalized text hash.
+
+    Safe to share between processes (WAL mode, one connection per thread
+    per process). Entries carry a last-used timestamp; once the table grows
+    past `max_entries` the least recently used rows are deleted.
+    """
+
+    def __init__(self, path: str = PERSISTENT_EMBEDDING_CACHE_PATH,
+                 max_entries: int = PERSISTENT_EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.local = threading.local()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self.approx_count = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _key(model_id: str, text: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_id: str, texts: list) -> list:
+        """
+        Look up embeddings for several texts.
+
+        Returns:
+            One float32 array (or None on a miss) per text.
+        """
+        keys = [self._key(model_id, text) for text in texts]
+        found = {}
+        connection = self._connection()
+
+        for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+            chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+
+            hit_keys = [row[0] for row in rows]
+            if hit_keys:
+                with connection:
+                    connection.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [time.time(), *hit_keys]
+                    )
+
+        return [
+            np.frombuffer(found[key], dtype=np.float32).copy() if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, model_id: str, texts: list, vectors) -> int:
+        """
+        Store embeddings for several texts.
+
+        Returns:
+            The number of least recently used entries evicted.
+        """
+        now = time.time()
+        rows = [
+            (self._key(model_id, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        connection = self._connection()
+        with connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self.approx_count += connection.total_changes - before
+
+        if self.approx_count <= self.max_entries:
+            return 0
+        return self._evict()
+
+    def _evict(self) -> int:
+        connection = self._connection()
+        with connection:
+            evicted = connection.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        self.approx_count = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return max(evicted, 0)
+
+    def get(self, model_id: str, text: str):
+        """Returns the cached embedding as a list, or None on a miss."""
+        vector = self.get_many(model_id, [text])[0]
+        return vector.tolist() if vector is not None else None
+
+    def put(self, model_id: str, text: str, embedding) -> int:
+        return self.put_many(model_id, [text], [embedding])
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def create_persistent_embedding_cache():
+    """Open the configured persistent embedding cache, or None when disabled/unavailable."""
+    if not PERSISTENT_EMBEDDING_CACHE_ENABLED:
+        return None
+
+    try:
+        cache = PersistentEmbeddingCache()
+        print(f"✅ Persistent embedding cache at '{PERSISTENT_EMBEDDING_CACHE_PATH}' "
+              f"({cache.approx_count} entries, max {PERSISTENT_EMBEDDING_CACHE_MAX_ENTRIES})")
+        return cache
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️  Persistent embedding cache unavailable: {e}")
+        return None
+
+
+# Global query embedding cache
+query_embedding_cache = QueryEmbeddingCache(EMBEDDING_CACHE_SIZE) if EMBEDDING_CACHE_ENABLED else None
+
+if query_embedding_cache:
+    print(f"✅ Query embedding cache enabled (max {EMBEDDING_CACHE_SIZE} entries)")
@@ -0,0 +1,101 @@
+"""
+Embedding Dispatcher Module for AI Service
+Micro-batches concurrent single-query encode calls into one model forward pass
+"""
+
+import os
+import time
+import queue
+from concurrent.futures import Future
+from threading import Lock, Thread
+from monitoring import log_embedding_batch
+
+# Configuration
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "false").lower() == "true"
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "32"))
+
+
+class EmbeddingBatcher:
+    """
+    Wraps an embedding backend with the same encode() interface.
+
+    Single-string encode calls are queued; a background thread waits up to
+    `max_wait_ms` after the first pending request (or until `max_batch_size`
+    requests are queued) and runs them through one batched encode call.
+    """
+
+    def __init__(self, model, max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE,
+                 max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS):
+        self.model = model
+        self.name = getattr(model, "name", "unknown")
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.queue = queue.Queue()
+        self.lock = Lock()
+        self.worker = None
+        self.worker_pid = None
+
+    def _ensure_worker(self):
+        """Start the batching thread lazily, and again in each forked worker."""
+        with self.lock:
+            if self.worker is not None and self.worker.is_alive() and self.worker_pid == os.getpid():
+                return
+
+            if self.worker_pid != os.getpid():
+                # Requests queued before a fork belong to the parent process
+                self.queue = queue.Queue()
+
+            self.worker = Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self.worker_pid = os.getpid()
+            self.worker.start()
+
+    def encode(self, sentences):
+        # Callers that already batch go straight to the model
+        if not isinstance(sentences, str):
+            return self.model.encode(sentences)
+
+        self._ensure_worker()
+
+        future = Future()
+        self.queue.put((sentences, future, time.time()))
+        return future.result()
+
+    def _collect_batch(self) -> list:
+        batch = [self.queue.get()]
+        deadline = time.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            dispatch_time = time.time()
+
+            try:
+                vectors = self.model.encode([text for text, _, _ in batch])
+                for (_, future, _), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+            log_embedding_batch(len(batch), [dispatch_time - enqueued for _, _, enqueued in batch])
+
+
+def wrap_embedding_model(model):
+    """Return the model wrapped in a batcher when batching is enabled."""
+    if not EMBEDDING_BATCHING_ENABLED:
+        return model
+
+    print(f"✅ Embedding micro-batching enabled (wait {EMBEDDING_BATCH_WAIT_MS}ms, max batch {EMBEDDING_MAX_BATCH_SIZE})")
+    return EmbeddingBatcher(model, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS)
@@ -0,0 +1,197 @@
+"""
+Embedding Server Module for AI Service
+Sidecar process that owns the embedding model and serves batched encode requests
+to every gunicorn worker over a Unix socket, plus the client used by the workers
+
+Usage:
+    poetry run python embedding_server.py
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+from embedding_backends import load_embedding_backend, EMBEDDING_BACKEND
+from embedding_dispatcher import EmbeddingBatcher, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS
+from monitoring import log_embedding_server_event
+
+# Configuration
+EMBEDDING_SERVER_ENABLED = os.getenv("EMBEDDING_SERVER_ENABLED", "false").lower() == "true"
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/clinico-embedding.sock")
+EMBEDDING_SERVER_THREADS = int(os.getenv("EMBEDDING_SERVER_THREADS", "0"))  # 0 keeps the backend default
+EMBEDDING_SERVER_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SERVER_TIMEOUT_SECONDS", "10"))
+EMBEDDING_SERVER_RETRY_SECONDS = float(os.getenv("EMBEDDING_SERVER_RETRY_SECONDS", "30"))
+
+# Wire format: 4-byte big-endian length + JSON, followed for responses by
+# rows * dim float32 values
+HEADER = struct.Struct("!I")
+
+
+def _recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock, header: dict, payload: bytes = b""):
+    body = json.dumps(header).encode("utf-8")
+    sock.sendall(HEADER.pack(len(body)) + body + payload)
+
+
+def _recv_message(sock) -> dict:
+    (length,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return json.loads(_recv_exact(sock, length).decode("utf-8"))
+
+
+class EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    """Serves encode requests on one persistent worker connection."""
+
+    def handle(self):
+        while True:
+            try:
+                request = _recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            texts = request.get("texts", [])
+            try:
+                if len(texts) == 1:
+                    # Single queries from all workers are micro-batched together
+                    vectors = np.asarray(self.server.model.encode(texts[0]), dtype=np.float32)[None, :]
+                else:
+                    vectors = np.asarray(self.server.model.encode(texts), dtype=np.float32).reshape(len(texts), -1)
+            except Exception as e:
+                _send_message(self.request, {"error": str(e)})
+                continue
+
+            vectors = np.ascontiguousarray(vectors)
+            _send_message(self.request, {"rows": vectors.shape[0], "dim": vectors.shape[1]}, vectors.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self.model = model
+        super().__init__(socket_path, EmbeddingRequestHandler)
+
+
+class EmbeddingServerClient:
+    """
+    Worker-side encoder with the same encode() interface as the backends.
+
+    Each thread keeps its own socket to the sidecar (re-opened after a fork).
+    If the sidecar is unreachable the model is loaded in-process and used
+    until the sidecar is retried `retry_seconds` later.
+    """
+
+    name = "sidecar"
+
+    def __init__(self, socket_path: str = EMBEDDING_SERVER_SOCKET,
+                 timeout_seconds: float = EMBEDDING_SERVER_TIMEOUT_SECONDS,
+                 retry_seconds: float = EMBEDDING_SERVER_RETRY_SECONDS,
+                 fallback_backend: str = EMBEDDING_BACKEND):
+        self.socket_path = socket_path
+        self.timeout_seconds = timeout_seconds
+        self.retry_seconds = retry_seconds
+        self.fallback_backend = fallback_backend
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.fallback_model = None
+        self.retry_at = 0.0
+
+    def _connection(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None and getattr(self.local, "pid", None) == os.getpid():
+            return sock
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout_seconds)
+        sock.connect(self.socket_path)
+        self.local.sock = sock
+        self.local.pid = os.getpid()
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self.local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self.local.sock = None
+
+    def _remote_encode(self, texts: list) -> np.ndarray:
+        sock = self._connection()
+        _send_message(sock, {"texts": texts})
+        header = _recv_message(sock)
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+
+        rows, dim = header["rows"], header["dim"]
+        payload = _recv_exact(sock, rows * dim * 4)
+        return np.frombuffer(payload, dtype=np.float32).reshape(rows, dim)
+
+    def _local_model(self):
+        with self.lock:
+            if self.fallback_model is None:
+                print(f"⚠️  Loading in-process '{self.fallback_backend}' embedding model as fallback")
+                self.fallback_model = load_embedding_backend(self.fallback_backend)
+            return self.fallback_model
+
+    def encode(self, sentences):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        if time.time() >= self.retry_at:
+            try:
+                vectors = self._remote_encode(texts)
+                log_embedding_server_event('remote')
+                return vectors[0] if single else vectors
+            except Exception as e:
+                self._drop_connection()
+                self.retry_at = time.time() + self.retry_seconds
+                print(f"  ⚠️  Embedding server unavailable ({e}), falling back to in-process model")
+
+        log_embedding_server_event('fallback')
+        return self._local_model().encode(sentences)
+
+
+def main():
+    print(f"--- Starting embedding server with '{EMBEDDING_BACKEND}' backend ---")
+    model = load_embedding_backend(EMBEDDING_BACKEND)
+
+    # ONNX Runtime threads are set by ONNX_NUM_THREADS
+    if EMBEDDING_SERVER_THREADS > 0 and model.name == "torch":
+        import torch
+        torch.set_num_threads(EMBEDDING_SERVER_THREADS)
+        print(f"  -> Torch threads: {EMBEDDING_SERVER_THREADS}")
+
+    server = EmbeddingServer(
+        EMBEDDING_SERVER_SOCKET,
+        EmbeddingBatcher(model, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_BATCH_WAIT_MS)
+    )
+    print(f"✅ Embedding server listening on '{EMBEDDING_SERVER_SOCKET}' "
+          f"(wait {EMBEDDING_BATCH_WAIT_MS}ms, max batch {EMBEDDING_MAX_BATCH_SIZE})")
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(EMBEDDING_SERVER_SOCKET):
+            os.remove(EMBEDDING_SERVER_SOCKET)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Exports the MiniLM embedding model to ONNX (plus an int8-quantized copy),
+checks parity against the PyTorch vectors and reports per-query encode latency.
+
+Usage:
+    poetry run python export_onnx.py
+"""
+
+import json
+import os
+import sys
+import time
+import numpy as np
+from embedding_backends import (
+    EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_PARITY_THRESHOLD,
+    ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE, EMBEDDING_CONFIG_FILE,
+    SentenceTransformerBackend, OnnxEmbeddingBackend, check_parity
+)
+
+PARITY_SENTENCES = [
+    "what are symptoms of diabetes",
+    "What are the side effects of paracetamol 650mg tablet?",
+    "I have been feeling anxious and can't sleep at night",
+    "red itchy rash on my arm that spreads",
+    "Is azithromycin safe to take with alcohol",
+    "chest pain after climbing stairs",
+    "substitute for Dolo 650",
+    "how to manage stress during exams"
+]
+LATENCY_ROUNDS = 50
+
+
+def export_model(reference: SentenceTransformerBackend, output_dir: str):
+    """Export the transformer body to ONNX and save the fast tokenizer."""
+    import torch
+
+    transformer = reference.model[0].auto_model
+    tokenizer = reference.model.tokenizer
+    transformer.eval()
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            os.path.join(output_dir, ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17
+        )
+
+    tokenizer.save_pretrained(output_dir)
+
+    with open(os.path.join(output_dir, EMBEDDING_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": EMBEDDING_MODEL_NAME,
+            "max_seq_length": reference.model.max_seq_length,
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id
+        }, f, indent=2)
+
+
+def quantize_model(output_dir: str):
+    """Write an int8 dynamically-quantized copy of the exported model."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(
+        os.path.join(output_dir, ONNX_MODEL_FILE),
+        os.path.join(output_dir, ONNX_QUANTIZED_MODEL_FILE),
+        weight_type=QuantType.QInt8
+    )
+
+
+def measure_latency(backend, sentences: list) -> dict:
+    """Time single-query encodes, the shape of traffic on the request path."""
+    backend.encode(sentences[0])  # warm up
+
+    durations = []
+    for i in range(LATENCY_ROUNDS):
+        start = time.perf_counter()
+        backend.encode(sentences[i % len(sentences)])
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "avg_ms": round(float(np.mean(durations)), 2),
+        "p95_ms": round(float(np.percentile(durations, 95)), 2)
+    }
+
+
+def main():
+    print(f"--- Exporting '{EMBEDDING_MODEL_NAME}' to ONNX ---")
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+
+    reference = SentenceTransformerBackend(EMBEDDING_MODEL_NAME)
+    export_model(reference, ONNX_MODEL_DIR)
+    print(f"✅ Exported ONNX model to '{ONNX_MODEL_DIR}'")
+
+    quantize_model(ONNX_MODEL_DIR)
+    print("✅ Wrote int8-quantized model")
+
+    all_passed = True
+    print(f"\n{'Backend':<16}{'Min cosine':>12}{'Avg ms':>10}{'P95 ms':>10}")
+    torch_latency = measure_latency(reference, PARITY_SENTENCES)
+    print(f"{'torch':<16}{1.0:>12.4f}{torch_latency['avg_ms']:>10}{torch_latency['p95_ms']:>10}")
+
+    for quantized in (False, True):
+        candidate = OnnxEmbeddingBackend(ONNX_MODEL_DIR, quantized=quantized)
+        parity = check_parity(reference, candidate, PARITY_SENTENCES, ONNX_PARITY_THRESHOLD)
+        latency = measure_latency(candidate, PARITY_SENTENCES)
+        label = "onnx-int8" if quantized else "onnx-fp32"
+
+        print(f"{label:<16}{parity['min_cosine']:>12.4f}{latency['avg_ms']:>10}{latency['p95_ms']:>10}")
+        if not parity['passed']:
+            print(f"❌ {label} failed parity: min cosine {parity['min_cosine']} < {ONNX_PARITY_THRESHOLD}")
+            all_passed = False
+
+    if not all_passed:
+        sys.exit(1)
+
+    print(f"\n✅ Parity check passed (cosine >= {ONNX_PARITY_THRESHOLD}). Set EMBEDDING_BACKEND=onnx to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Gunicorn Configuration for AI Service
+Starts the background warmup in each worker as soon as it is forked (LAZY_INIT_ENABLED=true)
+"""
+
+
+def post_fork(server, worker):
+    import main
+
+    if main.LAZY_INIT_ENABLED:
+        server.log.info(f"Worker {worker.pid}: starting background warmup")
+        main.start_background_warmup()
@@ -0,0 +1,199 @@
+"""
+HTTP Client Module for AI Service
+Shared, fork-safe requests session with per-host keep-alive connection pools,
+default timeouts and pool usage metrics for all outbound calls, plus the
+httpx async client used by the ASGI app
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from monitoring import log_http_pool_checkout, log_http_pool_active
+
+# Configuration
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # number of hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))  # keep-alive connections per host
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() == "true"  # wait for a free connection when full
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+HTTP_LLM_READ_TIMEOUT = float(os.getenv("HTTP_LLM_READ_TIMEOUT", "120"))
+HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv("HTTP_ASYNC_MAX_CONNECTIONS", "200"))  # ASGI mode, across all hosts
+
+# Timeouts for calls that wait on model generation
+LLM_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_LLM_READ_TIMEOUT)
+
+
+def _host_label(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.hostname}:{parsed.port or (443 if parsed.scheme == 'https' else 80)}"
+
+
+class _WaitTimingMixin:
+    """
+    Times how long each request waits to check a connection out of the pool
+    and how many idle keep-alive connections were available.
+    """
+
+    def _get_conn(self, timeout=None):
+        # Unused slots are None placeholders; real entries are idle connections
+        idle = sum(1 for conn in list(self.pool.queue) if conn is not None) if self.pool is not None else 0
+        start = time.perf_counter()
+        try:
+            return super()._get_conn(timeout=timeout)
+        finally:
+            log_http_pool_checkout(f"{self.host}:{self.port}", time.perf_counter() - start, idle)
+
+
+class InstrumentedHTTPConnectionPool(_WaitTimingMixin, HTTPConnectionPool):
+    pass
+
+
+class InstrumentedHTTPSConnectionPool(_WaitTimingMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that applies default timeouts and reports in-flight
+    requests per host.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.active = defaultdict(int)
+        self.active_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": InstrumentedHTTPConnectionPool,
+            "https": InstrumentedHTTPSConnectionPool
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+        host = _host_label(request.url)
+        with self.active_lock:
+            self.active[host] += 1
+            log_http_pool_active(host, self.active[host])
+
+        try:
+            return super().send(request, timeout=timeout, **kwargs)
+        finally:
+            with self.active_lock:
+                self.active[host] -= 1
+                log_http_pool_active(host, self.active[host])
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return this process's shared session. A new one is created after a
+    fork so gunicorn workers never share sockets with the master.
+    """
+    global _session, _session_pid
+    if _session is not None and _session_pid == os.getpid():
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = PooledHTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                pool_block=HTTP_POOL_BLOCK
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+    return _session
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return get_session().get(url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return get_session().post(url, **kwargs)
+
+
+# --- Async client (ASGI mode) ---
+_async_client = None
+_async_active = defaultdict(int)
+
+
+def _async_timeout(timeout):
+    import httpx
+
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def get_async_client():
+    """
+    Return the shared httpx.AsyncClient. It is created on first use inside
+    the worker's event loop and closed by close_async_client() at shutdown.
+    """
+    global _async_client
+    if _async_client is None:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            timeout=_async_timeout(None),
+            limits=httpx.Limits(
+                max_connections=HTTP_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE
+            )
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+@contextmanager
+def _track_async_request(url: str):
+    # Runs on the event loop thread only, so the counters need no lock
+    host = _host_label(url)
+    _async_active[host] += 1
+    log_http_pool_active(host, _async_active[host])
+    try:
+        yield
+    finally:
+        _async_active[host] -= 1
+        log_http_pool_active(host, _async_active[host])
+
+
+async def async_http_post(url: str, timeout=None, **kwargs):
+    """POST with the shared async client; timeout accepts the same (connect, read) tuples."""
+    with _track_async_request(url):
+        return await get_async_client().post(url, timeout=_async_timeout(timeout), **kwargs)
+
+
+@asynccontextmanager
+async def async_http_stream(method: str, url: str, timeout=None, **kwargs):
+    """Streaming request with the shared async client, used as `async with`."""
+    with _track_async_request(url):
+        async with get_async_client().stream(method, url, timeout=_async_timeout(timeout), **kwargs) as response:
+            yield response
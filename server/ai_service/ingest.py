@@ -4,12 +4,45 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from tqdm import tqdm
 from sentence_transformers import SentenceTransformer
 import shutil
+import numpy as np
+from numpy_index import export_numpy_index, NUMPY_INDEX_DIR
+from lexical_index import build_lexical_index, LEXICAL_INDEX_DIR
+from retrieval_cache import write_index_version, INDEX_VERSION_FILE
+from embedding_cache import create_persistent_embedding_cache
+from embedding_backends import embedding_model_id
 
 KNOWLEDGE_BASE_DIR = "knowledge_base"
 DB_PATH = "db"
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 BATCH_SIZE = 64 
 
+# Unified mode writes every subdirectory into one collection tagged with a
+# `collection` metadata field instead of one collection per subdirectory.
+UNIFIED_INDEX_ENABLED = os.getenv("UNIFIED_INDEX_ENABLED", "false").lower() == "true"
+UNIFIED_COLLECTION_NAME = "clinico_unified"
+
+# Chunk vectors are stored in the persistent embedding cache (when enabled), so
+# re-ingesting unchanged chunks skips the model
+EMBEDDING_MODEL_ID = embedding_model_id("torch")
+
+def encode_with_cache(embedding_model, embedding_cache, chunks: list) -> tuple:
+    """
+    Encode chunks, reusing vectors from the persistent embedding cache.
+    Returns (embeddings as lists, number of cache hits).
+    """
+    if embedding_cache is None:
+        return embedding_model.encode(chunks).tolist(), 0
+
+    vectors = embedding_cache.get_many(EMBEDDING_MODEL_ID, chunks)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        encoded = embedding_model.encode([chunks[i] for i in missing])
+        embedding_cache.put_many(EMBEDDING_MODEL_ID, [chunks[i] for i in missing], encoded)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+
+    return [np.asarray(vector, dtype=np.float32).tolist() for vector in vectors], len(chunks) - len(missing)
+
 def get_text_files(directory: str) -> list[str]:
     """Finds all .txt files in the specified directory and its subdirectories."""
     text_files = []
@@ -21,7 +54,8 @@ def get_text_files(directory: str) -> list[str]:
 
 def main():
     """
-    Processes .txt files from subdirectories into separate ChromaDB collections,
+    Processes .txt files from subdirectories into separate ChromaDB collections
+    (or a single unified collection when UNIFIED_INDEX_ENABLED is set),
     using a specialized embedding model.
     """
     print("--- Starting Knowledge Base Ingestion (Multi-Collection) ---")
@@ -34,6 +68,8 @@ def main():
         print(f"Failed to load the SentenceTransformer model: {e}")
         return
 
+    embedding_cache = create_persistent_embedding_cache()
+
     try:
         if os.path.exists(DB_PATH):
             print(f"Removing old database at '{DB_PATH}'...")
@@ -51,17 +87,29 @@ def main():
         return
 
     collections = {}
-    for subdir in subdirectories:
-        collection_name = f"clinico_{subdir}"
+    if UNIFIED_INDEX_ENABLED:
         try:
-            collections[subdir] = client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}
+            unified_collection = client.get_or_create_collection(
+                name=UNIFIED_COLLECTION_NAME,
+                metadata={"hnsw:space": "cosine", "subsets": ",".join(sorted(subdirectories))}
             )
-            print(f"  -> Collection '{collection_name}' is ready.")
+            collections = {subdir: unified_collection for subdir in subdirectories}
+            print(f"  -> Unified collection '{UNIFIED_COLLECTION_NAME}' is ready for subsets: {sorted(subdirectories)}")
         except Exception as e:
-            print(f"Failed to get or create collection for '{subdir}': {e}")
+            print(f"Failed to get or create unified collection '{UNIFIED_COLLECTION_NAME}': {e}")
             return
+    else:
+        for subdir in subdirectories:
+            collection_name = f"clinico_{subdir}"
+            try:
+                collections[subdir] = client.get_or_create_collection(
+                    name=collection_name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+                print(f"  -> Collection '{collection_name}' is ready.")
+            except Exception as e:
+                print(f"Failed to get or create collection for '{subdir}': {e}")
+                return
 
     try:
         for subdir, collection in collections.items():
@@ -85,7 +133,7 @@ def main():
                 text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
                 file_chunks = text_splitter.split_text(text)
                 
-                file_metadatas = [{"source": relative_path}] * len(file_chunks)
+                file_metadatas = [{"source": relative_path, "collection": subdir}] * len(file_chunks)
                 all_chunks.extend(file_chunks)
                 all_metadatas.extend(file_metadatas)
 
@@ -93,12 +141,14 @@ def main():
             if total_chunks == 0: continue
 
             print(f"  -> Total chunks to ingest for this collection: {total_chunks}")
+            cache_hits = 0
 
             for i in tqdm(range(0, total_chunks, BATCH_SIZE), desc=f"Embedding '{subdir}'"):
                 batch_chunks = all_chunks[i:i + BATCH_SIZE]
                 batch_metadatas = all_metadatas[i:i + BATCH_SIZE]
                 
-                batch_embeddings = embedding_model.encode(batch_chunks).tolist()
+                batch_embeddings, batch_hits = encode_with_cache(embedding_model, embedding_cache, batch_chunks)
+                cache_hits += batch_hits
 
                 batch_ids = [f"{meta['source']}_{j}" for j, meta in zip(range(i, i + len(batch_chunks)), batch_metadatas)]
 
@@ -109,11 +159,35 @@ def main():
                     metadatas=batch_metadatas
                 )
             
-            print(f"Successfully ingested {total_chunks} chunks into '{collection.name}'.")
+            print(f"Successfully ingested {total_chunks} chunks from '{subdir}' into '{collection.name}'.")
+            if embedding_cache is not None:
+                print(f"  -> Reused {cache_hits}/{total_chunks} cached embeddings ({cache_hits / total_chunks * 100:.1f}%)")
 
     except Exception as e:
         print(f"\nAn error occurred during the ingestion process: {e}")
 
+    # Export each collection for the NumPy exact-search backend (RETRIEVAL_BACKEND=numpy)
+    try:
+        print(f"\nExporting NumPy search indexes to '{NUMPY_INDEX_DIR}'...")
+        for collection in {c.name: c for c in collections.values()}.values():
+            index_dir = export_numpy_index(collection, NUMPY_INDEX_DIR)
+            print(f"  -> Exported '{collection.name}' to '{index_dir}'")
+    except Exception as e:
+        print(f"\nAn error occurred while exporting NumPy indexes: {e}")
+
+    # Build the BM25 inverted indexes used by hybrid retrieval (HYBRID_RETRIEVAL_ENABLED=true)
+    try:
+        print(f"\nBuilding lexical (BM25) indexes in '{LEXICAL_INDEX_DIR}'...")
+        for collection in {c.name: c for c in collections.values()}.values():
+            index_dir = build_lexical_index(collection, LEXICAL_INDEX_DIR)
+            print(f"  -> Indexed '{collection.name}' to '{index_dir}'")
+    except Exception as e:
+        print(f"\nAn error occurred while building lexical indexes: {e}")
+
+    # Stamp the rebuilt index so cached retrievals from older builds are ignored
+    version = write_index_version(INDEX_VERSION_FILE)
+    print(f"\nIndex version '{version}' written to '{INDEX_VERSION_FILE}'.")
+
     print("\n--- Ingestion Process Finished ---")
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Intent Classifier Module for AI Service
+Nearest-centroid intent classifier over query embeddings, built offline from
+labeled exemplar queries so most requests skip the LLM classification call
+
+Usage:
+    poetry run python intent_classifier.py
+"""
+
+import json
+import os
+import time
+import numpy as np
+
+# Configuration
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+INTENT_CLASSIFIER_PATH = os.getenv("INTENT_CLASSIFIER_PATH", os.path.join("models", "intent_classifier.npz"))
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.7"))  # below this, ask the LLM
+INTENT_CLASSIFIER_TEMPERATURE = 0.05  # softmax temperature over cosine similarities
+INTENT_EXEMPLARS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_exemplars.json")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class IntentClassifier:
+    """
+    One unit-length centroid per label. A label maps to the intent data the
+    orchestrator expects (intent, collections, needs_appointment,
+    requires_vision), so several labels may share an intent.
+    """
+
+    def __init__(self, labels: list, centroids, outputs: dict, model_id: str):
+        self.labels = list(labels)
+        self.centroids = _normalize(centroids)
+        self.outputs = outputs
+        self.model_id = model_id
+
+    @classmethod
+    def build(cls, exemplars: dict, embeddings_by_label: dict, model_id: str):
+        """Build from the exemplar file's label definitions and each label's example embeddings."""
+        labels = sorted(embeddings_by_label)
+        centroids = np.stack([_normalize(embeddings_by_label[label]).mean(axis=0) for label in labels])
+        outputs = {
+            label: {
+                "intent": exemplars[label].get("intent", label),
+                "collections": exemplars[label].get("collections", []),
+                "needs_appointment": exemplars[label].get("needs_appointment", False),
+                "requires_vision": exemplars[label].get("requires_vision", False)
+            }
+            for label in labels
+        }
+        return cls(labels, centroids, outputs, model_id)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            centroids=self.centroids,
+            labels=np.array(self.labels),
+            meta=np.array(json.dumps({"model_id": self.model_id, "outputs": self.outputs}))
+        )
+
+    @classmethod
+    def load(cls, path: str):
+        arrays = np.load(path)
+        meta = json.loads(str(arrays["meta"]))
+        return cls([str(label) for label in arrays["labels"]], arrays["centroids"], meta["outputs"], meta["model_id"])
+
+    def classify(self, query_embedding) -> tuple:
+        """
+        Returns:
+            (label: str, confidence: float), where confidence is the softmax
+            probability of the best label over all labels.
+        """
+        similarities = self.centroids @ _normalize(query_embedding)
+        weights = np.exp((similarities - similarities.max()) / INTENT_CLASSIFIER_TEMPERATURE)
+        best = int(np.argmax(similarities))
+        return self.labels[best], float(weights[best] / weights.sum())
+
+
+def load_intent_classifier(path: str = INTENT_CLASSIFIER_PATH, model_id: str = None):
+    """
+    Load the classifier artifact, or return None (LLM classification only)
+    when it is disabled, missing or built with a different embedding model.
+    """
+    if not INTENT_CLASSIFIER_ENABLED:
+        return None
+    if not os.path.isfile(path):
+        print(f"⚠️  Intent classifier '{path}' not found; run intent_classifier.py to build it. Using LLM classification.")
+        return None
+
+    classifier = IntentClassifier.load(path)
+    if model_id is not None and classifier.model_id != model_id:
+        print(f"⚠️  Intent classifier was built with '{classifier.model_id}', not '{model_id}'. Using LLM classification.")
+        return None
+
+    print(f"✅ Intent classifier loaded ({len(classifier.labels)} labels, threshold {INTENT_CLASSIFIER_THRESHOLD})")
+    return classifier
+
+
+def main():
+    from embedding_backends import load_embedding_backend, embedding_model_id, EMBEDDING_BACKEND
+
+    with open(INTENT_EXEMPLARS_FILE, "r", encoding="utf-8") as f:
+        exemplars = json.load(f)["labels"]
+
+    print(f"--- Building intent classifier with '{EMBEDDING_BACKEND}' backend ---")
+    model = load_embedding_backend(EMBEDDING_BACKEND)
+    embeddings_by_label = {
+        label: np.asarray(model.encode(definition["examples"]), dtype=np.float32)
+        for label, definition in exemplars.items()
+    }
+
+    # Leave-one-out check: how often each exemplar would be accepted and correct
+    accepted = correct = total = 0
+    for label, embeddings in embeddings_by_label.items():
+        for position in range(len(embeddings)):
+            held_out = dict(embeddings_by_label)
+            held_out[label] = np.delete(embeddings, position, axis=0)
+            predicted, confidence = IntentClassifier.build(exemplars, held_out, "").classify(embeddings[position])
+            total += 1
+            if confidence >= INTENT_CLASSIFIER_THRESHOLD:
+                accepted += 1
+                correct += exemplars[predicted].get("intent", predicted) == exemplars[label].get("intent", label)
+
+    classifier = IntentClassifier.build(exemplars, embeddings_by_label, embedding_model_id(EMBEDDING_BACKEND))
+    classifier.save(INTENT_CLASSIFIER_PATH)
+
+    start = time.perf_counter()
+    for embeddings in embeddings_by_label.values():
+        for embedding in embeddings:
+            classifier.classify(embedding)
+    per_query_ms = (time.perf_counter() - start) * 1000 / max(total, 1)
+
+    print(f"  -> Leave-one-out: {accepted}/{total} accepted at threshold {INTENT_CLASSIFIER_THRESHOLD}, "
+          f"{correct}/{max(accepted, 1)} of those correct")
+    print(f"  -> Classification time: {per_query_ms:.3f} ms per query (excluding embedding)")
+    print(f"✅ Intent classifier saved to '{INTENT_CLASSIFIER_PATH}'")
+
+
+if __name__ == "__main__":
+    main()
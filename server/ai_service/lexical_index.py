@@ -0,0 +1,191 @@
+"""
+Lexical Index Module for AI Service
+Compact on-disk BM25 inverted index built at ingest time, plus reciprocal
+rank fusion for hybrid lexical + vector retrieval
+"""
+
+import json
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+# Configuration
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join("db", "lexical_index"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+POSTINGS_FILE = "postings.npz"
+VOCABULARY_FILE = "vocabulary.json"
+
+# Keeps dosage strings and hyphenated brand names ("500mg", "0.5", "a-cet") intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "should", "that", "the",
+    "this", "to", "what", "when", "which", "who", "why", "with", "you", "your"
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word/number tokens with common stopwords removed."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 inverted index stored as CSR-style postings arrays.
+    Row positions line up with the ids list, which holds Chroma chunk ids.
+    """
+
+    def __init__(self, ids: list, labels: list, vocabulary: dict, postings_offsets, postings_docs,
+                 postings_tfs, doc_lengths, label_names: list):
+        self.ids = ids
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.label_names = label_names
+        self.label_codes = {name: code for code, name in enumerate(label_names)}
+        self.vocabulary = vocabulary
+        self.postings_offsets = postings_offsets
+        self.postings_docs = postings_docs
+        self.postings_tfs = postings_tfs
+        self.doc_lengths = doc_lengths.astype(np.float32)
+
+        doc_count = len(ids)
+        self.avg_doc_length = float(self.doc_lengths.mean()) if doc_count else 0.0
+        doc_freqs = np.diff(postings_offsets).astype(np.float32)
+        self.idf = np.log(1 + (doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, ids: list, documents: list, subsets: list):
+        """Build an index from chunk ids, texts and their subset names."""
+        postings = defaultdict(list)
+        doc_lengths = []
+
+        for position, document in enumerate(documents):
+            tokens = tokenize(document or "")
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((position, tf))
+
+        vocabulary = {term: term_id for term_id, term in enumerate(sorted(postings))}
+        offsets = [0]
+        docs, tfs = [], []
+        for term in sorted(postings):
+            for position, tf in postings[term]:
+                docs.append(position)
+                tfs.append(tf)
+            offsets.append(len(docs))
+
+        label_names = sorted(set(subsets))
+        label_codes = {name: code for code, name in enumerate(label_names)}
+
+        return cls(
+            ids=list(ids),
+            labels=[label_codes[subset] for subset in subsets],
+            vocabulary=vocabulary,
+            postings_offsets=np.array(offsets, dtype=np.int64),
+            postings_docs=np.array(docs, dtype=np.int32),
+            postings_tfs=np.array(tfs, dtype=np.uint16),
+            doc_lengths=np.array(doc_lengths, dtype=np.int32),
+            label_names=label_names
+        )
+
+    def save(self, index_dir: str):
+        os.makedirs(index_dir, exist_ok=True)
+        np.savez_compressed(
+            os.path.join(index_dir, POSTINGS_FILE),
+            postings_offsets=self.postings_offsets,
+            postings_docs=self.postings_docs,
+            postings_tfs=self.postings_tfs,
+            doc_lengths=self.doc_lengths.astype(np.int32),
+            labels=self.labels
+        )
+        with open(os.path.join(index_dir, VOCABULARY_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "labels": self.label_names, "vocabulary": self.vocabulary}, f)
+
+    @classmethod
+    def load(cls, index_dir: str):
+        with open(os.path.join(index_dir, VOCABULARY_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(os.path.join(index_dir, POSTINGS_FILE))
+
+        return cls(
+            ids=meta["ids"],
+            labels=arrays["labels"],
+            vocabulary=meta["vocabulary"],
+            postings_offsets=arrays["postings_offsets"],
+            postings_docs=arrays["postings_docs"],
+            postings_tfs=arrays["postings_tfs"],
+            doc_lengths=arrays["doc_lengths"],
+            label_names=meta["labels"]
+        )
+
+    def search(self, query: str, n_results: int, subsets: list = None) -> list:
+        """
+        Score documents against the query with BM25.
+
+        Returns:
+            List of (chunk_id, score) pairs, best first; only documents
+            containing at least one query term are returned.
+        """
+        term_ids = [self.vocabulary[term] for term in set(tokenize(query)) if term in self.vocabulary]
+        if not term_ids or not self.ids:
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / max(self.avg_doc_length, 1e-9))
+        for term_id in term_ids:
+            start, end = self.postings_offsets[term_id], self.postings_offsets[term_id + 1]
+            docs = self.postings_docs[start:end]
+            tfs = self.postings_tfs[start:end].astype(np.float32)
+            scores[docs] += self.idf[term_id] * tfs * (BM25_K1 + 1) / (tfs + length_norm[docs])
+
+        if subsets is not None:
+            codes = [self.label_codes[name] for name in subsets if name in self.label_codes]
+            scores[~np.isin(self.labels, codes)] = 0
+
+        matched = np.flatnonzero(scores > 0)
+        if matched.size == 0:
+            return []
+
+        k = min(n_results, matched.size)
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[position], float(scores[position])) for position in top]
+
+
+def build_lexical_index(collection, output_dir: str = LEXICAL_INDEX_DIR) -> str:
+    """Build and save the BM25 index for a Chroma collection."""
+    data = collection.get(include=["documents", "metadatas"])
+    subsets = [(meta or {}).get("collection", "") for meta in data['metadatas']]
+
+    index_dir = os.path.join(output_dir, collection.name)
+    BM25Index.build(data['ids'], data['documents'], subsets).save(index_dir)
+    return index_dir
+
+
+def load_lexical_indexes(index_root: str = LEXICAL_INDEX_DIR) -> dict:
+    """Load every saved BM25 index, keyed by collection name."""
+    if not os.path.isdir(index_root):
+        return {}
+
+    return {
+        entry: BM25Index.load(os.path.join(index_root, entry))
+        for entry in sorted(os.listdir(index_root))
+        if os.path.isfile(os.path.join(index_root, entry, VOCABULARY_FILE))
+    }
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuse several ranked id lists.
+
+    Returns:
+        List of (id, fused_score) pairs, best first.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking):
+            fused[item_id] += 1.0 / (k + rank + 1)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
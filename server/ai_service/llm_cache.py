@@ -0,0 +1,106 @@
+"""
+LLM Cache Module for AI Service
+Memoizes deterministic (temperature 0) LLM calls keyed by backend, model, system
+prompt hash and user input, with an in-process L1 and optional Redis L2 shared
+across workers
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+import redis
+
+# Configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_REDIS_ENABLED = os.getenv("LLM_CACHE_REDIS_ENABLED", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", None)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier cache of model outputs for calls that are deterministic given their inputs."""
+
+    def __init__(self, ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, redis_url: str = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()  # key -> (expires_at, output)
+        self.lock = Lock()
+        self.redis_client = redis.from_url(redis_url, decode_responses=True) if redis_url else None
+
+    def _key(self, backend: str, model: str, system_prompt: str, user_input: str) -> str:
+        # Prompt templates are hashed separately so editing one invalidates only its entries
+        payload = json.dumps([backend, model, _digest(system_prompt or ""), user_input.strip()])
+        return f"llm_cache:{_digest(payload)}"
+
+    def get(self, backend: str, model: str, system_prompt: str, user_input: str) -> tuple:
+        """
+        Look up a memoized model output.
+
+        Returns:
+            (output: str or None, tier: 'l1', 'l2' or None)
+        """
+        key = self._key(backend, model, system_prompt, user_input)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    return entry[1], 'l1'
+                del self.entries[key]
+
+        if self.redis_client is not None:
+            try:
+                output = self.redis_client.get(key)
+            except Exception as e:
+                print(f"  ⚠️  LLM cache L2 read failed: {e}")
+                output = None
+
+            if output is not None:
+                self._store_local(key, output)
+                return output, 'l2'
+
+        return None, None
+
+    def set(self, backend: str, model: str, system_prompt: str, user_input: str, output: str):
+        """Memoize a model output in both tiers."""
+        key = self._key(backend, model, system_prompt, user_input)
+        self._store_local(key, output)
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, output, ex=self.ttl_seconds)
+            except Exception as e:
+                print(f"  ⚠️  LLM cache L2 write failed: {e}")
+
+    def _store_local(self, key: str, output: str):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl_seconds, output)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def create_llm_cache():
+    """Create the configured LLM cache, or None when disabled."""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    redis_url = REDIS_URL if LLM_CACHE_REDIS_ENABLED else None
+    try:
+        cache = LLMCache(redis_url=redis_url)
+        print(f"✅ LLM cache enabled ({'L1 + Redis L2' if redis_url else 'L1 only'})")
+    except Exception as e:
+        print(f"⚠️  Redis connection failed, using L1-only LLM cache: {e}")
+        cache = LLMCache()
+    return cache
@@ -0,0 +1,205 @@
+"""
+LLM Router Module for AI Service
+Sends each LLM call to the primary backend (Gemini or the OpenAI-compatible
+server) and, when it is slower than its recent p95 or fails (including failing
+fast on an open circuit breaker), hedges to the other backend and returns
+whichever answers first
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from circuit_breaker import get_breaker, CircuitOpenError
+from monitoring import log_llm_backend_call, log_llm_hedge_event
+
+# Configuration
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "5"))  # until enough samples
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "16"))  # also bounds orphaned losing calls
+LLM_LATENCY_WINDOW = 200  # recent calls per backend and call site
+
+BACKENDS = ("gemini", "openai_compat")
+
+
+def other_backend(backend: str) -> str:
+    return BACKENDS[1] if backend == BACKENDS[0] else BACKENDS[0]
+
+
+class LLMRouter:
+    """
+    `call(call_site, primary, fn)` runs `fn(backend)` and returns
+    (result, backend that produced it).
+
+    Latencies are tracked per (backend, call site), since an intent
+    classification and a full answer take very different times. Losing async
+    calls are cancelled. Threads cannot be cancelled, so losing sync calls
+    finish in the background on the hedge pool; together with the calls
+    being raced they are capped at `max_workers`. While the pool is full,
+    calls go to the primary on the caller's thread without hedging rather
+    than queueing behind orphaned calls.
+    """
+
+    def __init__(self, hedging_enabled: bool = LLM_HEDGING_ENABLED,
+                 percentile: float = LLM_HEDGE_PERCENTILE,
+                 min_delay: float = LLM_HEDGE_MIN_DELAY_SECONDS,
+                 default_delay: float = LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+                 min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 max_workers: int = LLM_HEDGE_WORKERS):
+        self.hedging_enabled = hedging_enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.latencies = defaultdict(lambda: deque(maxlen=LLM_LATENCY_WINDOW))
+        self.lock = threading.Lock()
+        self.executor = None
+        self.in_flight = 0  # calls running or queued on the hedge pool
+
+    def hedge_delay(self, backend: str, call_site: str) -> float:
+        """How long to wait on `backend` before hedging: its recent p95 for this call site."""
+        with self.lock:
+            samples = sorted(self.latencies[(backend, call_site)])
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = max(int(len(samples) * self.percentile / 100) - 1, 0)
+        return max(self.min_delay, samples[index])
+
+    def _record(self, backend: str, call_site: str, start_time: float, ok: bool):
+        duration = time.time() - start_time
+        if ok:
+            with self.lock:
+                self.latencies[(backend, call_site)].append(duration)
+        log_llm_backend_call(backend, duration, ok)
+
+    def _timed(self, backend: str, call_site: str, fn):
+        start_time = time.time()
+        try:
+            with get_breaker(backend).track():
+                result = fn(backend)
+        except CircuitOpenError:
+            raise
+        except Exception:
+            self._record(backend, call_site, start_time, False)
+            raise
+        self._record(backend, call_site, start_time, True)
+        return result
+
+    def _done(self, future):
+        with self.lock:
+            self.in_flight -= 1
+
+    def _submit(self, backend: str, call_site: str, fn):
+        """Run a call on the hedge pool, or return None when every hedge worker is taken."""
+        with self.lock:
+            if self.in_flight >= self.max_workers:
+                return None
+            self.in_flight += 1
+            if self.executor is None:
+                # Created on first use so no threads exist before gunicorn forks
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-hedge")
+        future = self.executor.submit(self._timed, backend, call_site, fn)
+        future.add_done_callback(self._done)
+        return future
+
+    def call(self, call_site: str, primary: str, fn) -> tuple:
+        if not self.hedging_enabled:
+            return self._timed(primary, call_site, fn), primary
+
+        log_llm_hedge_event(call_site, 'request')
+        secondary = other_backend(primary)
+        primary_future = self._submit(primary, call_site, fn)
+        if primary_future is None:
+            log_llm_hedge_event(call_site, 'saturated')
+            return self._timed(primary, call_site, fn), primary
+        futures = {primary_future: primary}
+
+        done, _ = wait(futures, timeout=self.hedge_delay(primary, call_site))
+        if done and primary_future.exception() is None:
+            return primary_future.result(), primary
+
+        secondary_future = self._submit(secondary, call_site, fn)
+        if secondary_future is None:
+            log_llm_hedge_event(call_site, 'saturated')
+            if done:
+                return self._timed(secondary, call_site, fn), secondary
+            return primary_future.result(), primary
+
+        if done:
+            print(f"  ⚠️  {primary} failed, failing over to {secondary}")
+            log_llm_hedge_event(call_site, 'failover')
+        else:
+            print(f"  ⏱️  {primary} slower than its p{self.percentile:g}, hedging to {secondary}")
+            log_llm_hedge_event(call_site, 'hedged')
+        futures[secondary_future] = secondary
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures[future] == secondary:
+                        log_llm_hedge_event(call_site, 'hedge_win')
+                    return future.result(), futures[future]
+                error = future.exception()
+        raise error
+
+    async def call_async(self, call_site: str, primary: str, coro_fn) -> tuple:
+        """Async counterpart of call(); `coro_fn(backend)` returns a coroutine."""
+        if not self.hedging_enabled:
+            return await self._timed_async(primary, call_site, coro_fn), primary
+
+        log_llm_hedge_event(call_site, 'request')
+        secondary = other_backend(primary)
+        tasks = {asyncio.ensure_future(self._timed_async(primary, call_site, coro_fn)): primary}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(primary, call_site))
+            if done and next(iter(done)).exception() is None:
+                return next(iter(done)).result(), primary
+
+            if done:
+                print(f"  ⚠️  {primary} failed, failing over to {secondary}")
+                log_llm_hedge_event(call_site, 'failover')
+            else:
+                print(f"  ⏱️  {primary} slower than its p{self.percentile:g}, hedging to {secondary}")
+                log_llm_hedge_event(call_site, 'hedged')
+            tasks[asyncio.ensure_future(self._timed_async(secondary, call_site, coro_fn))] = secondary
+
+            error = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] == secondary:
+                            log_llm_hedge_event(call_site, 'hedge_win')
+                        return task.result(), tasks[task]
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _timed_async(self, backend: str, call_site: str, coro_fn):
+        start_time = time.time()
+        try:
+            with get_breaker(backend).track():
+                result = await coro_fn(backend)
+        except (asyncio.CancelledError, CircuitOpenError):
+            raise
+        except Exception:
+            self._record(backend, call_site, start_time, False)
+            raise
+        self._record(backend, call_site, start_time, True)
+        return result
+
+
+llm_router = LLMRouter()
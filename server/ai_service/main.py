@@ -1,21 +1,43 @@
 import os
 import time
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 import jwt
 from functools import wraps
 from dotenv import load_dotenv
-import chromadb
-from sentence_transformers import SentenceTransformer
 import requests
 import json
 import base64
 from io import BytesIO
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Event, Lock, Thread
 from PIL import Image
-from google import genai
 from rate_limiter import rate_limit, get_rate_limit_status
+from http_client import http_get, http_post, LLM_TIMEOUT
+from embedding_cache import query_embedding_cache, create_persistent_embedding_cache
+from embedding_backends import load_embedding_backend, embedding_model_id, EMBEDDING_BACKEND
+from embedding_dispatcher import wrap_embedding_model
+from embedding_server import EmbeddingServerClient, EMBEDDING_SERVER_ENABLED, EMBEDDING_SERVER_SOCKET
+from semantic_cache import semantic_answer_cache, is_cacheable_intent
+from retrieval_cache import create_retrieval_cache
+from llm_cache import create_llm_cache
+from single_flight import create_single_flight, flight_key
+from llm_router import llm_router, LLM_HEDGING_ENABLED
+from circuit_breaker import get_breaker, CIRCUIT_BREAKER_ENABLED
+from openai_backend import create_openai_backend
+from model_residency import create_model_residency
+from numpy_index import load_numpy_collections, NUMPY_INDEX_DIR, NUMPY_INDEX_QUANTIZATION
+from lexical_index import load_lexical_indexes, reciprocal_rank_fusion, LEXICAL_INDEX_DIR
+from context_packing import pack_context, get_context_budget, CONTEXT_PACKING_ENABLED
+from intent_classifier import load_intent_classifier, INTENT_CLASSIFIER_ENABLED, INTENT_CLASSIFIER_THRESHOLD
 from monitoring import (
     metrics, monitor_request, log_agent_usage, log_collection_query,
-    log_image_processing, log_crisis_detection, HealthCheck
+    log_image_processing, log_crisis_detection, log_embedding_cache_event,
+    log_embedding_encode, log_semantic_cache_event, log_retrieval_cache_event,
+    log_hybrid_retrieval, log_context_packing, log_startup_phase,
+    log_persistent_embedding_cache_event, log_streamed_request, log_intent_classification,
+    log_llm_cache_event, log_speculative_retrieval,
+    HealthCheck
 )
 
 # --- Configuration ---
@@ -24,9 +46,8 @@ app = Flask(__name__)
 API_KEY = os.getenv("GOOGLE_API_KEY")
 use_gemini=True
 
-# --- Ollama Configuration ---
+# --- Ollama Configuration (vision model and health check) ---
 OLLAMA_API_URL = "http://localhost:11434"
-GENERATOR_MODEL = "qwen3:0.6b"
 VISION_MODEL = "qwen2.5vl:3b"  # Vision model for image analysis
 GEMINI_MODEL = "gemini-2.5-flash-lite"
 
@@ -38,109 +59,294 @@ NODE_SERVER_URL = os.getenv("NODE_SERVER_URL", "http://localhost:5000")
 JWT_SECRET = os.getenv("JWT_SECRET") 
 ai_server_port = os.getenv("AI_SERVICE_PORT")
 
+# --- Retrieval Configuration ---
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "4"))
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "10"))
+UNIFIED_INDEX_ENABLED = os.getenv("UNIFIED_INDEX_ENABLED", "false").lower() == "true"
+UNIFIED_COLLECTION_NAME = "clinico_unified"
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma").lower()  # 'chroma' or 'numpy'
+HYBRID_RETRIEVAL_ENABLED = os.getenv("HYBRID_RETRIEVAL_ENABLED", "false").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))  # depth of each ranked list before fusion
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Speculative mode retrieves over the most likely collections while the LLM classifies the intent
+SPECULATIVE_RETRIEVAL_ENABLED = os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "false").lower() == "true"
+SPECULATIVE_RETRIEVAL_COLLECTIONS = [
+    name.strip() for name in os.getenv("SPECULATIVE_RETRIEVAL_COLLECTIONS", "disease_data").split(",") if name.strip()
+]  # used when no intent classifier is loaded
+SPECULATIVE_RETRIEVAL_WORKERS = int(os.getenv("SPECULATIVE_RETRIEVAL_WORKERS", "4"))
+
+# --- Startup Configuration ---
+# Lazy mode loads models and indexes in a background warmup thread per worker
+# so the server accepts connections (and liveness probes) immediately.
+LAZY_INIT_ENABLED = os.getenv("LAZY_INIT_ENABLED", "false").lower() == "true"
+WARMUP_QUERIES = [
+    "what are symptoms of diabetes",
+    "paracetamol 650mg dosage",
+    "how to manage anxiety"
+]
+
+# --- Fallback Answers ---
+LLM_ERROR_ANSWER = "An error occurred while generating the response."
+
 # --- Crisis Keywords for Safety ---
 CRISIS_KEYWORDS = ["suicide", "kill myself", "hopeless", "end my life", "want to die", "self harm"]
 
 if not JWT_SECRET:
     print("⚠️  Warning: JWT_SECRET not set. User authentication will not work.")
 
-from google import genai
+genai_client = None
+genai_client_lock = Lock()
 
-client = genai.Client(api_key=API_KEY)
+def get_genai_client():
+    """Create the Gemini client on first use (imports google.genai lazily)."""
+    global genai_client
+    if genai_client is None:
+        with genai_client_lock:
+            if genai_client is None:
+                from google import genai
+                genai_client = genai.Client(api_key=API_KEY)
+    return genai_client
 
-def get_final_answer(prompt: str):
-    try:
-        if use_gemini:
-            # --- GEMINI MODE ---
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt
-            )
-            final_answer = response.text
+# Text generation when not using Gemini: any OpenAI-compatible server (LLM_API_BASE_URL)
+llm_backend = create_openai_backend()
+GENERATOR_MODEL = llm_backend.model
 
-        else:
-            # --- LOCAL OLLAMA MODE ---
-            response = requests.post(
-                f"{OLLAMA_API_URL}/v1/chat/completions",
-                json={
-                    "model": GENERATOR_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7
-                }
-            )
-            response.raise_for_status()
-            final_answer = response.json()['choices'][0]['message']['content']
+# keep_alive, pre-warming and cold-load tracking for models served by Ollama
+model_residency = create_model_residency(OLLAMA_API_URL)
 
-        return final_answer
+def resident_models() -> list:
+    """Ollama models to keep loaded: the vision model, plus the text models when Ollama serves them."""
+    models = [VISION_MODEL]
+    if not use_gemini and llm_backend.base_url.startswith(OLLAMA_API_URL):
+        models += [llm_backend.model] + list(llm_backend.agent_models.values())
+    return list(dict.fromkeys(models))
 
-    except Exception as e:
-        print("Error generating answer:", e)
-        return "An error occurred while generating the response."
+# Concurrent identical LLM calls share one backend call
+single_flight = create_single_flight()
 
-def call_model(system_prompt: str, user_query: str):
-    if use_gemini:
-        # GEMINI VERSION
-        full_prompt = f"{system_prompt}\n\nUser: {user_query}"
-        response = client.models.generate_content(
+def llm_flight_key(call_site: str, parts: tuple, agent: str = None) -> str:
+    """Single-flight key of an LLM call: the backend, model and prompt parts."""
+    return flight_key(call_site, *current_llm_backend(agent), *parts)
+
+def coalesce_llm_call(call_site: str, parts: tuple, fn, agent: str = None):
+    """Run fn through single-flight, keyed by the backend, model and prompt parts."""
+    if single_flight is None:
+        return fn()
+    return single_flight.do(call_site, llm_flight_key(call_site, parts, agent), fn)
+
+# Each kind of LLM call is described once as a request, which generate_llm and
+# generate_llm_stream send here and their async counterparts in asgi_app.py
+def answer_request(prompt: str, agent: str = None) -> dict:
+    return {
+        "contents": prompt,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.7,
+        "gemini_config": None,
+        "agent": agent
+    }
+
+def deterministic_request(system_prompt: str, user_input: str, agent: str = None) -> dict:
+    """A temperature 0 call; an empty system prompt sends the user input alone."""
+    messages = [{"role": "user", "content": user_input}]
+    if system_prompt:
+        messages.insert(0, {"role": "system", "content": system_prompt})
+    return {
+        "contents": f"{system_prompt}\n\nUser: {user_input}" if system_prompt else user_input,
+        "messages": messages,
+        "temperature": 0.0,
+        "gemini_config": {"temperature": 0.0},
+        "agent": agent
+    }
+
+def generate_llm(llm_request: dict, backend: str = None) -> str:
+    if (backend or primary_backend()) == "gemini":
+        # --- GEMINI MODE ---
+        response = get_genai_client().models.generate_content(
             model=GEMINI_MODEL,
-            contents=full_prompt,
-            config={
-                "temperature": 0.0
-            }
+            contents=llm_request["contents"],
+            config=llm_request["gemini_config"]
         )
-        return response.text.strip()
+        return response.text
+
+    # --- OPENAI-COMPATIBLE MODE (Ollama, vLLM, llama.cpp) ---
+    return llm_backend.chat(llm_request["messages"], llm_request["temperature"], llm_request["agent"])
+
+def generate_llm_stream(llm_request: dict):
+    if use_gemini:
+        # --- GEMINI MODE ---
+        for chunk in get_genai_client().models.generate_content_stream(
+            model=GEMINI_MODEL,
+            contents=llm_request["contents"],
+            config=llm_request["gemini_config"]
+        ):
+            if chunk.text:
+                yield chunk.text
+
     else:
-        # LOCAL OLLAMA VERSION
-        response = requests.post(
-            f"{OLLAMA_API_URL}/v1/chat/completions",
-            json={
-                "model": GENERATOR_MODEL,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_query}
-                ],
-                "temperature": 0.0
-            }
+        # --- OPENAI-COMPATIBLE MODE (server-sent events) ---
+        yield from llm_backend.stream_chat(llm_request["messages"], llm_request["temperature"], llm_request["agent"])
+
+def get_final_answer(prompt: str, agent: str = "answer"):
+    """
+    Generate an answer. `agent` (e.g. the agent's intent) selects the model
+    and max_tokens configured for it on the OpenAI-compatible backend.
+    """
+    try:
+        return coalesce_llm_call(
+            "answer", (prompt,), lambda: route_llm_call("answer", generate_llm, answer_request(prompt, agent))[0], agent
         )
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content'].strip()
+    except Exception as e:
+        print("Error generating answer:", e)
+        return LLM_ERROR_ANSWER
+
+def stream_final_answer(prompt: str, agent: str = "answer"):
+    """
+    Yield the answer to `prompt` in pieces as the model generates it.
+    Errors are raised to the caller, which knows how much was already sent.
+    Raises CircuitOpenError up front while the backend's breaker is open.
+    """
+    with get_breaker(primary_backend()).track(count_slow=False):
+        yield from generate_llm_stream(answer_request(prompt, agent))
+
+# Deterministic (temperature 0) calls are memoized per backend and model
+llm_cache = create_llm_cache()
+
+def primary_backend() -> str:
+    return "gemini" if use_gemini else "openai_compat"
+
+def backend_model(backend: str, agent: str = None) -> str:
+    return GEMINI_MODEL if backend == "gemini" else llm_backend.model_for(agent)
+
+def current_llm_backend(agent: str = None) -> tuple:
+    """Returns (backend, model) that calls for `agent` are currently sent to first."""
+    backend = primary_backend()
+    return backend, backend_model(backend, agent)
+
+def route_llm_call(call_site: str, generate, *args) -> tuple:
+    """
+    Run `generate(*args, backend)` on the primary backend, hedged to the
+    other one when enabled. Returns (output, backend that produced it).
+    """
+    return llm_router.call(call_site, primary_backend(), lambda backend: generate(*args, backend))
+
+def lookup_llm_cache(call_site: str, system_prompt: str, user_input: str):
+    """Return the memoized output for a deterministic call, or None on a miss."""
+    if llm_cache is None:
+        return None
+
+    backend, model = current_llm_backend(call_site)
+    output, tier = llm_cache.get(backend, model, system_prompt, user_input)
+    log_llm_cache_event(call_site, f"{tier}_hit" if tier else 'miss')
+    return output
+
+def store_llm_cache(call_site: str, system_prompt: str, user_input: str, output: str, backend: str = None):
+    """Memoize an output under the backend that produced it (the primary by default)."""
+    if llm_cache is not None and output:
+        backend = backend or primary_backend()
+        llm_cache.set(backend, backend_model(backend, call_site), system_prompt, user_input, output)
+
+def call_model(system_prompt: str, user_query: str, call_site: str = "intent", parse=None):
+    """
+    Deterministic LLM call, memoized per backend and model. With `parse`,
+    returns parse(reply) and memoizes the reply only once it parses, so a
+    malformed reply is retried rather than replayed for the whole TTL.
+    """
+    cached = lookup_llm_cache(call_site, system_prompt, user_query)
+    if cached is not None:
+        return parse(cached) if parse else cached
+
+    content, backend = coalesce_llm_call(
+        call_site, (system_prompt, user_query),
+        lambda: route_llm_call(call_site, generate_llm, deterministic_request(system_prompt, user_query, call_site)),
+        call_site
+    )
+    content = content.strip()
+    output = parse(content) if parse else content
+    store_llm_cache(call_site, system_prompt, user_query, content, backend)
+    return output
 
 def get_specialization(prompt: str):
     """
     Returns specialization based on the given prompt.
-    Uses Gemini or local Ollama depending on `use_gemini`.
-    Falls back to 'General Physician' on any error.
+    Uses Gemini or the OpenAI-compatible backend depending on `use_gemini`
+    (hedged to the other when enabled). Falls back to 'General Physician' on any error.
     """
     try:
-        if use_gemini:
-            # --- GEMINI VERSION ---
-            response = client.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt,
-                config={
-                    "temperature": 0.0
-                }
-            )
-            specialization = response.text.strip()
-
-        else:
-            # --- LOCAL OLLAMA VERSION ---
-            response = requests.post(
-                f"{OLLAMA_API_URL}/v1/chat/completions",
-                json={
-                    "model": GENERATOR_MODEL,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.0
-                }
-            )
-            specialization = response.json()['choices'][0]['message']['content'].strip()
+        cached = lookup_llm_cache("specialization", "", prompt)
+        if cached is not None:
+            return cached
 
+        specialization, backend = route_llm_call(
+            "specialization", generate_llm, deterministic_request("", prompt, "specialization")
+        )
+        specialization = specialization.strip()
+        store_llm_cache("specialization", "", prompt, specialization, backend)
         return specialization
 
     except Exception as e:
         print("Specialization error:", e)
         return "General Physician"
 
+def authenticate_token(auth_header: str):
+    """
+    Verify a 'Bearer <jwt>' Authorization header issued by the Node.js server.
+    
+    Returns:
+        (user: dict, None, None) on success, or (None, error_body: dict, status_code: int)
+    """
+    if not auth_header:
+        return None, {
+            "error": "Unauthorized",
+            "message": "A token is required for authentication."
+        }, 403
+    
+    # Extract token from "Bearer <token>"
+    token_parts = auth_header.split(' ')
+    if len(token_parts) != 2 or token_parts[0] != 'Bearer':
+        return None, {
+            "error": "Unauthorized", 
+            "message": "Invalid authorization header format. Use 'Bearer <token>'."
+        }, 401
+    
+    token = token_parts[1]
+    
+    try:
+        # Verify and decode the JWT token
+        decoded = jwt.decode(
+            token, 
+            JWT_SECRET, 
+            algorithms=["HS256"]
+        )
+        
+        user = {
+            'user_id': decoded.get('userId'),
+            'email': decoded.get('email'),
+            'role': decoded.get('role'),
+            'full_name': decoded.get('fullName')
+        }
+        
+        print(f"✓ Authenticated user: {user['email']} (ID: {user['user_id']}, Role: {user['role']})")
+        return user, None, None
+        
+    except jwt.ExpiredSignatureError:
+        return None, {
+            "error": "Unauthorized",
+            "message": "Token has expired. Please login again."
+        }, 401
+        
+    except jwt.InvalidTokenError as e:
+        return None, {
+            "error": "Unauthorized",
+            "message": f"Invalid token: {str(e)}"
+        }, 401
+    
+    except Exception as e:
+        print(f"❌ Token verification error: {e}")
+        return None, {
+            "error": "Unauthorized",
+            "message": "Token verification failed."
+        }, 401
+
 def verify_user_token(f):
     """
     Decorator to verify JWT token from Node.js server.
@@ -148,62 +354,12 @@ def verify_user_token(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        # Get token from Authorization header
-        auth_header = request.headers.get('Authorization')
-        
-        if not auth_header:
-            return jsonify({
-                "error": "Unauthorized",
-                "message": "A token is required for authentication."
-            }), 403
-        
-        # Extract token from "Bearer <token>"
-        token_parts = auth_header.split(' ')
-        if len(token_parts) != 2 or token_parts[0] != 'Bearer':
-            return jsonify({
-                "error": "Unauthorized", 
-                "message": "Invalid authorization header format. Use 'Bearer <token>'."
-            }), 401
-        
-        token = token_parts[1]
-        
-        try:
-            # Verify and decode the JWT token
-            decoded = jwt.decode(
-                token, 
-                JWT_SECRET, 
-                algorithms=["HS256"]
-            )
-            
-            # Attach user information to request
-            request.user = {
-                'user_id': decoded.get('userId'),
-                'email': decoded.get('email'),
-                'role': decoded.get('role'),
-                'full_name': decoded.get('fullName')
-            }
-            
-            print(f"✓ Authenticated user: {request.user['email']} (ID: {request.user['user_id']}, Role: {request.user['role']})")
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({
-                "error": "Unauthorized",
-                "message": "Token has expired. Please login again."
-            }), 401
-            
-        except jwt.InvalidTokenError as e:
-            return jsonify({
-                "error": "Unauthorized",
-                "message": f"Invalid token: {str(e)}"
-            }), 401
-        
-        except Exception as e:
-            print(f"❌ Token verification error: {e}")
-            return jsonify({
-                "error": "Unauthorized",
-                "message": "Token verification failed."
-            }), 401
+        user, error, status_code = authenticate_token(request.headers.get('Authorization'))
+        if error:
+            return jsonify(error), status_code
         
+        # Attach user information to request
+        request.user = user
         return f(*args, **kwargs)
     
     return decorated_function
@@ -218,19 +374,23 @@ def log_chat_to_database(user_id: int, message: str, sender: str):
         sender: 'User' or 'AI'
     """
     try:
-        response = requests.post(
-            f"{NODE_SERVER_URL}/api/chat/log",
-            json={
-                "user_id": user_id,
-                "message_content": message,
-                "sender": sender
-            },
-            headers={
-                "Content-Type": "application/json",
-                "X-Internal-Service": API_AUTH_TOKEN  # Internal service auth
-            },
-            timeout=5
-        )
+        # Skipped (CircuitOpenError) while the Node.js server is failing
+        with get_breaker("node").track():
+            response = http_post(
+                f"{NODE_SERVER_URL}/api/chat/log",
+                json={
+                    "user_id": user_id,
+                    "message_content": message,
+                    "sender": sender
+                },
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Internal-Service": API_AUTH_TOKEN  # Internal service auth
+                },
+                timeout=5
+            )
+            if response.status_code >= 500:
+                response.raise_for_status()
         
         if response.status_code == 201:
             print(f"✓ Chat logged for user {user_id}")
@@ -260,11 +420,14 @@ def fetch_professionals_from_api(specialty: str = None) -> list:
         
         print(f"  📡 Fetching professionals from API (specialty: {specialty or 'all'})")
         
-        response = requests.get(
-            url,
-            params=params,
-            timeout=10
-        )
+        with get_breaker("node").track():
+            response = http_get(
+                url,
+                params=params,
+                timeout=10
+            )
+            if response.status_code >= 500:
+                response.raise_for_status()
         response.raise_for_status()
         
         professionals = response.json()
@@ -294,10 +457,13 @@ def fetch_professional_availability(professional_id: int) -> list:
         
         print(f"  📡 Fetching availability for professional {professional_id}")
         
-        response = requests.get(
-            url,
-            timeout=10
-        )
+        with get_breaker("node").track():
+            response = http_get(
+                url,
+                timeout=10
+            )
+            if response.status_code >= 500:
+                response.raise_for_status()
         response.raise_for_status()
         
         slots = response.json()
@@ -395,73 +561,409 @@ def detect_emergency_situation(user_query: str) -> dict:
         "severity": "normal"
     }
 
+class UnifiedSubset:
+    """
+    A knowledge base subset stored inside the unified collection.
+    Exposes the parts of the Chroma collection API the agents use,
+    scoped to the subset through a `collection` metadata filter.
+    """
+    
+    def __init__(self, collection, subset: str):
+        self.collection = collection
+        self.subset = subset
+        self.name = f"{collection.name}[{subset}]"
+    
+    def count(self) -> int:
+        return len(self.collection.get(where={"collection": self.subset}, include=[])['ids'])
+    
+    def query(self, **kwargs):
+        return self.collection.query(where={"collection": self.subset}, **kwargs)
+
 # --- Model & Database Initialization ---
 embedding_model = None
-client = genai.Client(api_key=API_KEY)
 collections = {}
+unified_collection = None
+lexical_indexes = {}
+intent_classifier = None
 
-try:
-    print("--- Initializing AI Service ---")
-    print("Loading embedding model (this may take a moment on first run)...")
-    embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
-    print("✅ Embedding model loaded.")
+# Readiness state for /v1/health/ready
+service_ready = Event()
+service_state = {"phase": "starting", "error": None, "phases": {}}
+warmup_lock = Lock()
+warmup_pid = None
 
-    db_client = chromadb.PersistentClient(path="db")
-    
+def record_startup_phase(phase: str, start_time: float):
+    """Log and export how long a startup phase took."""
+    duration = time.time() - start_time
+    service_state["phases"][phase] = round(duration, 3)
+    log_startup_phase(phase, duration)
+    print(f"⏱️  Startup phase '{phase}' took {duration:.2f}s")
+
+def load_embedding_model():
+    global embedding_model
+    if EMBEDDING_SERVER_ENABLED:
+        # The sidecar owns the model; workers only load it if the sidecar is unreachable
+        embedding_model = EmbeddingServerClient()
+        print(f"✅ Using embedding server at '{EMBEDDING_SERVER_SOCKET}'")
+    else:
+        print(f"Loading embedding model with '{EMBEDDING_BACKEND}' backend (this may take a moment on first run)...")
+        embedding_model = wrap_embedding_model(load_embedding_backend(EMBEDDING_BACKEND))
+        print("✅ Embedding model loaded.")
+
+def load_collections():
+    global unified_collection
     # Load all available collections
-    available_collections = db_client.list_collections()
+    if RETRIEVAL_BACKEND == "numpy":
+        # Exact search over memory-mapped embedding matrices exported by ingest.py
+        available_collections = load_numpy_collections(NUMPY_INDEX_DIR)
+        print(f"\n🔢 Using NumPy search backend from '{NUMPY_INDEX_DIR}' (first pass: {NUMPY_INDEX_QUANTIZATION})")
+    else:
+        import chromadb
+        db_client = chromadb.PersistentClient(path="db")
+        available_collections = db_client.list_collections()
     print(f"\n📚 Available collections: {[col.name for col in available_collections]}")
     
-    # Map collections by subdirectory name
-    for collection in available_collections:
-        # Extract subdirectory name from collection name (format: clinico_{subdir})
-        if collection.name.startswith("clinico_"):
-            subdir_name = collection.name.replace("clinico_", "")
-            collections[subdir_name] = collection
-            print(f"✅ Loaded collection '{collection.name}' with {collection.count()} entries")
+    if UNIFIED_INDEX_ENABLED:
+        # Every subset lives in one collection, tagged by `collection` metadata
+        unified_collection = next(
+            (col for col in available_collections if col.name == UNIFIED_COLLECTION_NAME), None
+        )
+        if unified_collection is None:
+            raise ValueError(f"Unified collection '{UNIFIED_COLLECTION_NAME}' not found. Please run ingest.py with UNIFIED_INDEX_ENABLED=true.")
+        subsets = (unified_collection.metadata or {}).get("subsets", "")
+        for subset in filter(None, subsets.split(",")):
+            collections[subset] = UnifiedSubset(unified_collection, subset)
+        print(f"✅ Loaded unified collection '{unified_collection.name}' with {unified_collection.count()} entries (subsets: {list(collections.keys())})")
+    else:
+        # Map collections by subdirectory name
+        for collection in available_collections:
+            # Extract subdirectory name from collection name (format: clinico_{subdir})
+            if collection.name.startswith("clinico_") and collection.name != UNIFIED_COLLECTION_NAME:
+                subdir_name = collection.name.replace("clinico_", "")
+                collections[subdir_name] = collection
+                print(f"✅ Loaded collection '{collection.name}' with {collection.count()} entries")
     
     if not collections:
         raise ValueError("No collections found in database. Please run ingest.py first.")
 
-except Exception as e:
-    print(f"❌ An error occurred during initialization: {e}")
+def load_lexical_index():
+    global lexical_indexes
+    lexical_indexes = load_lexical_indexes(LEXICAL_INDEX_DIR)
+    if lexical_indexes:
+        print(f"✅ Hybrid retrieval enabled with BM25 indexes: {list(lexical_indexes.keys())}")
+    else:
+        print(f"⚠️  No BM25 indexes found in '{LEXICAL_INDEX_DIR}', using vector-only retrieval. Please run ingest.py.")
+
+def load_intent_classifier_artifact():
+    global intent_classifier
+    intent_classifier = load_intent_classifier(model_id=embedding_model_id(EMBEDDING_BACKEND))
+
+def warm_up():
+    """Run dummy encodes and one query per collection to page in weights and indexes."""
+    for query in WARMUP_QUERIES:
+        query_embedding = embedding_model.encode(query).tolist()
+        for collection in collections.values():
+            collection.query(query_embeddings=[query_embedding], n_results=1, include=["distances"])
+
+def initialize_service(warmup: bool = False):
+    """
+    Load the embedding model, collections and lexical indexes, timing each
+    phase, then mark the service ready.
+    """
+    try:
+        print("--- Initializing AI Service ---")
+        service_state["phase"] = "initializing"
+        init_start = time.time()
+        
+        phase_start = time.time()
+        load_embedding_model()
+        record_startup_phase("embedding_model", phase_start)
+        
+        phase_start = time.time()
+        load_collections()
+        record_startup_phase("collections", phase_start)
+        
+        if HYBRID_RETRIEVAL_ENABLED:
+            phase_start = time.time()
+            load_lexical_index()
+            record_startup_phase("lexical_index", phase_start)
+        
+        if INTENT_CLASSIFIER_ENABLED:
+            phase_start = time.time()
+            load_intent_classifier_artifact()
+            record_startup_phase("intent_classifier", phase_start)
+        
+        if model_residency is not None:
+            phase_start = time.time()
+            model_residency.prewarm(resident_models())
+            record_startup_phase("ollama_prewarm", phase_start)
+        
+        if warmup:
+            service_state["phase"] = "warming_up"
+            phase_start = time.time()
+            warm_up()
+            record_startup_phase("warmup", phase_start)
+        
+        record_startup_phase("time_to_ready", init_start)
+        service_state["phase"] = "ready"
+        service_ready.set()
+    
+    except Exception as e:
+        service_state["phase"] = "failed"
+        service_state["error"] = str(e)
+        print(f"❌ An error occurred during initialization: {e}")
+
+def start_background_warmup():
+    """
+    Start initialization + warmup in a background thread, once per process.
+    Called from the gunicorn post_fork hook and, as a fallback, on the first request.
+    """
+    global warmup_pid
+    with warmup_lock:
+        if warmup_pid == os.getpid():
+            return
+        warmup_pid = os.getpid()
+    
+    Thread(target=initialize_service, kwargs={"warmup": True}, name="warmup", daemon=True).start()
+
+if not LAZY_INIT_ENABLED:
+    initialize_service()
 
 # --- Agent Core Functions ---
 
-def retrieve_context_from_collections(user_query: str, collection_names: list, n_results: int = 3) -> dict:
+# Persistent tier behind the in-memory LRU; shared by all workers and ingest.py
+persistent_embedding_cache = create_persistent_embedding_cache()
+EMBEDDING_MODEL_ID = embedding_model_id(EMBEDDING_BACKEND)
+
+def embed_query(user_query: str) -> list:
+    """
+    Embed a user query, serving repeated queries from the LRU cache
+    (then the persistent cache) so they skip the embedding model entirely.
+    """
+    if query_embedding_cache is not None:
+        cached_embedding = query_embedding_cache.get(user_query)
+        if cached_embedding is not None:
+            log_embedding_cache_event('hit')
+            return cached_embedding
+        log_embedding_cache_event('miss')
+    
+    query_embedding = None
+    if persistent_embedding_cache is not None:
+        try:
+            query_embedding = persistent_embedding_cache.get(EMBEDDING_MODEL_ID, user_query)
+            log_persistent_embedding_cache_event('hit' if query_embedding is not None else 'miss')
+        except Exception as e:
+            print(f"  ⚠️  Persistent embedding cache read failed: {e}")
+    
+    if query_embedding is None:
+        encode_start = time.time()
+        query_embedding = embedding_model.encode(user_query).tolist()
+        log_embedding_encode(encode_start)
+        
+        if persistent_embedding_cache is not None:
+            try:
+                evicted = persistent_embedding_cache.put(EMBEDDING_MODEL_ID, user_query, query_embedding)
+                log_persistent_embedding_cache_event('eviction', evicted)
+            except Exception as e:
+                print(f"  ⚠️  Persistent embedding cache write failed: {e}")
+    
+    if query_embedding_cache is not None and query_embedding_cache.put(user_query, query_embedding):
+        log_embedding_cache_event('eviction')
+    
+    return query_embedding
+
+# Cached retrievals are keyed by backend/mode and embedding model as well as the index version
+retrieval_cache = create_retrieval_cache(variant=":".join([
+    RETRIEVAL_BACKEND,
+    NUMPY_INDEX_QUANTIZATION if RETRIEVAL_BACKEND == "numpy" else "",
+    "unified" if UNIFIED_INDEX_ENABLED else "split",
+    "hybrid" if HYBRID_RETRIEVAL_ENABLED else "dense"
+]), model_id=EMBEDDING_MODEL_ID)
+
+# Shared pool for per-collection queries. Worker threads are only spawned on
+# first use, so nothing is started in the gunicorn master before forking.
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_MAX_WORKERS,
+    thread_name_prefix="retrieval"
+)
+
+# Chunk embeddings are only needed for near-duplicate suppression when packing context
+QUERY_INCLUDE = ["documents", "metadatas", "distances"] + (["embeddings"] if CONTEXT_PACKING_ENABLED else [])
+
+def query_rows(results: dict):
+    """Yield (id, document, metadata, distance, embedding) rows from a single-query result."""
+    embeddings = results.get('embeddings')
+    embeddings = embeddings[0] if embeddings is not None else [None] * len(results['ids'][0])
+    return zip(results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0], embeddings)
+
+def fuse_lexical_hits(collection, user_query: str, query_embedding: list, results: dict,
+                      n_results: int, subsets: list = None) -> list:
+    """
+    Fuse a dense result set with BM25 hits from the collection's inverted
+    index using reciprocal rank fusion. Chunks found only by BM25 are
+    fetched by id and given their cosine distance to the query.
+    Returns (document, metadata, distance, embedding) tuples for the top fused chunks.
+    """
+    dense_hits = {
+        chunk_id: (doc, meta, dist, embedding)
+        for chunk_id, doc, meta, dist, embedding in query_rows(results)
+    }
+    
+    lexical_index = lexical_indexes.get(collection.name)
+    if lexical_index is None:
+        return list(dense_hits.values())[:n_results]
+    
+    lexical_ids = [chunk_id for chunk_id, _ in lexical_index.search(user_query, HYBRID_CANDIDATES, subsets)]
+    fused = reciprocal_rank_fusion([list(dense_hits), lexical_ids], k=HYBRID_RRF_K)[:n_results]
+    
+    lexical_only = [chunk_id for chunk_id, _ in fused if chunk_id not in dense_hits]
+    if lexical_only:
+        fetched = collection.get(ids=lexical_only, include=["documents", "metadatas", "embeddings"])
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        for chunk_id, doc, meta, embedding in zip(
+            fetched['ids'], fetched['documents'], fetched['metadatas'], fetched['embeddings']
+        ):
+            vector = np.asarray(embedding, dtype=np.float32)
+            similarity = float(vector @ query_vector) / max(float(np.linalg.norm(vector)), 1e-12)
+            dense_hits[chunk_id] = (doc, meta, 1 - similarity, embedding)
+    
+    log_hybrid_retrieval(len(lexical_ids), len(lexical_only))
+    return [dense_hits[chunk_id] for chunk_id, _ in fused if chunk_id in dense_hits]
+
+def query_collection(col_name: str, query_embedding: list, n_results: int, user_query: str = None) -> list:
+    """
+    Run a single ANN search against one collection, fused with BM25
+    results when hybrid retrieval is enabled.
+    Returns the hits tagged with their collection and relevance.
+    """
+    collection = collections[col_name]
+    print(f"  📖 Querying collection: {collection.name}")
+    
+    hybrid = HYBRID_RETRIEVAL_ENABLED and user_query is not None and collection.name in lexical_indexes
+    results = collection.query(
+        query_embeddings=[query_embedding],
+        n_results=max(n_results, HYBRID_CANDIDATES) if hybrid else n_results,
+        include=QUERY_INCLUDE
+    )
+    
+    if hybrid:
+        hits = fuse_lexical_hits(collection, user_query, query_embedding, results, n_results)
+    else:
+        hits = [row[1:] for row in query_rows(results)]
+    
+    return [
+        {
+            'document': doc,
+            'metadata': meta,
+            'distance': dist,
+            'collection': col_name,
+            'relevance': 1 - dist,
+            'embedding': embedding
+        }
+        for doc, meta, dist, embedding in hits
+    ]
+
+def query_unified_collection(subsets: list, query_embedding: list, n_results: int, user_query: str = None) -> list:
+    """
+    Run one ANN search over the unified collection, filtered to the given subsets
+    and fused with BM25 results when hybrid retrieval is enabled.
+    Returns the hits tagged with the subset they came from and their relevance.
+    """
+    print(f"  📖 Querying unified collection: {unified_collection.name} (subsets: {subsets})")
+    
+    if len(subsets) == 1:
+        where = {"collection": subsets[0]}
+    else:
+        where = {"collection": {"$in": subsets}}
+    
+    hybrid = HYBRID_RETRIEVAL_ENABLED and user_query is not None and unified_collection.name in lexical_indexes
+    results = unified_collection.query(
+        query_embeddings=[query_embedding],
+        n_results=max(n_results, HYBRID_CANDIDATES) if hybrid else n_results,
+        where=where,
+        include=QUERY_INCLUDE
+    )
+    
+    if hybrid:
+        hits = fuse_lexical_hits(unified_collection, user_query, query_embedding, results, n_results, subsets)
+    else:
+        hits = [row[1:] for row in query_rows(results)]
+    
+    return [
+        {
+            'document': doc,
+            'metadata': meta,
+            'distance': dist,
+            'collection': meta.get('collection', 'N/A'),
+            'relevance': 1 - dist,
+            'embedding': embedding
+        }
+        for doc, meta, dist, embedding in hits
+    ]
+
+def retrieve_context_from_collections(user_query: str, collection_names: list, n_results: int = 3,
+                                      intent: str = None) -> dict:
     """
     Retrieve context from multiple specified collections.
+    Collections are queried concurrently on the shared retrieval pool;
+    a failing or slow collection is skipped without affecting the others.
+    In unified mode all requested subsets are served by a single filtered search.
+    In hybrid mode each search is fused with BM25 hits from the inverted index.
+    When context packing is enabled the merged chunks are deduplicated and
+    trimmed to the token budget of the calling agent (`intent`).
+    Results are served from the retrieval cache when enabled.
     Returns combined context with source tracking.
     """
+    token_budget = get_context_budget(intent) if CONTEXT_PACKING_ENABLED and intent else None
+    
+    if retrieval_cache is not None:
+        cached_retrieval, tier = retrieval_cache.get(user_query, collection_names, n_results, token_budget)
+        log_retrieval_cache_event(f"{tier}_hit" if tier else 'miss')
+        if cached_retrieval is not None:
+            print(f"  ⚡ Retrieval cache {tier.upper()} hit")
+            if 'packing' in cached_retrieval:
+                log_context_packing(intent, cached_retrieval['packing'])
+            return cached_retrieval
+    
     all_results = []
+    complete = True
     
-    query_embedding = embedding_model.encode(user_query).tolist()
+    query_embedding = embed_query(user_query)
     
+    pending = []
+    unified_subsets = []
     for col_name in collection_names:
         if col_name not in collections:
             print(f"  ⚠️  Collection '{col_name}' not found, skipping...")
             continue
         
-        collection = collections[col_name]
-        print(f"  📖 Querying collection: {collection.name}")
+        if isinstance(collections[col_name], UnifiedSubset):
+            unified_subsets.append(col_name)
+            continue
         
+        future = retrieval_executor.submit(query_collection, col_name, query_embedding, n_results, user_query)
+        pending.append((col_name, future))
+    
+    if unified_subsets:
+        future = retrieval_executor.submit(
+            query_unified_collection, unified_subsets, query_embedding, n_results * len(unified_subsets), user_query
+        )
+        pending.append((UNIFIED_COLLECTION_NAME, future))
+    
+    # Merge in request order so the stable sort below matches a serial run
+    deadline = time.time() + RETRIEVAL_TIMEOUT_SECONDS
+    for col_name, future in pending:
         try:
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
-            
-            for doc, meta, dist in zip(results['documents'][0], results['metadatas'][0], results['distances'][0]):
-                all_results.append({
-                    'document': doc,
-                    'metadata': meta,
-                    'distance': dist,
-                    'collection': col_name,
-                    'relevance': 1 - dist
-                })
+            all_results.extend(future.result(timeout=max(0, deadline - time.time())))
+        
+        except FutureTimeoutError:
+            future.cancel()
+            complete = False
+            print(f"  ⚠️  Timed out querying collection '{col_name}' after {RETRIEVAL_TIMEOUT_SECONDS}s")
         
         except Exception as e:
+            complete = False
             print(f"  ⚠️  Error querying collection '{col_name}': {e}")
     
     # Sort by relevance
@@ -470,19 +972,183 @@ def retrieve_context_from_collections(user_query: str, collection_names: list, n
     # Return top results
     top_results = all_results[:n_results * len(collection_names)]
     
-    return {
+    packing_stats = None
+    if token_budget is not None:
+        top_results, packing_stats = pack_context(top_results, token_budget)
+        log_context_packing(intent, packing_stats)
+        print(f"  📦 Packed context: {packing_stats['chunks_after']}/{packing_stats['chunks_before']} chunks, "
+              f"{packing_stats['tokens_saved']} tokens saved")
+    
+    # Embeddings were only carried for packing; keep results JSON-serializable
+    for r in top_results:
+        r.pop('embedding', None)
+    
+    retrieval = {
         'results': top_results,
         'context': "\n---\n".join([r['document'] for r in top_results])
     }
+    if packing_stats is not None:
+        retrieval['packing'] = packing_stats
+    
+    # Never cache partial results from failed or timed-out collections
+    if retrieval_cache is not None and complete:
+        retrieval_cache.set(user_query, collection_names, n_results, retrieval, token_budget)
+    
+    return retrieval
 
-def handle_health_inquiry(user_query: str, collection_names: list):
+def lookup_semantic_cache(user_query: str, intent: str, collection_names: list):
     """
-    The Health Inquiry Agent. Performs RAG from specified collections.
+    Return a cached response for a paraphrase of this query, if any.
+    Returns (response or None, query_embedding or None).
+    """
+    if semantic_answer_cache is None or not is_cacheable_intent(intent):
+        return None, None
+    
+    try:
+        query_embedding = embed_query(user_query)
+        cached_response, similarity = semantic_answer_cache.lookup(intent, collection_names, query_embedding)
+    except Exception as e:
+        print(f"  ⚠️  Semantic cache lookup failed: {e}")
+        return None, None
+    
+    if cached_response is not None:
+        print(f"  ⚡ Semantic cache hit (similarity: {similarity:.3f})")
+        log_semantic_cache_event(intent, 'hit')
+    else:
+        log_semantic_cache_event(intent, 'miss')
+    
+    return cached_response, query_embedding
+
+def store_semantic_cache(intent: str, collection_names: list, query_embedding, response: dict):
+    """Cache a successfully generated response for future paraphrases."""
+    if semantic_answer_cache is None or query_embedding is None:
+        return
+    
+    try:
+        semantic_answer_cache.store(intent, collection_names, query_embedding, response)
+    except Exception as e:
+        print(f"  ⚠️  Semantic cache store failed: {e}")
+
+# Speculative retrievals run here rather than on retrieval_executor, which
+# they submit their per-collection queries to
+speculation_executor = ThreadPoolExecutor(
+    max_workers=SPECULATIVE_RETRIEVAL_WORKERS,
+    thread_name_prefix="speculation"
+)
+
+def predict_retrieval_target(user_query: str):
+    """
+    Best guess at (intent, collections) the LLM will pick, taken from the
+    embedding classifier's top label even when it is not confident enough to
+    be used directly. The collections are resolved the way build_intent_data
+    resolves the LLM's choice, so a correct guess matches the route exactly.
+    None when the likely route does no retrieval.
+    """
+    if intent_classifier is None:
+        intent, requested_collections = "health_inquiry", SPECULATIVE_RETRIEVAL_COLLECTIONS
+    else:
+        label, _ = intent_classifier.classify(embed_query(user_query))
+        output = intent_classifier.outputs[label]
+        intent, requested_collections = output['intent'], output['collections']
+    
+    if intent == "medicine_inquiry":
+        return "medicine_inquiry", ['medicines']
+    if intent != "health_inquiry":
+        return None
+    return "health_inquiry", resolve_collections(intent, requested_collections, user_query)
+
+def start_speculative_retrieval(user_query: str):
+    """
+    Start retrieving for the predicted route in the background. Returns the
+    speculation to settle with use_speculative_retrieval() and
+    finish_speculative_retrieval(), or None.
+    """
+    if not SPECULATIVE_RETRIEVAL_ENABLED:
+        return None
+    
+    try:
+        target = predict_retrieval_target(user_query)
+    except Exception as e:
+        print(f"  ⚠️  Speculative retrieval prediction failed: {e}")
+        return None
+    if target is None or not target[1]:
+        return None
+    
+    intent, collection_names = target
+    start_time = time.time()
+    
+    def retrieve():
+        try:
+            return retrieve_context_from_collections(user_query, collection_names, n_results=3, intent=intent)
+        finally:
+            speculation['duration'] = time.time() - start_time
+    
+    speculation = {
+        "collections": collection_names,
+        "token_budget": get_context_budget(intent) if CONTEXT_PACKING_ENABLED else None,
+        "duration": None,
+        "used": False
+    }
+    speculation["future"] = speculation_executor.submit(retrieve)
+    log_speculative_retrieval('started')
+    print(f"  🔮 Speculative retrieval over {collection_names}")
+    return speculation
+
+def use_speculative_retrieval(speculation: dict, collection_names: list, intent: str):
+    """Return the speculative retrieval if it was for these collections and budget, else None."""
+    if speculation is None or speculation['used']:
+        return None
+    
+    token_budget = get_context_budget(intent) if CONTEXT_PACKING_ENABLED else None
+    if sorted(speculation['collections']) != sorted(collection_names) or speculation['token_budget'] != token_budget:
+        return None
+    
+    try:
+        retrieval = speculation['future'].result()
+    except Exception as e:
+        print(f"  ⚠️  Speculative retrieval failed: {e}")
+        return None
+    
+    speculation['used'] = True
+    log_speculative_retrieval('hit')
+    print("  🔮 Speculative retrieval reused")
+    return retrieval
+
+def finish_speculative_retrieval(intent_data: dict):
+    """Discard an unused speculation, counting the retrieval work it wasted."""
+    speculation = intent_data.pop('speculation', None) if intent_data else None
+    if speculation is None or speculation['used']:
+        return
+    
+    if speculation['future'].cancel():
+        log_speculative_retrieval('discarded')
+        return
+    
+    def record(future):
+        log_speculative_retrieval('discarded', speculation['duration'])
+    speculation['future'].add_done_callback(record)
+
+def prepare_health_inquiry(user_query: str, collection_names: list, intent: str = "health_inquiry",
+                           speculation: dict = None):
+    """
+    Retrieval half of the Health Inquiry Agent.
+    
+    Returns:
+        (response, prompt, query_embedding). prompt is None when the response
+        is already complete (semantic cache hit or no matching context);
+        otherwise the response holds a fallback answer to be replaced by the
+        generated one.
     """
     print("🏥 Agent: Health Inquiry Agent activated.")
     
-    # Retrieve context from relevant collections
-    retrieval = retrieve_context_from_collections(user_query, collection_names, n_results=3)
+    cached_response, query_embedding = lookup_semantic_cache(user_query, intent, collection_names)
+    if cached_response is not None:
+        return cached_response, None, None
+    
+    # Retrieve context from relevant collections, unless it was retrieved speculatively
+    retrieval = use_speculative_retrieval(speculation, collection_names, intent)
+    if retrieval is None:
+        retrieval = retrieve_context_from_collections(user_query, collection_names, n_results=3, intent=intent)
     context = retrieval['context']
     
     if not context.strip():
@@ -491,7 +1157,7 @@ def handle_health_inquiry(user_query: str, collection_names: list):
             "response_type": "no_information",
             "answer": "I apologize, but I don't have specific information about that in my knowledge base. Could you rephrase your question or ask about a related topic?",
             "sources": []
-        }
+        }, None, None
     
     # Generate the final answer using the retrieved context
     prompt = (
@@ -505,16 +1171,10 @@ def handle_health_inquiry(user_query: str, collection_names: list):
         "--- HELPFUL ANSWER ---\n"
     )
     
-    try:
-        final_answer = get_final_answer(prompt)
-    except Exception as e:
-        print(f"  ⚠️  Error generating answer: {e}")
-        final_answer = "I apologize, but I encountered an error generating a response. Please try again."
-    
-    return {
+    response = {
         "agent": "Health Inquiry Agent",
         "response_type": "informational",
-        "answer": final_answer,
+        "answer": "I apologize, but I encountered an error generating a response. Please try again.",
         "sources": [
             {
                 "source": r['metadata'].get('source', 'N/A'),
@@ -524,19 +1184,48 @@ def handle_health_inquiry(user_query: str, collection_names: list):
             for r in retrieval['results'][:5]
         ]
     }
+    
+    return response, prompt, query_embedding
+
+def handle_health_inquiry(user_query: str, collection_names: list, intent: str = "health_inquiry",
+                          speculation: dict = None):
+    """
+    The Health Inquiry Agent. Performs RAG from specified collections.
+    Answers to paraphrased queries with the same intent and collections
+    are served from the semantic cache when enabled.
+    """
+    response, prompt, query_embedding = prepare_health_inquiry(user_query, collection_names, intent, speculation)
+    if prompt is None:
+        return response
+    
+    try:
+        response['answer'] = get_final_answer(prompt, intent)
+    except Exception as e:
+        print(f"  ⚠️  Error generating answer: {e}")
+        return response
+    
+    if response['answer'] != LLM_ERROR_ANSWER:
+        store_semantic_cache(intent, collection_names, query_embedding, response)
+    
+    return response
 
-def handle_medicine_inquiry(user_query: str):
+def handle_medicine_inquiry(user_query: str, speculation: dict = None):
     """
     The Medicine Inquiry Agent. Specialized for medicine-related queries.
     """
     print("💊 Agent: Medicine Inquiry Agent activated.")
     
     # Use only medicines collection
-    return handle_health_inquiry(user_query, ['medicines'])
+    return handle_health_inquiry(user_query, ['medicines'], intent="medicine_inquiry", speculation=speculation)
 
-def handle_mental_wellness(user_query: str, is_crisis: bool = False):
+def prepare_mental_wellness(user_query: str, is_crisis: bool = False):
     """
-    The Mental Wellness Agent. Provides empathetic support and crisis detection.
+    Retrieval half of the Mental Wellness Agent.
+    
+    Returns:
+        (response, prompt). prompt is None for crisis interventions, which
+        are answered without the LLM; otherwise the response holds a
+        fallback answer to be replaced by the generated one.
     """
     print("🧠 Agent: Mental Wellness Agent activated.")
     
@@ -556,10 +1245,10 @@ def handle_mental_wellness(user_query: str, is_crisis: bool = False):
             "answer": crisis_response,
             "crisis_detected": True,
             "sources": []
-        }
+        }, None
     
     # Retrieve context from mental health collection
-    retrieval = retrieve_context_from_collections(user_query, ['mental_health'], n_results=3)
+    retrieval = retrieve_context_from_collections(user_query, ['mental_health'], n_results=3, intent="mental_wellness")
     context = retrieval['context']
     
     prompt = (
@@ -572,17 +1261,10 @@ def handle_mental_wellness(user_query: str, is_crisis: bool = False):
         "--- EMPATHETIC RESPONSE ---\n"
     )
     
-    try:
-        final_answer = get_final_answer(prompt)
-
-    except Exception as e:
-        print(f"  ⚠️  Error generating response: {e}")
-        final_answer = "I'm here to listen and support you. Would you like to tell me more about how you're feeling?"
-    
     return {
         "agent": "Mental Wellness Agent",
         "response_type": "empathetic_support",
-        "answer": final_answer,
+        "answer": "I'm here to listen and support you. Would you like to tell me more about how you're feeling?",
         "crisis_detected": False,
         "sources": [
             {
@@ -592,7 +1274,22 @@ def handle_mental_wellness(user_query: str, is_crisis: bool = False):
             }
             for r in retrieval['results'][:3]
         ]
-    }
+    }, prompt
+
+def handle_mental_wellness(user_query: str, is_crisis: bool = False):
+    """
+    The Mental Wellness Agent. Provides empathetic support and crisis detection.
+    """
+    response, prompt = prepare_mental_wellness(user_query, is_crisis)
+    if prompt is None:
+        return response
+    
+    try:
+        response['answer'] = get_final_answer(prompt, "mental_wellness")
+    except Exception as e:
+        print(f"  ⚠️  Error generating response: {e}")
+    
+    return response
 
 def analyze_image_with_vision_model(image_base64: str, query: str) -> str:
     """
@@ -603,24 +1300,29 @@ def analyze_image_with_vision_model(image_base64: str, query: str) -> str:
     
     try:
         # Ollama API expects images in base64 format
-        response = requests.post(
-            f"{OLLAMA_API_URL}/api/chat",
-            json={
-                "model": VISION_MODEL,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": f"Analyze this medical image and answer: {query}\n\nProvide a detailed medical analysis focusing on any visible symptoms, conditions, or abnormalities.",
-                        "images": [image_base64]
-                    }
-                ],
-                "stream": False
-            }
-        )
-        response.raise_for_status()
+        with get_breaker("vision").track():
+            response = http_post(
+                f"{OLLAMA_API_URL}/api/chat",
+                json={
+                    "model": VISION_MODEL,
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": f"Analyze this medical image and answer: {query}\n\nProvide a detailed medical analysis focusing on any visible symptoms, conditions, or abnormalities.",
+                            "images": [image_base64]
+                        }
+                    ],
+                    "stream": False,
+                    **({"keep_alive": model_residency.keep_alive_for(VISION_MODEL)} if model_residency else {})
+                },
+                timeout=LLM_TIMEOUT
+            )
+            response.raise_for_status()
         
         # Extract the message content from the response
         response_data = response.json()
+        if model_residency is not None:
+            model_residency.observe(VISION_MODEL, response_data)
         analysis = response_data['message']['content']
         
         print(f"✓ Image analysis complete")
@@ -663,12 +1365,11 @@ def process_image_input(image_data: str) -> dict:
         print(f"⚠️  Error processing image: {e}")
         return {"valid": False, "error": str(e)}
 
-def determine_intent(user_query: str, has_image: bool = False) -> dict:
+def classify_intent_by_rules(user_query: str, has_image: bool = False):
     """
-    Enhanced intent determination that considers image input.
+    Intent for crisis, emergency and image queries, which never need the LLM.
+    Returns None when the query has to be classified by the model.
     """
-    print(f"🎯 Orchestrator: Determining intent for query: '{user_query}' (Image: {has_image})")
-    
     # Check for crisis keywords first
     if any(keyword in user_query.lower() for keyword in CRISIS_KEYWORDS):
         return {
@@ -714,7 +1415,7 @@ def determine_intent(user_query: str, has_image: bool = False) -> dict:
         if medicine_collection_flag and disease_collection_flag:
             return {
                     "intent": "health_inquiry_with_image",
-                    "collections": ["disease_symptoms", "medicines"],
+                    "collections": ["disease_data", "medicines"],
                     "is_crisis": False,
                     "needs_appointment": True,  
                     "requires_vision": True
@@ -730,17 +1431,20 @@ def determine_intent(user_query: str, has_image: bool = False) -> dict:
         else:
             return {
                     "intent": "health_inquiry_with_image",
-                    "collections": ["disease_symptoms"],
+                    "collections": ["disease_data"],
                     "is_crisis": False,
                     "needs_appointment": True, 
                     "requires_vision": True
                 }
     
-    # Standard intent classification
-    system_prompt = (
+    return None
+
+def build_intent_prompt(has_image: bool = False) -> str:
+    """System prompt for LLM intent classification."""
+    return (
         "You are an AI orchestrator for a healthcare system. Analyze the user's query and respond with a JSON object containing:\n"
         "1. 'intent': one of ['health_inquiry', 'medicine_inquiry', 'mental_wellness', 'care_coordination', 'unclear']\n"
-        "2. 'collections': list of relevant knowledge bases from ['disease_symptoms', 'mental_health', 'medicines']\n"
+        "2. 'collections': list of relevant knowledge bases from ['disease_data', 'mental_health', 'medicines']\n"
         "3. 'needs_appointment': boolean - true if user wants/needs to book an appointment or see a doctor\n"
         "4. 'requires_vision': boolean - true if query is about visual diagnosis (skin conditions, medical images, prescriptions)\n\n"
         "Intent definitions:\n"
@@ -752,54 +1456,128 @@ def determine_intent(user_query: str, has_image: bool = False) -> dict:
         f"Note: User {'HAS' if has_image else 'DOES NOT have'} an image attached.\n\n"
         "Respond with only the JSON object, no other text."
     )
+
+def parse_intent_response(content: str, user_query: str, has_image: bool = False) -> dict:
+    """Turn the LLM classifier's JSON reply into intent data with valid collections."""
+    import re
+    json_match = re.search(r'\{.*\}', content, re.DOTALL)
+    if not json_match:
+        raise ValueError("No JSON object in the intent reply")
+    result = json.loads(json_match.group())
+    return build_intent_data(
+        result.get('intent', 'unclear'),
+        result.get('collections', []),
+        result.get('needs_appointment', False),
+        result.get('requires_vision', False) or has_image,
+        user_query
+    )
+
+def resolve_collections(intent: str, requested_collections: list, user_query: str) -> list:
+    """Keep the requested collections that are loaded, falling back on keywords when none are."""
+    valid_collections = [col for col in requested_collections if col in collections]
+    
+    if not valid_collections and intent != 'care_coordination':
+        if 'medicine' in user_query.lower() or 'drug' in user_query.lower():
+            valid_collections = ['medicines']
+        elif any(word in user_query.lower() for word in ['sad', 'anxious', 'depressed', 'stress']):
+            valid_collections = ['mental_health']
+        else:
+            valid_collections = list(collections.keys())[:2]
+    
+    return valid_collections
+
+def build_intent_data(intent: str, requested_collections: list, needs_appointment: bool,
+                      requires_vision: bool, user_query: str) -> dict:
+    """Intent data for the router, keeping only collections that are loaded."""
+    valid_collections = resolve_collections(intent, requested_collections, user_query)
+    
+    print(f"  -> Intent: '{intent}', Collections: {valid_collections}, Vision: {requires_vision}")
+    
+    return {
+        "intent": intent,
+        "collections": valid_collections,
+        "is_crisis": False,
+        "needs_appointment": needs_appointment,
+        "requires_vision": requires_vision
+    }
+
+def default_intent(has_image: bool = False) -> dict:
+    """Intent used when classification fails."""
+    return {
+        "intent": "unclear",
+        "collections": list(collections.keys())[:2],
+        "is_crisis": False,
+        "needs_appointment": False,
+        "requires_vision": has_image
+    }
+
+def classify_intent_locally(user_query: str, has_image: bool = False):
+    """
+    Classify with the embedding classifier. Returns None when it is not
+    loaded or not confident enough, leaving the query to the LLM.
+    """
+    if intent_classifier is None:
+        log_intent_classification('llm')
+        return None
     
+    start_time = time.time()
     try:
-        content = call_model(system_prompt, user_query)
+        label, confidence = intent_classifier.classify(embed_query(user_query))
+    except Exception as e:
+        print(f"  ⚠️  Intent classifier failed: {e}")
+        log_intent_classification('llm_fallback')
+        return None
+    
+    if confidence < INTENT_CLASSIFIER_THRESHOLD:
+        print(f"  -> Classifier unsure ('{label}', {confidence:.2f}), asking the LLM")
+        log_intent_classification('llm_fallback', start_time)
+        return None
+    
+    log_intent_classification('classifier', start_time)
+    print(f"  -> Classifier: '{label}' ({confidence:.2f})")
+    output = intent_classifier.outputs[label]
+    return build_intent_data(
+        output['intent'],
+        output['collections'],
+        output['needs_appointment'],
+        output['requires_vision'] or has_image,
+        user_query
+    )
 
-        
-        import re
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group())
-            intent = result.get('intent', 'unclear')
-            requested_collections = result.get('collections', [])
-            needs_appointment = result.get('needs_appointment', False)
-            requires_vision = result.get('requires_vision', False) or has_image
-        else:
-            intent = 'unclear'
-            requested_collections = []
-            needs_appointment = False
-            requires_vision = has_image
-        
-        valid_collections = [col for col in requested_collections if col in collections]
-        
-        if not valid_collections and intent != 'care_coordination':
-            if 'medicine' in user_query.lower() or 'drug' in user_query.lower():
-                valid_collections = ['medicines']
-            elif any(word in user_query.lower() for word in ['sad', 'anxious', 'depressed', 'stress']):
-                valid_collections = ['mental_health']
-            else:
-                valid_collections = list(collections.keys())[:2]
-        
-        print(f"  -> Intent: '{intent}', Collections: {valid_collections}, Vision: {requires_vision}")
-        
-        return {
-            "intent": intent,
-            "collections": valid_collections,
-            "is_crisis": False,
-            "needs_appointment": needs_appointment,
-            "requires_vision": requires_vision
-        }
-        
+def classify_intent_without_llm(user_query: str, has_image: bool = False):
+    """Rules first, then the embedding classifier. None means the LLM must decide."""
+    intent_data = classify_intent_by_rules(user_query, has_image)
+    if intent_data is not None:
+        log_intent_classification('rules')
+        return intent_data
+    
+    return classify_intent_locally(user_query, has_image)
+
+def determine_intent(user_query: str, has_image: bool = False) -> dict:
+    """
+    Enhanced intent determination that considers image input.
+    In speculative mode, retrieval for the likely route runs during the LLM
+    call; the speculation is returned under 'speculation' for the router.
+    """
+    print(f"🎯 Orchestrator: Determining intent for query: '{user_query}' (Image: {has_image})")
+    
+    intent_data = classify_intent_without_llm(user_query, has_image)
+    if intent_data is not None:
+        return intent_data
+    
+    speculation = None if has_image else start_speculative_retrieval(user_query)
+    try:
+        intent_data = call_model(
+            build_intent_prompt(has_image), user_query,
+            parse=lambda content: parse_intent_response(content, user_query, has_image)
+        )
     except Exception as e:
         print(f"  -> Error during intent classification: {e}")
-        return {
-            "intent": "unclear",
-            "collections": list(collections.keys())[:2],
-            "is_crisis": False,
-            "needs_appointment": False,
-            "requires_vision": has_image
-        }
+        intent_data = default_intent(has_image)
+    
+    if speculation is not None:
+        intent_data['speculation'] = speculation
+    return intent_data
 
 def handle_image_based_inquiry(user_query: str, image_base64: str, collection_names: list):
     """
@@ -815,7 +1593,7 @@ def handle_image_based_inquiry(user_query: str, image_base64: str, collection_na
     enhanced_query = f"{user_query}\n\nBased on visual analysis: {image_analysis}"
     
     # Step 3: Retrieve context from knowledge base
-    retrieval = retrieve_context_from_collections(enhanced_query, collection_names, n_results=3)
+    retrieval = retrieve_context_from_collections(enhanced_query, collection_names, n_results=3, intent="health_inquiry_with_image")
     context = retrieval['context']
     
     # Step 4: Generate comprehensive response
@@ -837,7 +1615,7 @@ def handle_image_based_inquiry(user_query: str, image_base64: str, collection_na
     )
     
     try:
-        get_final_answer(prompt)
+        final_answer = get_final_answer(prompt, "image_inquiry")
 
     except Exception as e:
         print(f"  ⚠️  Error generating answer: {e}")
@@ -1330,171 +2108,412 @@ def handle_care_coordination(user_query: str, conversation_state: dict = None):
         "sources": []
     }
 
+APPOINTMENT_OFFER = (
+    "\n\n---\n\n"
+    "Based on your symptoms/concern, I recommend consulting a doctor. "
+    "Would you like me to help you book an appointment?"
+)
+
+def add_appointment_offer(response: dict) -> dict:
+    """Append the offer to book an appointment to a health answer."""
+    response['needs_appointment'] = True
+    response['answer'] += APPOINTMENT_OFFER
+    response['options'] = [
+        {"id": "book_appointment", "label": "Yes, Book Appointment", "value": "book_appointment"},
+        {"id": "no_thanks", "label": "No, Thanks", "value": "no_thanks"}
+    ]
+    return response
+
+def route_agent(user_query: str, intent_data: dict, image_info: dict = None) -> dict:
+    """
+    Route a new (non care-coordination) request to the agent for its intent.
+    """
+    intent = intent_data['intent']
+    relevant_collections = intent_data['collections']
+    is_crisis = intent_data['is_crisis']
+    needs_appointment = intent_data.get('needs_appointment', False)
+    requires_vision = intent_data.get('requires_vision', False)
+    image_data = image_info['base64'] if image_info else None
+    speculation = intent_data.get('speculation')
+    
+    # 1. Handle emergency situations first
+    if is_crisis and intent == "care_coordination":
+        emergency_type = intent_data.get('emergency_type', 'medical')
+        return get_emergency_response(emergency_type)
+    
+    # 2. Handle image-based queries
+    if requires_vision and image_data:
+        return handle_image_based_inquiry(
+            user_query, 
+            image_data, 
+            relevant_collections
+        )
+    
+    # 3. Handle query with image but no vision analysis needed
+    if image_data and not requires_vision:
+        # Still analyze image but treat as regular health inquiry
+        image_analysis = analyze_image_with_vision_model(image_data, user_query)
+        enhanced_query = f"{user_query}\n\nImage context: {image_analysis}"
+        response_data = handle_health_inquiry(enhanced_query, relevant_collections, intent="health_inquiry_with_image")
+        response_data['image_analyzed'] = True
+        response_data['image_context'] = image_analysis[:200] + "..."  # Brief preview
+        return response_data
+    
+    # 4. If health query needs appointment, offer to book after answering
+    if intent == "health_inquiry" and needs_appointment:
+        return add_appointment_offer(handle_health_inquiry(user_query, relevant_collections, speculation=speculation))
+    
+    # 5. Route to appropriate agent based on intent
+    if intent == "health_inquiry" or intent == "health_inquiry_with_image":
+        return handle_health_inquiry(user_query, relevant_collections, intent=intent, speculation=speculation)
+    
+    if intent == "medicine_inquiry":
+        return handle_medicine_inquiry(user_query, speculation)
+    
+    if intent == "mental_wellness" or is_crisis:
+        return handle_mental_wellness(user_query, is_crisis)
+    
+    if intent == "care_coordination" or needs_appointment:
+        return handle_care_coordination(user_query, None)
+    
+    # Unclear intent
+    print("Agent: Fallback - Asking clarifying questions.")
+    return {
+        "agent": "Orchestrator",
+        "response_type": "clarification",
+        "answer": (
+            "I'm not sure I understand what you're looking for. Could you please clarify?\n\n"
+            "I can help with:\n"
+            "- Health questions about diseases and symptoms\n"
+            "- Medicine information and recommendations\n"
+            "- Mental health and wellness support\n"
+            "- Finding doctors and booking appointments\n"
+            "- Analyzing medical images (skin conditions, prescriptions, test results)"
+        ),
+        "options": [
+            {"id": "health", "label": "Health Question", "value": "health_inquiry"},
+            {"id": "medicine", "label": "Medicine Info", "value": "medicine_inquiry"},
+            {"id": "mental", "label": "Mental Wellness", "value": "mental_wellness"},
+            {"id": "appointment", "label": "Book Appointment", "value": "care_coordination"},
+            {"id": "image", "label": "Analyze Image", "value": "image_analysis"}
+        ],
+        "sources": []
+    }
+
+# --- Startup Gate ---
+@app.before_request
+def ensure_service_ready():
+    """
+    In lazy mode, start the warmup if no post_fork hook did, and turn away
+    agent requests with 503 until it finishes. Health and metrics stay open.
+    """
+    if not LAZY_INIT_ENABLED or service_ready.is_set():
+        return None
+    
+    start_background_warmup()
+    if request.path.startswith(('/v1/health', '/v1/metrics')):
+        return None
+    
+    response = jsonify({
+        "error": "Service is warming up. Please retry shortly.",
+        "phase": service_state["phase"]
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = "5"
+    return response
+
+# --- Shared Orchestration Steps ---
+# Used by both orchestration endpoints here and by their async versions in asgi_app.py
+def sse_event(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def parse_orchestration_request(data: dict):
+    """
+    Validate an orchestration request body and decode its image, if any.
+
+    Returns:
+        (fields: dict, None, None) on success, or (None, error_body: dict, status_code: int)
+    """
+    if not embedding_model or not collections:
+        return None, {"error": "Service is not initialized properly."}, 500
+
+    data = data or {}
+    user_query = data.get('query')
+    image_data = data.get('image', None)
+
+    if not user_query:
+        return None, {"error": "Query not provided"}, 400
+
+    image_info = None
+    if image_data:
+        image_info = process_image_input(image_data)
+        if not image_info['valid']:
+            return None, {
+                "error": "Invalid image data",
+                "details": image_info.get('error', 'Unknown error')
+            }, 400
+        print(f"✓ Image validated: {image_info['format']} {image_info['size']}")
+
+    return {
+        "user_query": user_query,
+        "image_info": image_info,
+        "has_image": bool(image_data),
+        "conversation_state": data.get('conversation_state', None)
+    }, None, None
+
+def print_request_banner(user: dict, fields: dict, mode: str = None):
+    print(f"\n{'='*80}")
+    print(f"👤 User: {user['email']} (ID: {user['user_id']}, Role: {user['role']})" + (f" [{mode}]" if mode else ""))
+    print(f"📨 Query: {fields['user_query']}")
+    print(f"🖼️  Image: {'Yes' if fields['has_image'] else 'No'}")
+    if fields['conversation_state']:
+        print(f"📊 State: {fields['conversation_state'].get('step', 'unknown')}")
+    print(f"{'='*80}")
+
+def prepare_llm_agent(user_query: str, intent_data: dict, has_image: bool):
+    """
+    Retrieval stage for the routes answered by a single LLM generation
+    (text-only health, medicine and mental wellness queries), in the same
+    order route_agent checks them. The generation itself is left to the
+    caller so it can be streamed or awaited.
+
+    Returns:
+        dict with the partial response, its prompt (None when the response
+        is already complete), the query embedding and semantic cache key;
+        or None for routes answered in one piece by route_agent.
+    """
+    intent = intent_data['intent']
+    is_crisis = intent_data['is_crisis']
+
+    if has_image or (is_crisis and intent == "care_coordination"):
+        return None
+
+    if intent == "health_inquiry" or intent == "health_inquiry_with_image":
+        collection_names = intent_data['collections']
+    elif intent == "medicine_inquiry":
+        print("💊 Agent: Medicine Inquiry Agent activated.")
+        collection_names = ['medicines']
+    elif intent == "mental_wellness" or is_crisis:
+        response, prompt = prepare_mental_wellness(user_query, is_crisis)
+        return {
+            "response": response,
+            "prompt": prompt,
+            "query_embedding": None,
+            "intent": intent,
+            "collections": ['mental_health'],
+            "offer_appointment": False
+        }
+    else:
+        return None
+
+    response, prompt, query_embedding = prepare_health_inquiry(
+        user_query, collection_names, intent, intent_data.get('speculation')
+    )
+    return {
+        "response": response,
+        "prompt": prompt,
+        "query_embedding": query_embedding,
+        "intent": intent,
+        "collections": collection_names,
+        "offer_appointment": intent == "health_inquiry" and intent_data.get('needs_appointment', False)
+    }
+
+def continues_care_coordination(fields: dict) -> bool:
+    conversation_state = fields['conversation_state']
+    return bool(conversation_state) and conversation_state.get('step') != 'initial'
+
+def dispatch_request(fields: dict, intent_data: dict = None) -> tuple:
+    """
+    Classify a request and run its agent up to, but not including, the
+    generation of an LLM answer. `intent_data` may be passed in when the
+    caller has already determined the intent (the ASGI app does so without
+    blocking its event loop).
+
+    Returns:
+        (response_data, prepared, intent_data). prepared is the LLM agent
+        still waiting for generation (see prepare_llm_agent), or None when
+        response_data is final.
+    """
+    user_query = fields['user_query']
+
+    # If we're in a care coordination flow, continue with that
+    if continues_care_coordination(fields):
+        print("↪️  Continuing Care Coordination flow...")
+        return handle_care_coordination(user_query, fields['conversation_state']), None, {}
+
+    if intent_data is None:
+        intent_data = determine_intent(user_query, has_image=fields['has_image'])
+
+    try:
+        prepared = prepare_llm_agent(user_query, intent_data, fields['has_image'])
+        if prepared is not None:
+            return prepared['response'], prepared, intent_data
+        return route_agent(user_query, intent_data, fields['image_info']), None, intent_data
+    finally:
+        finish_speculative_retrieval(intent_data)
+
+def complete_llm_agent(prepared: dict, answer: str = None) -> dict:
+    """
+    Finish a response prepared by prepare_llm_agent with its generated
+    `answer` (unused when the prepared prompt is None).
+    """
+    response = prepared['response']
+    if prepared['prompt'] is not None:
+        response['answer'] = answer
+        if answer != LLM_ERROR_ANSWER:
+            store_semantic_cache(prepared['intent'], prepared['collections'], prepared['query_embedding'], response)
+
+    if prepared['offer_appointment']:
+        add_appointment_offer(response)
+    return response
+
+def add_response_metadata(response_data: dict, fields: dict, intent_data: dict, user: dict) -> dict:
+    response_data['query'] = fields['user_query']
+    response_data['has_image'] = fields['has_image']
+    response_data['intent'] = intent_data.get('intent', 'care_coordination')
+    response_data['collections_used'] = intent_data.get('collections', [])
+    response_data['user'] = {
+        'user_id': user['user_id'],
+        'email': user['email'],
+        'role': user['role']
+    }
+    return response_data
+
+def log_orchestration(response_data: dict, intent_data: dict):
+    """Log the collections a response used and any crisis it detected."""
+    for collection in response_data['collections_used']:
+        log_collection_query(collection)
+    if intent_data.get('is_crisis'):
+        log_crisis_detection(intent_data.get('emergency_type', 'unknown'))
+
+class AnswerStream:
+    """
+    The server-sent events of one streamed orchestration response.
+
+    Emits `metadata` (agent, intent, collections) and `sources` once the
+    request is dispatched, the answer as `token` events while the LLM
+    generates it, then `done` with the same body the JSON endpoint returns.
+    Routes that are not a single LLM generation (care coordination, images,
+    emergencies) send their whole answer as one token. The time of the first
+    token is kept for the time-to-first-token metric.
+
+    The endpoints only pull the LLM stream and make the blocking calls
+    (finish_answer, the chat log) in their own way.
+    """
+
+    def __init__(self, fields: dict, user: dict):
+        self.fields = fields
+        self.user = user
+        self.response_data = {}
+        self.prepared = None
+        self.intent_data = {}
+        self.answer = ""
+        self.first_token_time = None
+
+    def start(self, response_data: dict, prepared: dict, intent_data: dict) -> list:
+        """Take the result of dispatch_request; returns the metadata and sources events."""
+        self.response_data, self.prepared, self.intent_data = response_data, prepared, intent_data
+        return [
+            sse_event("metadata", {
+                "agent": response_data.get('agent'),
+                "response_type": response_data.get('response_type'),
+                "intent": intent_data.get('intent', 'care_coordination'),
+                "collections_used": intent_data.get('collections', []),
+                "has_image": self.fields['has_image']
+            }),
+            sse_event("sources", {"sources": response_data.get('sources', [])})
+        ]
+
+    @property
+    def prompt(self):
+        """The prompt whose answer is streamed, or None when the answer is already complete."""
+        return self.prepared['prompt'] if self.prepared is not None else None
+
+    def token(self, piece: str) -> str:
+        if self.first_token_time is None:
+            self.first_token_time = time.time()
+        self.answer += piece
+        return sse_event("token", {"text": piece})
+
+    def finish_answer(self):
+        """Keep the fully streamed answer and cache it."""
+        if not self.answer:
+            raise ValueError("Model returned an empty answer")
+
+        self.response_data['answer'] = self.answer
+        store_semantic_cache(self.prepared['intent'], self.prepared['collections'],
+                             self.prepared['query_embedding'], self.response_data)
+
+    def answer_failed(self, error: Exception) -> list:
+        print(f"  ⚠️  Error streaming answer: {error}")
+        if self.answer:
+            # Keep what the user has already seen
+            self.response_data['answer'] = self.answer
+            return [sse_event("error", {"error": "The answer was interrupted. Please try again."})]
+        return [self.token(self.response_data['answer'])]
+
+    def closing_tokens(self) -> list:
+        """The appointment offer after a streamed answer, or the whole answer when nothing was streamed."""
+        offer_appointment = self.prepared is not None and self.prepared['offer_appointment']
+        if offer_appointment:
+            add_appointment_offer(self.response_data)
+
+        if self.prompt is not None:
+            return [sse_event("token", {"text": APPOINTMENT_OFFER})] if offer_appointment else []
+        return [self.token(self.response_data.get('answer', ''))]
+
+    def done(self) -> str:
+        add_response_metadata(self.response_data, self.fields, self.intent_data, self.user)
+        return sse_event("done", self.response_data)
+
+    def failed(self) -> str:
+        return sse_event("error", {"error": "An error occurred while processing your request."})
+
+    def log_request(self, endpoint: str, start_time: float):
+        log_streamed_request(
+            endpoint, self.user['user_id'], start_time, self.first_token_time,
+            agent_name=self.response_data.get('agent'), intent=self.response_data.get('intent')
+        )
+
 # --- Main API Endpoint: The AI Orchestrator ---
 @app.route('/v1/agent/orchestrate', methods=['POST'])
-@verify_user_token 
-@rate_limit 
+@verify_user_token
+@rate_limit
 @monitor_request
 def orchestrate_agent():
     """
     Main orchestration endpoint with image support.
     Accepts both text queries and images (base64 encoded).
     """
-    if not embedding_model or not collections:
-        return jsonify({"error": "Service is not initialized properly."}), 500
+    fields, error, status_code = parse_orchestration_request(request.json)
+    if error:
+        return jsonify(error), status_code
 
-    user_id = request.user['user_id']
-    user_email = request.user['email']
-    user_role = request.user['role']
-
-    data = request.json
-    user_query = data.get('query')
-    image_data = data.get('image', None)
-    conversation_state = data.get('conversation_state', None)
-    
-    if not user_query:
-        return jsonify({"error": "Query not provided"}), 400
+    user = request.user
 
     try:
-        print(f"\n{'='*80}")
-        print(f"👤 User: {user_email} (ID: {user_id}, Role: {user_role})")
-        print(f"📨 Query: {user_query}")
-        print(f"🖼️  Image: {'Yes' if image_data else 'No'}")
-        if conversation_state:
-            print(f"📊 State: {conversation_state.get('step', 'unknown')}")
-        print(f"{'='*80}")
-        
+        print_request_banner(user, fields)
+
         # Log user message to database
-        log_chat_to_database(user_id, user_query, 'User')
-        
-        # Process image if provided
-        image_info = None
-        if image_data:
-            image_info = process_image_input(image_data)
-            if not image_info['valid']:
-                return jsonify({
-                    "error": "Invalid image data",
-                    "details": image_info.get('error', 'Unknown error')
-                }), 400
-            print(f"✓ Image validated: {image_info['format']} {image_info['size']}")
-        
-        # If we're in a care coordination flow, continue with that
-        if conversation_state and conversation_state.get('step') != 'initial':
-            print("↪️  Continuing Care Coordination flow...")
-            response_data = handle_care_coordination(user_query, conversation_state)
-        else:
-            # 1. Analyze User Intent (with image awareness)
-            intent_data = determine_intent(user_query, has_image=bool(image_data))
-            intent = intent_data['intent']
-            relevant_collections = intent_data['collections']
-            is_crisis = intent_data['is_crisis']
-            needs_appointment = intent_data.get('needs_appointment', False)
-            requires_vision = intent_data.get('requires_vision', False)
-            
-            # 2. Handle emergency situations first
-            if is_crisis and intent == "care_coordination":
-                emergency_type = intent_data.get('emergency_type', 'medical')
-                response_data = get_emergency_response(emergency_type)
-            
-            # 3. Handle image-based queries
-            elif requires_vision and image_data:
-                response_data = handle_image_based_inquiry(
-                    user_query, 
-                    image_info['base64'], 
-                    relevant_collections
-                )
-            
-            # 4. Handle query with image but no vision analysis needed
-            elif image_data and not requires_vision:
-                # Still analyze image but treat as regular health inquiry
-                image_analysis = analyze_image_with_vision_model(image_info['base64'], user_query)
-                enhanced_query = f"{user_query}\n\nImage context: {image_analysis}"
-                response_data = handle_health_inquiry(enhanced_query, relevant_collections)
-                response_data['image_analyzed'] = True
-                response_data['image_context'] = image_analysis[:200] + "..."  # Brief preview
-            
-            # 5. If health query needs appointment, offer to book after answering
-            elif intent == "health_inquiry" and needs_appointment:
-                health_response = handle_health_inquiry(user_query, relevant_collections)
-                health_response['needs_appointment'] = True
-                health_response['answer'] += (
-                    "\n\n---\n\n"
-                    "Based on your symptoms/concern, I recommend consulting a doctor. "
-                    "Would you like me to help you book an appointment?"
-                )
-                health_response['options'] = [
-                    {"id": "book_appointment", "label": "Yes, Book Appointment", "value": "book_appointment"},
-                    {"id": "no_thanks", "label": "No, Thanks", "value": "no_thanks"}
-                ]
-                response_data = health_response
-            
-            # 6. Route to appropriate agent based on intent
-            elif intent == "health_inquiry" or intent == "health_inquiry_with_image":
-                response_data = handle_health_inquiry(user_query, relevant_collections)
-            
-            elif intent == "medicine_inquiry":
-                response_data = handle_medicine_inquiry(user_query)
-            
-            elif intent == "mental_wellness" or is_crisis:
-                response_data = handle_mental_wellness(user_query, is_crisis)
-            
-            elif intent == "care_coordination" or needs_appointment:
-                response_data = handle_care_coordination(user_query, None)
-                
-            else:  # Unclear intent
-                print("Agent: Fallback - Asking clarifying questions.")
-                response_data = {
-                    "agent": "Orchestrator",
-                    "response_type": "clarification",
-                    "answer": (
-                        "I'm not sure I understand what you're looking for. Could you please clarify?\n\n"
-                        "I can help with:\n"
-                        "- Health questions about diseases and symptoms\n"
-                        "- Medicine information and recommendations\n"
-                        "- Mental health and wellness support\n"
-                        "- Finding doctors and booking appointments\n"
-                        "- Analyzing medical images (skin conditions, prescriptions, test results)"
-                    ),
-                    "options": [
-                        {"id": "health", "label": "Health Question", "value": "health_inquiry"},
-                        {"id": "medicine", "label": "Medicine Info", "value": "medicine_inquiry"},
-                        {"id": "mental", "label": "Mental Wellness", "value": "mental_wellness"},
-                        {"id": "appointment", "label": "Book Appointment", "value": "care_coordination"},
-                        {"id": "image", "label": "Analyze Image", "value": "image_analysis"}
-                    ],
-                    "sources": []
-                }
-        
+        log_chat_to_database(user['user_id'], fields['user_query'], 'User')
+
+        response_data, prepared, intent_data = dispatch_request(fields)
+        if prepared is not None:
+            answer = get_final_answer(prepared['prompt'], prepared['intent']) if prepared['prompt'] else None
+            response_data = complete_llm_agent(prepared, answer)
+
         # Log AI response to database
-        log_chat_to_database(user_id, response_data.get('answer', ''), 'AI')
-        
-        # Add metadata to response
-        response_data['query'] = user_query
-        response_data['has_image'] = bool(image_data)
-        response_data['intent'] = intent_data.get('intent', 'unknown') if not conversation_state else 'care_coordination'
-        response_data['collections_used'] = relevant_collections if not conversation_state else []
-        response_data['user'] = {
-            'user_id': user_id,
-            'email': user_email,
-            'role': user_role
-        }
-        
+        log_chat_to_database(user['user_id'], response_data.get('answer', ''), 'AI')
+
+        add_response_metadata(response_data, fields, intent_data, user)
+
         print(f"\n✅ Response by: {response_data['agent']}")
         print(f"{'='*80}\n")
 
-        if 'agent' in response_data:
-            log_agent_usage(
-                response_data['agent'],
-                intent=response_data.get('intent')
-            )
-        
-        if 'collections_used' in response_data:
-            for collection in response_data['collections_used']:
-                log_collection_query(collection)
-        
-        if is_crisis:
-            log_crisis_detection(intent_data.get('emergency_type', 'unknown'))
-        
+        log_agent_usage(response_data['agent'], intent=response_data['intent'])
+        log_orchestration(response_data, intent_data)
+
         return jsonify(response_data)
 
     except Exception as e:
@@ -1503,6 +2522,64 @@ def orchestrate_agent():
         traceback.print_exc()
         return jsonify({"error": "An error occurred while processing your request."}), 500
 
+@app.route('/v1/agent/orchestrate/stream', methods=['POST'])
+@verify_user_token
+@rate_limit
+def orchestrate_agent_stream():
+    """
+    Streaming variant of the orchestration endpoint (Server-Sent Events).
+    See AnswerStream for the events sent.
+    """
+    start_time = time.time()
+    endpoint = request.endpoint
+    fields, error, status_code = parse_orchestration_request(request.json)
+    if error:
+        return jsonify(error), status_code
+
+    user = request.user
+
+    def generate():
+        stream = AnswerStream(fields, user)
+
+        try:
+            print_request_banner(user, fields, "stream")
+            log_chat_to_database(user['user_id'], fields['user_query'], 'User')
+
+            yield from stream.start(*dispatch_request(fields))
+
+            if stream.prompt is not None:
+                try:
+                    for piece in stream_final_answer(stream.prompt, stream.prepared['intent']):
+                        yield stream.token(piece)
+                    stream.finish_answer()
+                except Exception as e:
+                    yield from stream.answer_failed(e)
+            yield from stream.closing_tokens()
+
+            # Log AI response to database once the full answer is known
+            log_chat_to_database(user['user_id'], stream.response_data.get('answer', ''), 'AI')
+            yield stream.done()
+
+            print(f"\n✅ Streamed response by: {stream.response_data.get('agent')}")
+            print(f"{'='*80}\n")
+
+            log_orchestration(stream.response_data, stream.intent_data)
+
+        except Exception as e:
+            print(f"❌ Error during streamed orchestration: {e}")
+            import traceback
+            traceback.print_exc()
+            yield stream.failed()
+
+        finally:
+            stream.log_request(endpoint, start_time)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/v1/agent/analyze-image', methods=['POST'])
 @verify_user_token 
 @rate_limit
@@ -1595,12 +2672,48 @@ def health_check():
         ],
         "rate_limiting": os.getenv("RATE_LIMIT_ENABLED", "true"),
         "monitoring": os.getenv("MONITORING_ENABLED", "true"),
+        "embedding_cache": os.getenv("EMBEDDING_CACHE_ENABLED", "true"),
+        "persistent_embedding_cache": str(persistent_embedding_cache is not None).lower(),
+        "retrieval_backend": RETRIEVAL_BACKEND,
+        "embedding_backend": getattr(embedding_model, "name", EMBEDDING_BACKEND),
+        "semantic_cache": str(semantic_answer_cache is not None).lower(),
+        "retrieval_cache": str(retrieval_cache is not None).lower(),
+        "llm_cache": str(llm_cache is not None).lower(),
+        "speculative_retrieval": str(SPECULATIVE_RETRIEVAL_ENABLED).lower(),
+        "single_flight": str(single_flight is not None).lower(),
+        "llm_hedging": str(LLM_HEDGING_ENABLED).lower(),
+        "llm_primary_backend": primary_backend(),
+        "circuit_breaker": str(CIRCUIT_BREAKER_ENABLED).lower(),
+        "ollama_residency": str(model_residency is not None).lower(),
+        "hybrid_retrieval": str(HYBRID_RETRIEVAL_ENABLED and bool(lexical_indexes)).lower(),
+        "context_packing": str(CONTEXT_PACKING_ENABLED).lower(),
+        "intent_classifier": str(intent_classifier is not None).lower(),
+        "lazy_init": str(LAZY_INIT_ENABLED).lower(),
         "using_gemini": str(use_gemini).lower(),      # "true" / "false"
         "local_llm_available": not use_gemini         # for clarity in frontend
     }
 
     return jsonify(status)
 
+@app.route('/v1/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving HTTP."""
+    return jsonify({"status": "alive", "timestamp": time.time()})
+
+@app.route('/v1/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: models and indexes are loaded (and warmed up in lazy mode)."""
+    ready = service_ready.is_set()
+    response = jsonify({
+        "status": "ready" if ready else "not_ready",
+        "phase": service_state["phase"],
+        "error": service_state["error"],
+        "startup_phases": service_state["phases"],
+        "timestamp": time.time()
+    })
+    response.status_code = 200 if ready else 503
+    return response
+
 @app.route('/v1/collections', methods=['GET'])
 def list_collections():
     """List all available collections and their counts."""
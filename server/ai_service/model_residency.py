@@ -0,0 +1,89 @@
+"""
+Model Residency Module for AI Service
+Keeps the text and vision models resident on a shared Ollama host: sets
+keep_alive per model, pre-warms them at startup, and counts the cold loads
+Ollama reports through `load_duration` so model swapping shows up in metrics
+"""
+
+import os
+from http_client import http_get, http_post, LLM_TIMEOUT
+from monitoring import log_model_load
+from openai_backend import parse_agent_settings
+
+# Configuration
+OLLAMA_RESIDENCY_ENABLED = os.getenv("OLLAMA_RESIDENCY_ENABLED", "false").lower() == "true"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # duration, seconds, or -1 to keep loaded
+OLLAMA_MODEL_KEEP_ALIVE = os.getenv("OLLAMA_MODEL_KEEP_ALIVE", "")  # e.g. "qwen2.5vl:3b=10m,qwen3:0.6b=-1"
+# Warm requests still report a few ms of load_duration; above this a load counts as cold
+OLLAMA_COLD_LOAD_THRESHOLD_MS = float(os.getenv("OLLAMA_COLD_LOAD_THRESHOLD_MS", "500"))
+
+
+def parse_keep_alive(value: str):
+    """Ollama takes a duration string ('30m') or a number of seconds (-1 = forever)."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+class ModelResidency:
+    """
+    `keep_alive_for(model)` goes into every native Ollama request so each one
+    renews that model's residency for its configured time. `observe(model,
+    response)` records the load time Ollama reports; a load above the
+    threshold means the model had been evicted and was read back from disk.
+    """
+
+    def __init__(self, api_url: str, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 model_keep_alive: dict = None,
+                 cold_load_threshold_ms: float = OLLAMA_COLD_LOAD_THRESHOLD_MS):
+        self.api_url = api_url.rstrip("/")
+        self.keep_alive = parse_keep_alive(keep_alive)
+        self.model_keep_alive = {model: parse_keep_alive(value) for model, value in (model_keep_alive or {}).items()}
+        self.cold_load_threshold = cold_load_threshold_ms / 1000
+
+    def keep_alive_for(self, model: str):
+        return self.model_keep_alive.get(model, self.keep_alive)
+
+    def observe(self, model: str, response: dict, prewarm: bool = False) -> float:
+        """Record the load time from a native Ollama response (nanoseconds) and return it in seconds."""
+        load_seconds = (response.get('load_duration') or 0) / 1e9
+        cold = load_seconds > self.cold_load_threshold
+        if cold and not prewarm:
+            print(f"  🥶 Cold load of '{model}' took {load_seconds:.2f}s")
+        log_model_load(model, load_seconds, cold, prewarm)
+        return load_seconds
+
+    def prewarm(self, models: list):
+        """
+        Load each model with its keep_alive. A generate request without a
+        prompt only loads the model, so nothing is generated.
+        """
+        for model in models:
+            try:
+                response = http_post(
+                    f"{self.api_url}/api/generate",
+                    json={"model": model, "keep_alive": self.keep_alive_for(model)},
+                    timeout=LLM_TIMEOUT
+                )
+                response.raise_for_status()
+                load_seconds = self.observe(model, response.json(), prewarm=True)
+                print(f"✅ Pre-warmed '{model}' in {load_seconds:.2f}s (keep_alive={self.keep_alive_for(model)})")
+            except Exception as e:
+                print(f"⚠️  Could not pre-warm '{model}': {e}")
+
+    def loaded_models(self) -> dict:
+        """Models Ollama currently holds in memory, with when each expires."""
+        response = http_get(f"{self.api_url}/api/ps", timeout=2)
+        response.raise_for_status()
+        return {model['name']: model.get('expires_at') for model in response.json().get('models', [])}
+
+
+def create_model_residency(api_url: str):
+    """Create the residency manager for the Ollama host, or None when disabled."""
+    if not OLLAMA_RESIDENCY_ENABLED:
+        return None
+
+    residency = ModelResidency(api_url, model_keep_alive=parse_agent_settings(OLLAMA_MODEL_KEEP_ALIVE))
+    print(f"✅ Ollama model residency enabled (keep_alive={residency.keep_alive})")
+    return residency
@@ -29,6 +29,8 @@ class MetricsCollector:
         self.requests_by_endpoint = defaultdict(int)
         self.requests_by_user = defaultdict(int)
         self.requests_by_agent = defaultdict(int)
+        self.streamed_requests = 0
+        self.first_token_times = deque(maxlen=1000)
         
         # Error tracking
         self.error_count = 0
@@ -38,6 +40,8 @@ class MetricsCollector:
         # Agent usage
         self.agent_response_times = defaultdict(list)
         self.intent_distribution = defaultdict(int)
+        self.intent_classification_sources = defaultdict(int)  # rules / classifier / llm_fallback / llm
+        self.intent_classifier_times = deque(maxlen=1000)
         self.collection_usage = defaultdict(int)
         
         # Image processing
@@ -52,6 +56,77 @@ class MetricsCollector:
         self.crisis_detections = 0
         self.crisis_by_type = defaultdict(int)
         
+        # Query embedding cache
+        self.embedding_cache_events = defaultdict(int)
+        
+        # Query embedding encode latency
+        self.embedding_encodes = 0
+        self.embedding_encode_times = deque(maxlen=1000)
+        
+        # Embedding micro-batching
+        self.embedding_batches = 0
+        self.embedding_batch_sizes = deque(maxlen=1000)
+        self.embedding_queue_waits = deque(maxlen=1000)
+        
+        # Persistent (SQLite) embedding cache
+        self.persistent_embedding_cache_events = defaultdict(int)
+        
+        # Outbound HTTP connection pools (per host)
+        self.http_pool_requests = defaultdict(int)
+        self.http_pool_waits = defaultdict(lambda: deque(maxlen=1000))
+        self.http_pool_active = defaultdict(int)
+        self.http_pool_idle = defaultdict(int)  # idle connections at the latest checkout
+        self.http_pool_peak_active = defaultdict(int)
+        
+        # Embedding sidecar (remote encodes vs in-process fallbacks)
+        self.embedding_server_events = defaultdict(int)
+        
+        # Startup phase durations (seconds, latest run per phase)
+        self.startup_phases = {}
+        
+        # Semantic answer cache
+        self.semantic_cache_events = defaultdict(lambda: defaultdict(int))
+        
+        # Retrieval result cache
+        self.retrieval_cache_events = defaultdict(int)
+        
+        # Deterministic LLM call memoization (per call site)
+        self.llm_cache_events = defaultdict(lambda: defaultdict(int))
+        
+        # Single-flight coalescing of identical LLM calls (per call site)
+        self.single_flight_events = defaultdict(lambda: defaultdict(int))
+        
+        # LLM backend latencies and hedging (per call site)
+        self.llm_backend_times = defaultdict(lambda: deque(maxlen=1000))
+        self.llm_backend_errors = defaultdict(int)
+        self.llm_hedge_events = defaultdict(lambda: defaultdict(int))
+        
+        # OpenAI-compatible backend concurrency slots
+        self.llm_slot_waits = deque(maxlen=1000)
+        self.llm_slot_requests = 0
+        self.llm_peak_in_flight = 0
+        
+        # Ollama model loads (per model), split into pre-warms and cold loads
+        self.model_load_times = defaultdict(lambda: deque(maxlen=1000))
+        self.model_load_events = defaultdict(lambda: defaultdict(int))
+        
+        # Circuit breakers (latest state, times opened, calls rejected)
+        self.circuit_breaker_states = {}
+        self.circuit_breaker_opens = defaultdict(int)
+        self.circuit_breaker_rejections = defaultdict(int)
+        
+        # Speculative retrieval during LLM intent classification
+        self.speculative_retrieval_events = defaultdict(int)
+        self.speculative_wasted_seconds = 0.0
+        
+        # Hybrid (BM25 + vector) retrieval
+        self.hybrid_searches = 0
+        self.hybrid_lexical_matches = 0
+        self.hybrid_lexical_only_chunks = 0
+        
+        # Context packing (per agent intent)
+        self.context_packing = defaultdict(lambda: defaultdict(int))
+        
         print("✅ Metrics collector initialized")
     
     def record_request(self, endpoint: str, user_id: int = None, duration: float = 0):
@@ -68,6 +143,12 @@ class MetricsCollector:
             if user_id:
                 self.requests_by_user[user_id] += 1
     
+    def record_time_to_first_token(self, duration: float):
+        """Record the delay before a streamed response sent its first answer token."""
+        with self.lock:
+            self.streamed_requests += 1
+            self.first_token_times.append(duration)
+    
     def record_agent_response(self, agent_name: str, duration: float, intent: str = None):
         """Record agent response time and usage."""
         with self.lock:
@@ -81,6 +162,13 @@ class MetricsCollector:
             if intent:
                 self.intent_distribution[intent] += 1
     
+    def record_intent_classification(self, source: str, duration: float = None):
+        """Record which stage decided a query's intent."""
+        with self.lock:
+            self.intent_classification_sources[source] += 1
+            if duration is not None:
+                self.intent_classifier_times.append(duration)
+    
     def record_collection_query(self, collection_name: str):
         """Record knowledge base collection usage."""
         with self.lock:
@@ -120,6 +208,140 @@ class MetricsCollector:
             self.crisis_detections += 1
             self.crisis_by_type[crisis_type] += 1
     
+    def record_embedding_cache_event(self, event: str):
+        """Record a query embedding cache hit, miss or eviction."""
+        with self.lock:
+            self.embedding_cache_events[event] += 1
+    
+    def record_embedding_encode(self, duration: float):
+        """Record the time taken to encode a query embedding."""
+        with self.lock:
+            self.embedding_encodes += 1
+            self.embedding_encode_times.append(duration)
+    
+    def record_embedding_batch(self, batch_size: int, queue_waits: list):
+        """Record a micro-batched encode call and how long its requests queued."""
+        with self.lock:
+            self.embedding_batches += 1
+            self.embedding_batch_sizes.append(batch_size)
+            self.embedding_queue_waits.extend(queue_waits)
+    
+    def record_semantic_cache_event(self, intent: str, event: str):
+        """Record a semantic answer cache hit or miss for an intent."""
+        with self.lock:
+            self.semantic_cache_events[intent][event] += 1
+    
+    def record_persistent_embedding_cache_event(self, event: str, count: int = 1):
+        """Record persistent embedding cache hits, misses or evictions."""
+        with self.lock:
+            self.persistent_embedding_cache_events[event] += count
+    
+    def record_http_pool_checkout(self, host: str, wait: float, idle: int):
+        """Record a pooled connection checkout: wait time and idle connections available."""
+        with self.lock:
+            self.http_pool_requests[host] += 1
+            self.http_pool_waits[host].append(wait)
+            self.http_pool_idle[host] = idle
+    
+    def record_http_pool_active(self, host: str, active: int):
+        """Record the number of in-flight requests to a host."""
+        with self.lock:
+            self.http_pool_active[host] = active
+            self.http_pool_peak_active[host] = max(self.http_pool_peak_active[host], active)
+    
+    def record_embedding_server_event(self, event: str):
+        """Record an encode served by the embedding sidecar or the fallback."""
+        with self.lock:
+            self.embedding_server_events[event] += 1
+    
+    def record_startup_phase(self, phase: str, duration: float):
+        """Record how long a startup phase took."""
+        with self.lock:
+            self.startup_phases[phase] = duration
+    
+    def record_retrieval_cache_event(self, event: str):
+        """Record a retrieval cache L1 hit, L2 hit or miss."""
+        with self.lock:
+            self.retrieval_cache_events[event] += 1
+    
+    def record_llm_cache_event(self, call_site: str, event: str):
+        """Record an LLM cache L1 hit, L2 hit or miss for a call site."""
+        with self.lock:
+            self.llm_cache_events[call_site][event] += 1
+    
+    def record_single_flight_event(self, call_site: str, event: str):
+        """Record a backend call, or a call coalesced onto one in this or another worker."""
+        with self.lock:
+            self.single_flight_events[call_site][event] += 1
+    
+    def record_llm_backend_call(self, backend: str, duration: float, ok: bool):
+        """Record one call to an LLM backend."""
+        with self.lock:
+            if ok:
+                self.llm_backend_times[backend].append(duration)
+            else:
+                self.llm_backend_errors[backend] += 1
+    
+    def record_llm_hedge_event(self, call_site: str, event: str):
+        """Record a routed request, a hedge, a failover or a hedge win."""
+        with self.lock:
+            self.llm_hedge_events[call_site][event] += 1
+    
+    def record_llm_slot_wait(self, wait: float, in_flight: int):
+        """Record how long a request waited for a concurrency slot and the in-flight count after."""
+        with self.lock:
+            self.llm_slot_requests += 1
+            self.llm_slot_waits.append(wait)
+            self.llm_peak_in_flight = max(self.llm_peak_in_flight, in_flight)
+    
+    def record_model_load(self, model: str, load_seconds: float, cold: bool, prewarm: bool):
+        """Record the load time Ollama reported for a model."""
+        with self.lock:
+            self.model_load_events[model]['requests'] += 1
+            if prewarm:
+                self.model_load_events[model]['prewarm'] += 1
+            elif cold:
+                self.model_load_events[model]['cold_start'] += 1
+            if cold or prewarm:
+                self.model_load_times[model].append(load_seconds)
+    
+    def record_circuit_breaker_transition(self, name: str, state: str):
+        """Record a breaker changing state."""
+        with self.lock:
+            self.circuit_breaker_states[name] = state
+            if state == 'open':
+                self.circuit_breaker_opens[name] += 1
+    
+    def record_circuit_breaker_rejection(self, name: str):
+        """Record a call failed fast by an open breaker."""
+        with self.lock:
+            self.circuit_breaker_rejections[name] += 1
+    
+    def record_speculative_retrieval(self, event: str, wasted_seconds: float = None):
+        """Record a speculation started, reused (hit) or discarded, and retrieval time wasted."""
+        with self.lock:
+            self.speculative_retrieval_events[event] += 1
+            if wasted_seconds:
+                self.speculative_wasted_seconds += wasted_seconds
+    
+    def record_hybrid_retrieval(self, lexical_hits: int, lexical_only: int):
+        """Record a fused search and how many chunks only BM25 found."""
+        with self.lock:
+            self.hybrid_searches += 1
+            if lexical_hits:
+                self.hybrid_lexical_matches += 1
+            self.hybrid_lexical_only_chunks += lexical_only
+    
+    def record_context_packing(self, intent: str, stats: dict):
+        """Record the chunks and tokens one request's context packing saved."""
+        with self.lock:
+            totals = self.context_packing[intent or 'unknown']
+            totals['requests'] += 1
+            totals['tokens_before'] += stats['tokens_before']
+            totals['tokens_after'] += stats['tokens_after']
+            totals['duplicates_dropped'] += stats['dropped']['duplicates']
+            totals['chunks_dropped'] += stats['chunks_before'] - stats['chunks_after']
+    
     def get_metrics_summary(self) -> dict:
         """Get summary of all metrics."""
         with self.lock:
@@ -127,6 +349,11 @@ class MetricsCollector:
             recent_times = [r['duration'] for r in list(self.request_times)[-100:]]
             avg_response_time = sum(recent_times) / len(recent_times) if recent_times else 0
             
+            # Time to first token for streamed responses
+            recent_first_token_times = sorted(list(self.first_token_times)[-100:])
+            avg_first_token_time = sum(recent_first_token_times) / len(recent_first_token_times) if recent_first_token_times else 0
+            p95_first_token_time = recent_first_token_times[int(len(recent_first_token_times) * 0.95) - 1] if recent_first_token_times else 0
+            
             # Agent performance
             agent_performance = {}
             for agent, times in self.agent_response_times.items():
@@ -142,6 +369,135 @@ class MetricsCollector:
             recent_image_times = [r['duration'] for r in list(self.image_processing_times)[-100:]]
             avg_image_time = sum(recent_image_times) / len(recent_image_times) if recent_image_times else 0
             
+            # Embedding encode stats
+            recent_encode_times = sorted(list(self.embedding_encode_times)[-100:])
+            avg_encode_time = sum(recent_encode_times) / len(recent_encode_times) if recent_encode_times else 0
+            p95_encode_time = recent_encode_times[int(len(recent_encode_times) * 0.95) - 1] if recent_encode_times else 0
+            
+            # Embedding batching stats
+            recent_batch_sizes = list(self.embedding_batch_sizes)[-100:]
+            avg_batch_size = sum(recent_batch_sizes) / len(recent_batch_sizes) if recent_batch_sizes else 0
+            recent_queue_waits = sorted(list(self.embedding_queue_waits)[-100:])
+            avg_queue_wait = sum(recent_queue_waits) / len(recent_queue_waits) if recent_queue_waits else 0
+            p95_queue_wait = recent_queue_waits[int(len(recent_queue_waits) * 0.95) - 1] if recent_queue_waits else 0
+            
+            # Intent classification stats
+            recent_classifier_times = sorted(list(self.intent_classifier_times)[-100:])
+            avg_classifier_time = sum(recent_classifier_times) / len(recent_classifier_times) if recent_classifier_times else 0
+            p95_classifier_time = recent_classifier_times[int(len(recent_classifier_times) * 0.95) - 1] if recent_classifier_times else 0
+            model_classified = sum(
+                self.intent_classification_sources[source] for source in ('classifier', 'llm_fallback', 'llm')
+            )
+            llm_classified = self.intent_classification_sources['llm_fallback'] + self.intent_classification_sources['llm']
+            
+            # HTTP connection pool stats
+            http_pool = {}
+            for host, requests_count in self.http_pool_requests.items():
+                recent_waits = sorted(list(self.http_pool_waits[host])[-100:])
+                http_pool[host] = {
+                    'requests': requests_count,
+                    'active': self.http_pool_active[host],
+                    'idle': self.http_pool_idle[host],
+                    'peak_active': self.http_pool_peak_active[host],
+                    'avg_wait_ms': round(sum(recent_waits) / len(recent_waits) * 1000, 3) if recent_waits else 0,
+                    'p95_wait_ms': round(recent_waits[int(len(recent_waits) * 0.95) - 1] * 1000, 3) if recent_waits else 0
+                }
+            
+            # Semantic cache stats
+            semantic_cache = {}
+            for intent, events in self.semantic_cache_events.items():
+                lookups = events['hit'] + events['miss']
+                semantic_cache[intent] = {
+                    'hits': events['hit'],
+                    'misses': events['miss'],
+                    'hit_rate': round(events['hit'] / max(lookups, 1) * 100, 2)
+                }
+            
+            # Retrieval cache stats
+            retrieval_hits = self.retrieval_cache_events['l1_hit'] + self.retrieval_cache_events['l2_hit']
+            retrieval_lookups = retrieval_hits + self.retrieval_cache_events['miss']
+            
+            # LLM cache stats
+            llm_cache = {}
+            for call_site, events in self.llm_cache_events.items():
+                hits = events['l1_hit'] + events['l2_hit']
+                llm_cache[call_site] = {
+                    'l1_hits': events['l1_hit'],
+                    'l2_hits': events['l2_hit'],
+                    'misses': events['miss'],
+                    'hit_rate': round(hits / max(hits + events['miss'], 1) * 100, 2)
+                }
+            
+            # Single-flight stats
+            single_flight = {}
+            for call_site, events in self.single_flight_events.items():
+                saved = events['coalesced'] + events['coalesced_remote']
+                single_flight[call_site] = {
+                    'backend_calls': events['call'],
+                    'coalesced': events['coalesced'],
+                    'coalesced_remote': events['coalesced_remote'],
+                    'calls_saved': saved,
+                    'saved_rate': round(saved / max(saved + events['call'], 1) * 100, 2)
+                }
+            
+            # LLM backend and hedging stats
+            llm_backends = {}
+            for backend, times in self.llm_backend_times.items():
+                recent_times = sorted(times)
+                llm_backends[backend] = {
+                    'calls': len(recent_times),
+                    'errors': self.llm_backend_errors[backend],
+                    'avg_time_ms': round(sum(recent_times) / len(recent_times) * 1000, 2) if recent_times else 0,
+                    'p95_time_ms': round(recent_times[int(len(recent_times) * 0.95) - 1] * 1000, 2) if recent_times else 0
+                }
+            for backend, errors in self.llm_backend_errors.items():
+                llm_backends.setdefault(backend, {'calls': 0, 'errors': errors, 'avg_time_ms': 0, 'p95_time_ms': 0})
+            
+            llm_hedging = {}
+            for call_site, events in self.llm_hedge_events.items():
+                second_calls = events['hedged'] + events['failover']
+                llm_hedging[call_site] = {
+                    'requests': events['request'],
+                    'hedged': events['hedged'],
+                    'failovers': events['failover'],
+                    'hedge_wins': events['hedge_win'],
+                    'skipped_pool_full': events['saturated'],
+                    'hedge_rate': round(events['hedged'] / max(events['request'], 1) * 100, 2),
+                    'win_rate': round(events['hedge_win'] / max(second_calls, 1) * 100, 2)
+                }
+            
+            # LLM concurrency slot stats
+            recent_slot_waits = sorted(self.llm_slot_waits)
+            avg_slot_wait = sum(recent_slot_waits) / len(recent_slot_waits) if recent_slot_waits else 0
+            p95_slot_wait = recent_slot_waits[int(len(recent_slot_waits) * 0.95) - 1] if recent_slot_waits else 0
+            
+            # Model residency stats (load times of pre-warms and cold loads)
+            model_residency = {}
+            for model, events in self.model_load_events.items():
+                load_times = self.model_load_times[model]
+                model_residency[model] = {
+                    'requests': events['requests'],
+                    'prewarms': events['prewarm'],
+                    'cold_starts': events['cold_start'],
+                    'cold_start_rate': round(events['cold_start'] / max(events['requests'] - events['prewarm'], 1) * 100, 2),
+                    'avg_load_ms': round(sum(load_times) / len(load_times) * 1000, 2) if load_times else 0,
+                    'max_load_ms': round(max(load_times) * 1000, 2) if load_times else 0
+                }
+            
+            # Circuit breaker stats (breakers that never tripped are closed)
+            circuit_breakers = {
+                name: {
+                    'state': self.circuit_breaker_states.get(name, 'closed'),
+                    'times_opened': self.circuit_breaker_opens[name],
+                    'rejected_calls': self.circuit_breaker_rejections[name]
+                }
+                for name in set(self.circuit_breaker_states) | set(self.circuit_breaker_rejections)
+            }
+            
+            # Embedding cache stats
+            cache_hits = self.embedding_cache_events['hit']
+            cache_lookups = cache_hits + self.embedding_cache_events['miss']
+            
             return {
                 'timestamp': datetime.now().isoformat(),
                 'uptime_seconds': time.time() - self.request_times[0]['timestamp'] if self.request_times else 0,
@@ -149,7 +505,10 @@ class MetricsCollector:
                     'total': self.request_count,
                     'by_endpoint': dict(self.requests_by_endpoint),
                     'by_agent': dict(self.requests_by_agent),
-                    'avg_response_time': round(avg_response_time, 3)
+                    'avg_response_time': round(avg_response_time, 3),
+                    'streamed': self.streamed_requests,
+                    'avg_time_to_first_token': round(avg_first_token_time, 3),
+                    'p95_time_to_first_token': round(p95_first_token_time, 3)
                 },
                 'errors': {
                     'total': self.error_count,
@@ -158,6 +517,15 @@ class MetricsCollector:
                 },
                 'agent_performance': agent_performance,
                 'intents': dict(self.intent_distribution),
+                'intent_classification': {
+                    'rules': self.intent_classification_sources['rules'],
+                    'classifier': self.intent_classification_sources['classifier'],
+                    'llm_fallback': self.intent_classification_sources['llm_fallback'],
+                    'llm': self.intent_classification_sources['llm'],
+                    'llm_rate': round(llm_classified / max(model_classified, 1) * 100, 2),
+                    'avg_classifier_time_ms': round(avg_classifier_time * 1000, 2),
+                    'p95_classifier_time_ms': round(p95_classifier_time * 1000, 2)
+                },
                 'collections': dict(self.collection_usage),
                 'images': {
                     'total': self.image_requests,
@@ -171,6 +539,87 @@ class MetricsCollector:
                     'detections': self.crisis_detections,
                     'by_type': dict(self.crisis_by_type)
                 },
+                'embedding_cache': {
+                    'hits': cache_hits,
+                    'misses': self.embedding_cache_events['miss'],
+                    'evictions': self.embedding_cache_events['eviction'],
+                    'hit_rate': round(cache_hits / max(cache_lookups, 1) * 100, 2)
+                },
+                'embedding_encode': {
+                    'total': self.embedding_encodes,
+                    'avg_time_ms': round(avg_encode_time * 1000, 2),
+                    'p95_time_ms': round(p95_encode_time * 1000, 2)
+                },
+                'semantic_cache': semantic_cache,
+                'retrieval_cache': {
+                    'l1_hits': self.retrieval_cache_events['l1_hit'],
+                    'l2_hits': self.retrieval_cache_events['l2_hit'],
+                    'misses': self.retrieval_cache_events['miss'],
+                    'hit_rate': round(retrieval_hits / max(retrieval_lookups, 1) * 100, 2)
+                },
+                'llm_cache': llm_cache,
+                'single_flight': single_flight,
+                'circuit_breakers': circuit_breakers,
+                'llm_concurrency': {
+                    'requests': self.llm_slot_requests,
+                    'peak_in_flight': self.llm_peak_in_flight,
+                    'avg_slot_wait_ms': round(avg_slot_wait * 1000, 2),
+                    'p95_slot_wait_ms': round(p95_slot_wait * 1000, 2)
+                },
+                'model_residency': model_residency,
+                'llm_routing': {
+                    'backends': llm_backends,
+                    'hedging': llm_hedging
+                },
+                'speculative_retrieval': {
+                    'started': self.speculative_retrieval_events['started'],
+                    'hits': self.speculative_retrieval_events['hit'],
+                    'discarded': self.speculative_retrieval_events['discarded'],
+                    'hit_rate': round(self.speculative_retrieval_events['hit'] / max(self.speculative_retrieval_events['started'], 1) * 100, 2),
+                    'wasted_retrieval_seconds': round(self.speculative_wasted_seconds, 3)
+                },
+                'embedding_batching': {
+                    'batches': self.embedding_batches,
+                    'avg_batch_size': round(avg_batch_size, 2),
+                    'max_batch_size': max(recent_batch_sizes) if recent_batch_sizes else 0,
+                    'avg_queue_wait_ms': round(avg_queue_wait * 1000, 2),
+                    'p95_queue_wait_ms': round(p95_queue_wait * 1000, 2)
+                },
+                'context_packing': {
+                    intent: {
+                        'requests': totals['requests'],
+                        'avg_tokens_before': round(totals['tokens_before'] / max(totals['requests'], 1), 1),
+                        'avg_tokens_after': round(totals['tokens_after'] / max(totals['requests'], 1), 1),
+                        'tokens_saved': totals['tokens_before'] - totals['tokens_after'],
+                        'duplicates_dropped': totals['duplicates_dropped'],
+                        'chunks_dropped': totals['chunks_dropped']
+                    }
+                    for intent, totals in self.context_packing.items()
+                },
+                'persistent_embedding_cache': {
+                    'hits': self.persistent_embedding_cache_events['hit'],
+                    'misses': self.persistent_embedding_cache_events['miss'],
+                    'evictions': self.persistent_embedding_cache_events['eviction'],
+                    'hit_rate': round(
+                        self.persistent_embedding_cache_events['hit'] / max(
+                            self.persistent_embedding_cache_events['hit'] + self.persistent_embedding_cache_events['miss'], 1
+                        ) * 100, 2
+                    )
+                },
+                'http_pool': http_pool,
+                'startup': {
+                    f'{phase}_seconds': round(duration, 3)
+                    for phase, duration in self.startup_phases.items()
+                },
+                'embedding_server': {
+                    'remote_encodes': self.embedding_server_events['remote'],
+                    'fallback_encodes': self.embedding_server_events['fallback']
+                },
+                'hybrid_retrieval': {
+                    'searches': self.hybrid_searches,
+                    'lexical_match_rate': round(self.hybrid_lexical_matches / max(self.hybrid_searches, 1) * 100, 2),
+                    'lexical_only_chunks': self.hybrid_lexical_only_chunks
+                },
                 'top_users': dict(sorted(self.requests_by_user.items(), key=lambda x: x[1], reverse=True)[:10])
             }
     
@@ -229,16 +678,79 @@ def monitor_request(f):
     return decorated_function
 
 
-def log_agent_usage(agent_name: str, intent: str = None):
-    """Log agent usage after processing."""
+def async_monitor_request(f):
+    """
+    Async equivalent of monitor_request for the ASGI app (asgi_app.py).
+    The start time is kept on request.state for log_agent_usage.
+    """
+    @wraps(f)
+    async def decorated_function(request, *args, **kwargs):
+        if not MONITORING_ENABLED or not metrics:
+            return await f(request, *args, **kwargs)
+        
+        request.state.start_time = time.time()
+        endpoint = f.__name__
+        user_id = (getattr(request.state, 'user', None) or {}).get('user_id')
+        
+        try:
+            response = await f(request, *args, **kwargs)
+            metrics.record_request(endpoint, user_id, time.time() - request.state.start_time)
+            return response
+            
+        except Exception as e:
+            metrics.record_error(
+                error_type=type(e).__name__,
+                error_message=str(e),
+                endpoint=endpoint,
+                user_id=user_id
+            )
+            metrics.record_request(endpoint, user_id, time.time() - request.state.start_time)
+            raise
+    
+    return decorated_function
+
+
+def log_agent_usage(agent_name: str, intent: str = None, start_time: float = None):
+    """
+    Log agent usage after processing. Flask requests are timed from
+    g.start_time; async requests pass their own start time.
+    """
+    if not MONITORING_ENABLED or not metrics:
+        return
+    
+    if start_time is None:
+        start_time = getattr(g, 'start_time', None)
+    if start_time is not None:
+        duration = time.time() - start_time
+        metrics.record_agent_response(agent_name, duration, intent)
+
+
+def log_streamed_request(endpoint: str, user_id: int, start_time: float, first_token_time: float = None,
+                         agent_name: str = None, intent: str = None):
+    """
+    Log a streamed request once its stream has finished, so its latency
+    covers the whole answer and not just the response headers.
+    """
     if not MONITORING_ENABLED or not metrics:
         return
     
-    if hasattr(g, 'start_time'):
-        duration = time.time() - g.start_time
+    duration = time.time() - start_time
+    metrics.record_request(endpoint, user_id, duration)
+    if first_token_time is not None:
+        metrics.record_time_to_first_token(first_token_time - start_time)
+    if agent_name:
         metrics.record_agent_response(agent_name, duration, intent)
 
 
+def log_intent_classification(source: str, start_time: float = None):
+    """
+    Log which stage decided the intent: 'rules', 'classifier', 'llm_fallback'
+    (classifier not confident) or 'llm' (no classifier loaded).
+    """
+    if MONITORING_ENABLED and metrics:
+        metrics.record_intent_classification(source, time.time() - start_time if start_time is not None else None)
+
+
 def log_collection_query(collection_name: str):
     """Log knowledge base collection query."""
     if MONITORING_ENABLED and metrics:
@@ -264,6 +776,133 @@ def log_crisis_detection(crisis_type: str):
         metrics.record_crisis_detection(crisis_type)
 
 
+def log_embedding_cache_event(event: str):
+    """Log query embedding cache hit, miss or eviction."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_embedding_cache_event(event)
+
+
+def log_embedding_encode(start_time: float):
+    """Log query embedding encode time."""
+    if MONITORING_ENABLED and metrics:
+        duration = time.time() - start_time
+        metrics.record_embedding_encode(duration)
+
+
+def log_embedding_batch(batch_size: int, queue_waits: list):
+    """Log a micro-batched embedding encode call."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_embedding_batch(batch_size, queue_waits)
+
+
+def log_semantic_cache_event(intent: str, event: str):
+    """Log semantic answer cache hit or miss."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_semantic_cache_event(intent, event)
+
+
+def log_persistent_embedding_cache_event(event: str, count: int = 1):
+    """Log persistent embedding cache hits, misses or evictions."""
+    if MONITORING_ENABLED and metrics and count:
+        metrics.record_persistent_embedding_cache_event(event, count)
+
+
+def log_http_pool_checkout(host: str, wait: float, idle: int):
+    """Log a pooled HTTP connection checkout."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_http_pool_checkout(host, wait, idle)
+
+
+def log_http_pool_active(host: str, active: int):
+    """Log in-flight outbound requests to a host."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_http_pool_active(host, active)
+
+
+def log_embedding_server_event(event: str):
+    """Log an encode served remotely by the embedding sidecar or by the fallback."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_embedding_server_event(event)
+
+
+def log_startup_phase(phase: str, duration: float):
+    """Log the duration of a startup phase."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_startup_phase(phase, duration)
+
+
+def log_retrieval_cache_event(event: str):
+    """Log retrieval cache L1 hit, L2 hit or miss."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_retrieval_cache_event(event)
+
+
+def log_llm_cache_event(call_site: str, event: str):
+    """Log LLM cache L1 hit, L2 hit or miss for a call site."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_llm_cache_event(call_site, event)
+
+
+def log_single_flight_event(call_site: str, event: str):
+    """Log a single-flight backend call or coalesced call."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_single_flight_event(call_site, event)
+
+
+def log_llm_backend_call(backend: str, duration: float, ok: bool):
+    """Log the latency (or failure) of one LLM backend call."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_llm_backend_call(backend, duration, ok)
+
+
+def log_llm_hedge_event(call_site: str, event: str):
+    """Log an LLM routing event: request, hedged, failover, hedge_win or saturated (hedge pool full)."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_llm_hedge_event(call_site, event)
+
+
+def log_llm_slot_wait(wait: float, in_flight: int):
+    """Log a wait for an OpenAI-compatible backend concurrency slot."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_llm_slot_wait(wait, in_flight)
+
+
+def log_model_load(model: str, load_seconds: float, cold: bool, prewarm: bool = False):
+    """Log a model load time reported by Ollama."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_model_load(model, load_seconds, cold, prewarm)
+
+
+def log_circuit_breaker_transition(name: str, state: str):
+    """Log a circuit breaker state change."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_circuit_breaker_transition(name, state)
+
+
+def log_circuit_breaker_rejection(name: str):
+    """Log a call rejected by an open circuit breaker."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_circuit_breaker_rejection(name)
+
+
+def log_speculative_retrieval(event: str, wasted_seconds: float = None):
+    """Log a speculative retrieval being started, reused or discarded."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_speculative_retrieval(event, wasted_seconds)
+
+
+def log_hybrid_retrieval(lexical_hits: int, lexical_only: int):
+    """Log a hybrid search's BM25 contribution."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_hybrid_retrieval(lexical_hits, lexical_only)
+
+
+def log_context_packing(intent: str, stats: dict):
+    """Log tokens saved by context packing for one request."""
+    if MONITORING_ENABLED and metrics:
+        metrics.record_context_packing(intent, stats)
+
+
 class HealthCheck:
     """System health check."""
     
@@ -305,13 +944,16 @@ class HealthCheck:
         
         # Check Ollama connection
         try:
-            import requests
+            from http_client import http_get
             from __main__ import OLLAMA_API_URL
-            response = requests.get(f"{OLLAMA_API_URL}/api/tags", timeout=2)
+            response = http_get(f"{OLLAMA_API_URL}/api/tags", timeout=2)
             checks['checks']['ollama'] = {
                 'status': 'healthy' if response.status_code == 200 else 'degraded',
                 'message': 'Ollama API accessible'
             }
+            from __main__ import model_residency
+            if model_residency is not None:
+                checks['checks']['ollama']['loaded_models'] = model_residency.loaded_models()
         except:
             checks['checks']['ollama'] = {
                 'status': 'error',
@@ -321,9 +963,9 @@ class HealthCheck:
         
         # Check Node.js server
         try:
-            import requests
+            from http_client import http_get
             from __main__ import NODE_SERVER_URL
-            response = requests.get(f"{NODE_SERVER_URL}/api/health", timeout=2)
+            response = http_get(f"{NODE_SERVER_URL}/api/health", timeout=2)
             checks['checks']['node_server'] = {
                 'status': 'healthy' if response.status_code == 200 else 'degraded',
                 'message': 'Node.js server accessible'
@@ -334,6 +976,22 @@ class HealthCheck:
                 'message': 'Cannot connect to Node.js server'
             }
         
+        # Circuit breakers (an open one means that backend is being skipped)
+        try:
+            from circuit_breaker import breaker_states
+            states = breaker_states()
+            open_breakers = [name for name, state in states.items() if state['state'] != 'closed']
+            checks['checks']['circuit_breakers'] = {
+                'status': 'degraded' if open_breakers else 'healthy',
+                'message': f"Open: {', '.join(open_breakers)}" if open_breakers else 'All circuits closed',
+                'breakers': states
+            }
+        except Exception as e:
+            checks['checks']['circuit_breakers'] = {
+                'status': 'warning',
+                'message': f'Could not read circuit breakers: {e}'
+            }
+        
         # Overall status
         if any(check['status'] == 'error' for check in checks['checks'].values()):
             checks['status'] = 'unhealthy'
@@ -0,0 +1,360 @@
+"""
+NumPy Exact-Search Index for AI Service
+Brute-force cosine search over memory-mapped embedding matrices exported from ChromaDB,
+optionally with a first pass over int8 or binary codes rescored at full precision
+"""
+
+import json
+import mmap
+import os
+import numpy as np
+
+# Configuration
+NUMPY_INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", os.path.join("db", "numpy_index"))
+NUMPY_INDEX_QUANTIZATION = os.getenv("NUMPY_INDEX_QUANTIZATION", "none").lower()  # 'none', 'int8' or 'binary'
+NUMPY_INDEX_PCA_DIM = int(os.getenv("NUMPY_INDEX_PCA_DIM", "0"))  # 0 disables the PCA projection
+NUMPY_RESCORE_FACTOR = int(os.getenv("NUMPY_RESCORE_FACTOR", "10"))  # candidates rescored per result
+
+EMBEDDINGS_FILE = "embeddings.npy"
+LABELS_FILE = "labels.npy"
+DOCSTORE_FILE = "docstore.bin"
+DOCSTORE_OFFSETS_FILE = "docstore_offsets.npy"
+MANIFEST_FILE = "manifest.json"
+PCA_FILE = "pca.npz"
+INT8_CODES_FILE = "codes_int8.npy"
+INT8_SCALE_FILE = "codes_int8_scale.npy"
+BINARY_CODES_FILE = "codes_binary.npy"
+
+SCORE_BLOCK_ROWS = 4096
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def fit_pca(embeddings: np.ndarray, dim: int):
+    """
+    Learn a PCA projection to `dim` components.
+
+    Returns:
+        (mean, components) or None when the data cannot support `dim`.
+    """
+    if dim <= 0 or dim >= embeddings.shape[1] or dim > embeddings.shape[0]:
+        return None
+
+    mean = embeddings.mean(axis=0)
+    _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+    return mean.astype(np.float32), np.ascontiguousarray(vt[:dim], dtype=np.float32)
+
+
+def project(vectors: np.ndarray, pca) -> np.ndarray:
+    """Apply the PCA projection (if any) and re-normalize for cosine scoring."""
+    if pca is None:
+        return vectors
+    mean, components = pca
+    return _normalize_rows((vectors - mean) @ components.T).astype(np.float32)
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple:
+    """Symmetric per-dimension int8 quantization. Returns (codes, scale)."""
+    scale = np.maximum(np.abs(vectors).max(axis=0), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed eight dimensions per byte."""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def _word_view(bits: np.ndarray) -> np.ndarray:
+    """View packed bits as 64-bit words when the row width allows it (fewer XOR/popcount ops)."""
+    if bits.shape[-1] % 8 == 0 and bits.flags.c_contiguous:
+        return bits.view(np.uint64)
+    return bits
+
+
+def _popcount_rows(bits: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return POPCOUNT[bits.view(np.uint8)].sum(axis=1, dtype=np.int32)
+
+
+def write_vector_codes(index_dir: str, embeddings: np.ndarray, pca_dim: int = NUMPY_INDEX_PCA_DIM):
+    """
+    Write the compressed first-pass codes for an index: int8 and binary
+    codes of the (optionally PCA-projected) normalized embeddings.
+    """
+    pca = fit_pca(embeddings, pca_dim) if embeddings.size else None
+    pca_path = os.path.join(index_dir, PCA_FILE)
+    if pca is not None:
+        np.savez(pca_path, mean=pca[0], components=pca[1])
+    elif os.path.exists(pca_path):
+        os.remove(pca_path)
+
+    projected = project(embeddings, pca)
+    codes, scale = quantize_int8(projected) if projected.size else (projected.astype(np.int8), np.ones(0, np.float32))
+    np.save(os.path.join(index_dir, INT8_CODES_FILE), codes)
+    np.save(os.path.join(index_dir, INT8_SCALE_FILE), scale)
+    np.save(os.path.join(index_dir, BINARY_CODES_FILE), binarize(projected))
+
+
+def export_numpy_index(collection, output_dir: str = NUMPY_INDEX_DIR) -> str:
+    """
+    Export a Chroma collection to a NumPy index directory.
+
+    Writes a contiguous, L2-normalized float32 embedding matrix plus an
+    aligned docstore (one JSON record per row, addressed by byte offsets),
+    and the compressed int8/binary codes used for two-stage search.
+
+    Returns:
+        The directory the index was written to.
+    """
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+
+    embeddings = np.ascontiguousarray(np.asarray(data['embeddings'], dtype=np.float32))
+    if embeddings.ndim != 2:
+        embeddings = embeddings.reshape(len(data['ids']), -1)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.maximum(norms, 1e-12)
+
+    # Per-row subset labels so unified indexes can be filtered without
+    # decoding metadata
+    label_names = sorted({(meta or {}).get("collection", "") for meta in data['metadatas']})
+    label_codes = {name: code for code, name in enumerate(label_names)}
+    labels = np.array(
+        [label_codes[(meta or {}).get("collection", "")] for meta in data['metadatas']],
+        dtype=np.int32
+    )
+
+    index_dir = os.path.join(output_dir, collection.name)
+    os.makedirs(index_dir, exist_ok=True)
+
+    offsets = [0]
+    with open(os.path.join(index_dir, DOCSTORE_FILE), "wb") as f:
+        for doc_id, document, metadata in zip(data['ids'], data['documents'], data['metadatas']):
+            record = json.dumps({"id": doc_id, "document": document, "metadata": metadata}).encode("utf-8")
+            f.write(record)
+            offsets.append(offsets[-1] + len(record))
+
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), embeddings)
+    np.save(os.path.join(index_dir, LABELS_FILE), labels)
+    np.save(os.path.join(index_dir, DOCSTORE_OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+    write_vector_codes(index_dir, embeddings)
+
+    with open(os.path.join(index_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "name": collection.name,
+            "count": int(embeddings.shape[0]),
+            "dim": int(embeddings.shape[1]) if embeddings.size else 0,
+            "metadata": collection.metadata or {},
+            "labels": label_names
+        }, f, indent=2)
+
+    return index_dir
+
+
+class NumpyCollection:
+    """
+    Read-only, memory-mapped collection with the same query/get/count
+    interface (and result shapes) as a Chroma collection.
+
+    With `quantization` set to 'int8' or 'binary', queries first score the
+    compressed codes and only rescore the best `rescore_factor * n_results`
+    rows against the full-precision embeddings.
+    """
+
+    def __init__(self, index_dir: str, quantization: str = NUMPY_INDEX_QUANTIZATION,
+                 rescore_factor: int = NUMPY_RESCORE_FACTOR):
+        with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.name = manifest["name"]
+        self.metadata = manifest.get("metadata", {})
+        self.label_names = manifest.get("labels", [])
+        self.label_codes = {name: code for code, name in enumerate(self.label_names)}
+
+        # Memory-mapped read-only, so every forked worker shares the same pages
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode="r")
+        self.labels = np.load(os.path.join(index_dir, LABELS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(index_dir, DOCSTORE_OFFSETS_FILE), mmap_mode="r")
+
+        self._docstore_file = open(os.path.join(index_dir, DOCSTORE_FILE), "rb")
+        if os.fstat(self._docstore_file.fileno()).st_size:
+            self.docstore = mmap.mmap(self._docstore_file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.docstore = b""
+
+        self.id_positions = None
+
+        self.quantization = "none"
+        self.rescore_factor = max(1, rescore_factor)
+        self.pca = None
+        self.codes = None
+        self.code_scale = None
+        if quantization != "none":
+            self._load_codes(index_dir, quantization)
+
+    def _load_codes(self, index_dir: str, quantization: str):
+        codes_file = {"int8": INT8_CODES_FILE, "binary": BINARY_CODES_FILE}.get(quantization)
+        if codes_file is None:
+            raise ValueError(f"Unknown NUMPY_INDEX_QUANTIZATION '{quantization}'. Use 'none', 'int8' or 'binary'.")
+
+        codes_path = os.path.join(index_dir, codes_file)
+        if not os.path.exists(codes_path):
+            print(f"⚠️  No {quantization} codes for '{self.name}', using exact search. Please re-run ingest.py.")
+            return
+
+        self.codes = np.load(codes_path, mmap_mode="r")
+        if quantization == "binary":
+            self.codes = _word_view(self.codes)
+        if quantization == "int8":
+            self.code_scale = np.load(os.path.join(index_dir, INT8_SCALE_FILE))
+        pca_path = os.path.join(index_dir, PCA_FILE)
+        if os.path.exists(pca_path):
+            with np.load(pca_path) as pca:
+                self.pca = (pca["mean"], pca["components"])
+        self.quantization = quantization
+
+    def _coarse_scores(self, query: np.ndarray) -> np.ndarray:
+        """First-pass scores from the compressed codes, block by block."""
+        projected = project(query, self.pca)
+        scores = np.empty(self.codes.shape[0], dtype=np.float32)
+
+        if self.quantization == "int8":
+            scaled_query = projected * self.code_scale
+            for start in range(0, scores.shape[0], SCORE_BLOCK_ROWS):
+                block = self.codes[start:start + SCORE_BLOCK_ROWS]
+                scores[start:start + block.shape[0]] = block.astype(np.float32) @ scaled_query
+        else:
+            query_bits = _word_view(binarize(projected))
+            for start in range(0, scores.shape[0], SCORE_BLOCK_ROWS):
+                block = self.codes[start:start + SCORE_BLOCK_ROWS]
+                scores[start:start + block.shape[0]] = -_popcount_rows(np.bitwise_xor(block, query_bits))
+
+        return scores
+
+    def count(self) -> int:
+        return int(self.embeddings.shape[0])
+
+    def _record(self, position: int) -> dict:
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return json.loads(self.docstore[start:end].decode("utf-8"))
+
+    def _where_mask(self, where: dict):
+        """Translate a `collection` metadata filter into a row mask."""
+        if not where:
+            return None
+
+        unsupported = set(where) - {"collection"}
+        if unsupported:
+            raise ValueError(f"NumpyCollection only supports filtering on 'collection', got {sorted(unsupported)}")
+
+        condition = where["collection"]
+        wanted = condition["$in"] if isinstance(condition, dict) else [condition]
+        codes = [self.label_codes[name] for name in wanted if name in self.label_codes]
+
+        return np.isin(self.labels, codes)
+
+    def _build_result(self, positions, include: list, distances=None) -> dict:
+        records = [self._record(int(p)) for p in positions]
+
+        result = {"ids": [r["id"] for r in records]}
+        if "documents" in include:
+            result["documents"] = [r["document"] for r in records]
+        if "metadatas" in include:
+            result["metadatas"] = [r["metadata"] for r in records]
+        if "embeddings" in include:
+            result["embeddings"] = [self.embeddings[int(p)].tolist() for p in positions]
+        if "distances" in include and distances is not None:
+            result["distances"] = [float(d) for d in distances]
+        return result
+
+    def query(self, query_embeddings: list, n_results: int = 10, where: dict = None,
+              include: list = ("documents", "metadatas", "distances")) -> dict:
+        """
+        Top-k cosine search: one matrix-vector product per query, then
+        argpartition to pick the k best rows. With compressed codes the
+        product runs over the codes and only the shortlisted rows are
+        rescored with full-precision vectors.
+        """
+        queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        mask = self._where_mask(where)
+
+        batched = {key: [] for key in ("ids", *include)}
+        for query in queries:
+            scores = self.embeddings @ query if self.codes is None else self._coarse_scores(query)
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+                candidates = int(mask.sum())
+            else:
+                candidates = scores.shape[0]
+
+            if self.codes is None:
+                top = _top_k(scores, min(n_results, candidates))
+                top_scores = scores[top]
+            else:
+                # Rescore the shortlist in row order for sequential mmap reads
+                shortlist = np.sort(_top_k(scores, min(n_results * self.rescore_factor, candidates)))
+                exact = self.embeddings[shortlist] @ query
+                best = _top_k(exact, min(n_results, shortlist.shape[0]))
+                top, top_scores = shortlist[best], exact[best]
+
+            result = self._build_result(top, include, distances=1.0 - top_scores)
+            for key in batched:
+                batched[key].append(result.get(key, []))
+
+        return batched
+
+    def get(self, ids: list = None, where: dict = None,
+            include: list = ("documents", "metadatas")) -> dict:
+        """Fetch records by id and/or `collection` filter, like Chroma's get()."""
+        if ids is not None:
+            if self.id_positions is None:
+                self.id_positions = {
+                    self._record(position)["id"]: position for position in range(self.count())
+                }
+            positions = np.array([self.id_positions[i] for i in ids if i in self.id_positions], dtype=np.int64)
+        else:
+            positions = np.arange(self.count())
+
+        mask = self._where_mask(where)
+        if mask is not None:
+            positions = positions[mask[positions]]
+
+        return self._build_result(positions, include)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+    return np.argsort(-scores)[:k]
+
+
+def load_numpy_collections(index_root: str = NUMPY_INDEX_DIR) -> list:
+    """Load every exported index under the index root."""
+    if not os.path.isdir(index_root):
+        raise ValueError(f"NumPy index directory '{index_root}' not found. Please run ingest.py first.")
+
+    return [
+        NumpyCollection(os.path.join(index_root, entry))
+        for entry in sorted(os.listdir(index_root))
+        if os.path.isfile(os.path.join(index_root, entry, MANIFEST_FILE))
+    ]
+
+
+if __name__ == "__main__":
+    # Re-export every collection from an existing Chroma database
+    import chromadb
+
+    db_client = chromadb.PersistentClient(path="db")
+    for collection in db_client.list_collections():
+        print(f"Exporting '{collection.name}' ({collection.count()} entries)...")
+        print(f"  -> Written to '{export_numpy_index(collection)}'")
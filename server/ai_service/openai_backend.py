@@ -0,0 +1,174 @@
+"""
+OpenAI Backend Module for AI Service
+Client for any OpenAI-compatible chat completions server (Ollama's /v1, vLLM,
+llama.cpp server) that caps in-flight requests at the server's batch size and
+applies per-agent model and max-token settings
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from http_client import http_post, async_http_post, async_http_stream, LLM_TIMEOUT
+from monitoring import log_llm_slot_wait
+
+# Configuration
+LLM_API_BASE_URL = os.getenv("LLM_API_BASE_URL", "http://localhost:11434/v1")  # Ollama by default
+LLM_API_KEY = os.getenv("LLM_API_KEY", None)
+LLM_MODEL = os.getenv("LLM_MODEL", "qwen3:0.6b")
+# Keep this near the server's batch size (vLLM --max-num-seqs, llama.cpp --parallel)
+# and at most HTTP_POOL_MAXSIZE so every in-flight request reuses a pooled connection
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "8"))
+LLM_AGENT_MODELS = os.getenv("LLM_AGENT_MODELS", "")  # e.g. "intent=qwen3:0.6b,health_inquiry=qwen3:1.7b"
+LLM_AGENT_MAX_TOKENS = os.getenv("LLM_AGENT_MAX_TOKENS", "")  # e.g. "intent=128,specialization=16"
+
+
+def parse_agent_settings(value: str) -> dict:
+    """Parse 'agent=value,agent=value' (values may contain ':' or '/')."""
+    settings = {}
+    for item in value.split(","):
+        agent, _, setting = item.partition("=")
+        if agent.strip() and setting.strip():
+            settings[agent.strip()] = setting.strip()
+    return settings
+
+
+class OpenAICompatibleBackend:
+    """
+    Chat completions against `base_url`. Each call passes the agent (or call
+    site) it is made for, which selects the model and max_tokens. At most
+    `max_concurrency` requests are in flight per worker; the rest wait for a
+    slot so the server batches a steady stream of sequences instead of
+    queueing an unbounded burst.
+    """
+
+    def __init__(self, base_url: str, model: str, api_key: str = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENT_REQUESTS,
+                 agent_models: dict = None, agent_max_tokens: dict = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.agent_models = agent_models or {}
+        self.agent_max_tokens = {agent: int(tokens) for agent, tokens in (agent_max_tokens or {}).items()}
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.async_slots = None  # created inside the event loop on first use
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+
+    def model_for(self, agent: str = None) -> str:
+        return self.agent_models.get(agent, self.model)
+
+    def _request(self, messages: list, temperature: float, agent: str = None, stream: bool = False) -> dict:
+        payload = {
+            "model": self.model_for(agent),
+            "messages": messages,
+            "temperature": temperature
+        }
+        if agent in self.agent_max_tokens:
+            payload["max_tokens"] = self.agent_max_tokens[agent]
+        if stream:
+            payload["stream"] = True
+        return {
+            "json": payload,
+            "headers": {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+            "timeout": LLM_TIMEOUT
+        }
+
+    def _acquired(self, wait_start: float):
+        with self.in_flight_lock:
+            self.in_flight += 1
+            log_llm_slot_wait(time.time() - wait_start, self.in_flight)
+
+    def _released(self):
+        with self.in_flight_lock:
+            self.in_flight -= 1
+
+    @contextmanager
+    def _slot(self):
+        wait_start = time.time()
+        with self.slots:
+            self._acquired(wait_start)
+            try:
+                yield
+            finally:
+                self._released()
+
+    @asynccontextmanager
+    async def _async_slot(self):
+        if self.async_slots is None:
+            self.async_slots = asyncio.Semaphore(self.max_concurrency)
+        wait_start = time.time()
+        async with self.async_slots:
+            self._acquired(wait_start)
+            try:
+                yield
+            finally:
+                self._released()
+
+    @staticmethod
+    def _stream_delta(line: str):
+        """Content of one server-sent event line, '' for other lines, None at [DONE]."""
+        line = line.strip()
+        if not line.startswith("data:"):
+            return ""
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return None
+        return json.loads(payload)['choices'][0].get('delta', {}).get('content') or ""
+
+    def chat(self, messages: list, temperature: float, agent: str = None) -> str:
+        with self._slot():
+            response = http_post(f"{self.base_url}/chat/completions",
+                                 **self._request(messages, temperature, agent))
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+
+    def stream_chat(self, messages: list, temperature: float, agent: str = None):
+        """Yield the reply in pieces as it is generated."""
+        with self._slot():
+            response = http_post(f"{self.base_url}/chat/completions",
+                                 stream=True, **self._request(messages, temperature, agent, stream=True))
+            with response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    delta = self._stream_delta(line.decode("utf-8"))
+                    if delta is None:
+                        break
+                    if delta:
+                        yield delta
+
+    async def achat(self, messages: list, temperature: float, agent: str = None) -> str:
+        async with self._async_slot():
+            response = await async_http_post(f"{self.base_url}/chat/completions",
+                                             **self._request(messages, temperature, agent))
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+
+    async def astream_chat(self, messages: list, temperature: float, agent: str = None):
+        async with self._async_slot():
+            async with async_http_stream("POST", f"{self.base_url}/chat/completions",
+                                         **self._request(messages, temperature, agent, stream=True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    delta = self._stream_delta(line)
+                    if delta is None:
+                        break
+                    if delta:
+                        yield delta
+
+
+def create_openai_backend() -> OpenAICompatibleBackend:
+    """Create the backend from the LLM_* configuration."""
+    backend = OpenAICompatibleBackend(
+        LLM_API_BASE_URL,
+        LLM_MODEL,
+        api_key=LLM_API_KEY,
+        agent_models=parse_agent_settings(LLM_AGENT_MODELS),
+        agent_max_tokens=parse_agent_settings(LLM_AGENT_MAX_TOKENS)
+    )
+    print(f"✅ OpenAI-compatible backend: {backend.base_url} ({backend.model}, "
+          f"{backend.max_concurrency} concurrent requests)")
+    return backend
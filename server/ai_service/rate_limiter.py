@@ -184,6 +184,35 @@ else:
     print("✅ Using in-memory rate limiter")
 
 
+def _limit_exceeded_body(info: dict) -> dict:
+    return {
+        "error": "Rate Limit Exceeded",
+        "message": f"Too many requests. Limit: {info['limit']} per {info['window']}",
+        "retry_after": info['retry_after'],
+        "limit": info['limit'],
+        "window": info['window']
+    }
+
+
+def _limit_exceeded_headers(info: dict) -> dict:
+    return {
+        'Retry-After': str(info['retry_after']),
+        'X-RateLimit-Limit': str(info['limit']),
+        'X-RateLimit-Window': info['window']
+    }
+
+
+def _remaining_headers(info: dict) -> dict:
+    headers = {}
+    if 'remaining_minute' in info:
+        headers['X-RateLimit-Remaining-Minute'] = str(info['remaining_minute'])
+    if 'remaining_hour' in info:
+        headers['X-RateLimit-Remaining-Hour'] = str(info['remaining_hour'])
+    if 'remaining_day' in info:
+        headers['X-RateLimit-Remaining-Day'] = str(info['remaining_day'])
+    return headers
+
+
 def rate_limit(f):
     """
     Decorator to apply rate limiting to endpoints.
@@ -208,17 +237,9 @@ def rate_limit(f):
         allowed, info = rate_limiter.is_allowed(user_id, role)
         
         if not allowed:
-            response = jsonify({
-                "error": "Rate Limit Exceeded",
-                "message": f"Too many requests. Limit: {info['limit']} per {info['window']}",
-                "retry_after": info['retry_after'],
-                "limit": info['limit'],
-                "window": info['window']
-            })
+            response = jsonify(_limit_exceeded_body(info))
             response.status_code = 429
-            response.headers['Retry-After'] = str(info['retry_after'])
-            response.headers['X-RateLimit-Limit'] = str(info['limit'])
-            response.headers['X-RateLimit-Window'] = info['window']
+            response.headers.update(_limit_exceeded_headers(info))
             
             print(f"⚠️  Rate limit exceeded for user {user_id} ({role}): {info['limit']}/{info['window']}")
             
@@ -233,13 +254,45 @@ def rate_limit(f):
             response_obj = response
         
         if hasattr(response_obj, 'headers'):
-            if 'remaining_minute' in info:
-                response_obj.headers['X-RateLimit-Remaining-Minute'] = str(info['remaining_minute'])
-            if 'remaining_hour' in info:
-                response_obj.headers['X-RateLimit-Remaining-Hour'] = str(info['remaining_hour'])
-            if 'remaining_day' in info:
-                response_obj.headers['X-RateLimit-Remaining-Day'] = str(info['remaining_day'])
+            response_obj.headers.update(_remaining_headers(info))
+        
+        return response
+    
+    return decorated_function
+
+
+def async_rate_limit(f):
+    """
+    Async equivalent of rate_limit for the ASGI app (asgi_app.py).
+    Requires async_verify_user_token to be applied first.
+    """
+    from starlette.concurrency import run_in_threadpool
+    from starlette.responses import JSONResponse
+
+    @wraps(f)
+    async def decorated_function(request, *args, **kwargs):
+        if not RATE_LIMIT_ENABLED:
+            return await f(request, *args, **kwargs)
+        
+        user = getattr(request.state, 'user', None)
+        if user is None:
+            return JSONResponse({
+                "error": "Unauthorized",
+                "message": "Authentication required for rate limiting"
+            }, status_code=401)
+        
+        user_id = user.get('user_id')
+        role = user.get('role', 'Patient')
+        
+        # Redis round trips must not block the event loop
+        allowed, info = await run_in_threadpool(rate_limiter.is_allowed, user_id, role)
+        
+        if not allowed:
+            print(f"⚠️  Rate limit exceeded for user {user_id} ({role}): {info['limit']}/{info['window']}")
+            return JSONResponse(_limit_exceeded_body(info), status_code=429, headers=_limit_exceeded_headers(info))
         
+        response = await f(request, *args, **kwargs)
+        response.headers.update(_remaining_headers(info))
         return response
     
     return decorated_function
@@ -0,0 +1,151 @@
+"""
+Retrieval Cache Module for AI Service
+Caches retrieval results per (query, collections, n_results, token budget), stamped with the
+index version written by ingest.py and the embedding model, with an in-process L1 and
+optional Redis L2
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+import redis
+from embedding_cache import normalize_query
+
+# Configuration
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "false").lower() == "true"
+RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "512"))
+RETRIEVAL_CACHE_REDIS_ENABLED = os.getenv("RETRIEVAL_CACHE_REDIS_ENABLED", "false").lower() == "true"
+REDIS_URL = os.getenv("REDIS_URL", None)
+INDEX_VERSION_FILE = os.path.join("db", "index_version")
+
+
+def write_index_version(path: str = INDEX_VERSION_FILE) -> str:
+    """Stamp a freshly built index with a new version (called by ingest.py)."""
+    version = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+
+class IndexVersion:
+    """Reads the index version stamp, re-reading only when the file changes."""
+
+    def __init__(self, path: str = INDEX_VERSION_FILE):
+        self.path = path
+        self.mtime = None
+        self.version = "unversioned"
+        self.lock = Lock()
+
+    def current(self) -> str:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self.version
+
+        with self.lock:
+            if mtime != self.mtime:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.version = f.read().strip() or "unversioned"
+                self.mtime = mtime
+            return self.version
+
+
+class RetrievalCache:
+    """
+    Two-tier retrieval result cache keyed on the index version and the
+    embedding model, since a different model (or backend producing
+    different vectors) retrieves different results for the same query.
+    """
+
+    def __init__(self, ttl_seconds: int = RETRIEVAL_CACHE_TTL_SECONDS,
+                 max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES,
+                 redis_url: str = None, variant: str = "", model_id: str = "",
+                 index_version_path: str = INDEX_VERSION_FILE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.variant = variant
+        self.model_id = model_id
+        self.index_version = IndexVersion(index_version_path)
+        self.entries = OrderedDict()  # key -> (expires_at, retrieval)
+        self.lock = Lock()
+        self.redis_client = redis.from_url(redis_url, decode_responses=True) if redis_url else None
+
+    def _key(self, user_query: str, collection_names: list, n_results: int, token_budget: int = None) -> str:
+        payload = json.dumps([
+            self.model_id, self.variant, normalize_query(user_query), list(collection_names), n_results, token_budget
+        ])
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"retrieval_cache:{self.index_version.current()}:{digest}"
+
+    def get(self, user_query: str, collection_names: list, n_results: int, token_budget: int = None) -> tuple:
+        """
+        Look up a cached retrieval.
+
+        Returns:
+            (retrieval: dict or None, tier: 'l1', 'l2' or None)
+        """
+        key = self._key(user_query, collection_names, n_results, token_budget)
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    return copy.deepcopy(entry[1]), 'l1'
+                del self.entries[key]
+
+        if self.redis_client is not None:
+            try:
+                raw = self.redis_client.get(key)
+            except Exception as e:
+                print(f"  ⚠️  Retrieval cache L2 read failed: {e}")
+                raw = None
+
+            if raw:
+                # Promote into L1 so later hits skip the network round trip
+                self._store_local(key, json.loads(raw))
+                return json.loads(raw), 'l2'
+
+        return None, None
+
+    def set(self, user_query: str, collection_names: list, n_results: int, retrieval: dict,
+            token_budget: int = None):
+        """Cache a retrieval result in both tiers."""
+        key = self._key(user_query, collection_names, n_results, token_budget)
+        self._store_local(key, copy.deepcopy(retrieval))
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, json.dumps(retrieval), ex=self.ttl_seconds)
+            except Exception as e:
+                print(f"  ⚠️  Retrieval cache L2 write failed: {e}")
+
+    def _store_local(self, key: str, retrieval: dict):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl_seconds, retrieval)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def create_retrieval_cache(variant: str = "", model_id: str = ""):
+    """Create the configured retrieval cache, or None when disabled."""
+    if not RETRIEVAL_CACHE_ENABLED:
+        return None
+
+    redis_url = REDIS_URL if RETRIEVAL_CACHE_REDIS_ENABLED else None
+    try:
+        cache = RetrievalCache(redis_url=redis_url, variant=variant, model_id=model_id)
+        print(f"✅ Retrieval cache enabled ({'L1 + Redis L2' if redis_url else 'L1 only'})")
+    except Exception as e:
+        print(f"⚠️  Redis connection failed, using L1-only retrieval cache: {e}")
+        cache = RetrievalCache(variant=variant, model_id=model_id)
+    return cache
@@ -0,0 +1,180 @@
+"""
+Semantic Answer Cache Module for AI Service
+Serves cached answers for paraphrased queries using embedding similarity,
+with in-memory storage or Redis backend (optional)
+"""
+
+import copy
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+import redis
+
+# Configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_BACKEND = os.getenv("SEMANTIC_CACHE_BACKEND", "memory").lower()  # 'memory' or 'redis'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+REDIS_URL = os.getenv("REDIS_URL", None)
+
+# Crisis/mental-wellness and image flows are never served from cache
+SEMANTIC_CACHE_EXCLUDED_INTENTS = {
+    intent.strip()
+    for intent in os.getenv(
+        "SEMANTIC_CACHE_EXCLUDED_INTENTS",
+        "mental_wellness,mental_wellness_distress,health_inquiry_with_image"
+    ).split(",")
+    if intent.strip()
+}
+
+
+def is_cacheable_intent(intent: str) -> bool:
+    """Check whether answers for an intent may be cached."""
+    return intent not in SEMANTIC_CACHE_EXCLUDED_INTENTS
+
+
+def cache_scope(intent: str, collection_names: list) -> str:
+    """Entries only match queries with the same intent and collection set."""
+    return f"{intent}:{','.join(sorted(collection_names))}"
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class InMemorySemanticCache:
+    """In-process semantic cache with TTL and LRU eviction."""
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()  # entry_id -> (scope, embedding, response, created)
+        self.lock = Lock()
+
+    def lookup(self, intent: str, collection_names: list, embedding) -> tuple:
+        """
+        Find the most similar cached query in the same scope.
+
+        Returns:
+            (response: dict or None, similarity: float)
+        """
+        scope = cache_scope(intent, collection_names)
+        query = _normalize(embedding)
+        now = time.time()
+
+        with self.lock:
+            expired = [key for key, entry in self.entries.items() if now - entry[3] > self.ttl_seconds]
+            for key in expired:
+                del self.entries[key]
+
+            candidates = [(key, entry) for key, entry in self.entries.items() if entry[0] == scope]
+            if not candidates:
+                return None, 0.0
+
+            similarities = np.stack([entry[1] for _, entry in candidates]) @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None, similarity
+
+            key, entry = candidates[best]
+            self.entries.move_to_end(key)
+            return copy.deepcopy(entry[2]), similarity
+
+    def store(self, intent: str, collection_names: list, embedding, response: dict):
+        """Cache a response for the query embedding."""
+        with self.lock:
+            self.entries[uuid.uuid4().hex] = (
+                cache_scope(intent, collection_names),
+                _normalize(embedding),
+                copy.deepcopy(response),
+                time.time()
+            )
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class RedisSemanticCache:
+    """Redis-backed semantic cache shared across workers and nodes."""
+
+    def __init__(self, redis_url: str, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+    def _key(self, scope: str) -> str:
+        return f"semantic_cache:{scope}"
+
+    def lookup(self, intent: str, collection_names: list, embedding) -> tuple:
+        """
+        Find the most similar cached query in the same scope.
+
+        Returns:
+            (response: dict or None, similarity: float)
+        """
+        key = self._key(cache_scope(intent, collection_names))
+        query = _normalize(embedding)
+        now = time.time()
+
+        entries = [json.loads(raw) for raw in self.redis_client.hvals(key)]
+        entries = [entry for entry in entries if now - entry['created'] <= self.ttl_seconds]
+        if not entries:
+            return None, 0.0
+
+        similarities = np.array([entry['embedding'] for entry in entries], dtype=np.float32) @ query
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            return None, similarity
+
+        return entries[best]['response'], similarity
+
+    def store(self, intent: str, collection_names: list, embedding, response: dict):
+        """Cache a response for the query embedding."""
+        key = self._key(cache_scope(intent, collection_names))
+        now = time.time()
+        entry = {
+            'embedding': _normalize(embedding).tolist(),
+            'response': response,
+            'created': now
+        }
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(key, uuid.uuid4().hex, json.dumps(entry))
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+        # Trim the scope to the newest entries
+        if self.redis_client.hlen(key) > self.max_entries:
+            entries = {field: json.loads(raw) for field, raw in self.redis_client.hgetall(key).items()}
+            oldest = sorted(entries, key=lambda field: entries[field]['created'])
+            stale = oldest[:len(oldest) - self.max_entries]
+            if stale:
+                self.redis_client.hdel(key, *stale)
+
+
+# Initialize semantic cache
+semantic_answer_cache = None
+if SEMANTIC_CACHE_ENABLED:
+    if SEMANTIC_CACHE_BACKEND == "redis" and REDIS_URL:
+        try:
+            semantic_answer_cache = RedisSemanticCache(REDIS_URL)
+            print("✅ Using Redis-based semantic answer cache")
+        except Exception as e:
+            print(f"⚠️  Redis connection failed, using in-memory semantic cache: {e}")
+            semantic_answer_cache = InMemorySemanticCache()
+    else:
+        semantic_answer_cache = InMemorySemanticCache()
+        print("✅ Using in-memory semantic answer cache")
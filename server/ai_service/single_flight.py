@@ -0,0 +1,235 @@
+"""
+Single Flight Module for AI Service
+Coalesces concurrent identical LLM calls so one backend call is made and its
+result shared: across threads (or event loop tasks) in a worker, and optionally
+across workers through a Redis lock and short-lived result key
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import redis
+from monitoring import log_single_flight_event
+
+# Configuration
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "false").lower() == "true"
+SINGLE_FLIGHT_REDIS_ENABLED = os.getenv("SINGLE_FLIGHT_REDIS_ENABLED", "false").lower() == "true"
+SINGLE_FLIGHT_LOCK_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", "120"))  # >= the LLM read timeout
+SINGLE_FLIGHT_RESULT_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_RESULT_TTL_SECONDS", "5"))
+SINGLE_FLIGHT_POLL_SECONDS = 0.05
+REDIS_URL = os.getenv("REDIS_URL", None)
+
+
+def flight_key(*parts) -> str:
+    """Key for a call from everything that determines its output."""
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncFlight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    `do(call_site, key, fn)` runs fn once per key at a time; callers that
+    arrive while it is running wait for and share its result. Failures are
+    shared with local waiters but never published to other workers, which
+    then make their own call.
+
+    Async calls run as a task no caller owns, so a cancelled caller (e.g. a
+    disconnected client) only stops waiting; the call is cancelled once
+    nobody is waiting for it.
+    """
+
+    def __init__(self, redis_url: str = None,
+                 lock_ttl_seconds: int = SINGLE_FLIGHT_LOCK_TTL_SECONDS,
+                 result_ttl_seconds: int = SINGLE_FLIGHT_RESULT_TTL_SECONDS):
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.flights = {}  # key -> _Flight
+        self.async_flights = {}  # key -> _AsyncFlight, per event loop thread
+        self.lock = threading.Lock()
+        self.redis_client = redis.from_url(redis_url, decode_responses=True) if redis_url else None
+
+    # --- Cross-worker coordination ---
+    def _acquire(self, key: str):
+        """Returns a lock token if this worker should make the call, else None."""
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client.set(f"single_flight:lock:{key}", token, nx=True, ex=self.lock_ttl_seconds):
+                return token
+            return None
+        except Exception as e:
+            print(f"  ⚠️  Single-flight lock failed: {e}")
+            return token
+
+    def _poll(self, key: str):
+        """
+        Poll for another worker's result. Returns (found, result); not found
+        when its lock was released or expired without a result.
+        """
+        try:
+            raw = self.redis_client.get(f"single_flight:result:{key}")
+            if raw is not None:
+                return True, json.loads(raw)
+            if not self.redis_client.exists(f"single_flight:lock:{key}"):
+                return False, None
+        except Exception as e:
+            print(f"  ⚠️  Single-flight poll failed: {e}")
+            return False, None
+        return None, None
+
+    def _publish(self, key: str, result):
+        try:
+            self.redis_client.set(f"single_flight:result:{key}", json.dumps(result), ex=self.result_ttl_seconds)
+        except Exception as e:
+            print(f"  ⚠️  Single-flight publish failed: {e}")
+
+    def _release(self, key: str, token: str):
+        try:
+            lock_key = f"single_flight:lock:{key}"
+            if self.redis_client.get(lock_key) == token:
+                self.redis_client.delete(lock_key)
+        except Exception as e:
+            print(f"  ⚠️  Single-flight release failed: {e}")
+
+    def _wait_remote(self, key: str):
+        deadline = time.time() + self.lock_ttl_seconds
+        while time.time() < deadline:
+            found, result = self._poll(key)
+            if found is not None:
+                return found, result
+            time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+        return False, None
+
+    def _call(self, call_site: str, key: str, fn):
+        if self.redis_client is None:
+            log_single_flight_event(call_site, 'call')
+            return fn()
+
+        token = self._acquire(key)
+        if token is None:
+            found, result = self._wait_remote(key)
+            if found:
+                log_single_flight_event(call_site, 'coalesced_remote')
+                return result
+            token = self._acquire(key) or uuid.uuid4().hex
+
+        try:
+            log_single_flight_event(call_site, 'call')
+            result = fn()
+            self._publish(key, result)
+            return result
+        finally:
+            self._release(key, token)
+
+    # --- Sync callers (threads) ---
+    def do(self, call_site: str, key: str, fn):
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            log_single_flight_event(call_site, 'coalesced')
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call(call_site, key, fn)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    # --- Async callers (ASGI event loop) ---
+    async def do_async(self, call_site: str, key: str, coro_fn):
+        # Only touched from the event loop thread, so no lock is needed
+        flight = self.async_flights.get(key)
+        if flight is None:
+            flight = self.async_flights[key] = _AsyncFlight(
+                asyncio.ensure_future(self._call_async(call_site, key, coro_fn))
+            )
+            flight.task.add_done_callback(lambda _: self._forget_async(key, flight))
+        else:
+            log_single_flight_event(call_site, 'coalesced')
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Callers arriving from now on start a fresh call
+                self._forget_async(key, flight)
+                flight.task.cancel()
+
+    def _forget_async(self, key: str, flight: _AsyncFlight):
+        if self.async_flights.get(key) is flight:
+            del self.async_flights[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Mark retrieved so a failure nobody awaited is not logged by asyncio
+            flight.task.exception()
+
+    async def _call_async(self, call_site: str, key: str, coro_fn):
+        if self.redis_client is None:
+            log_single_flight_event(call_site, 'call')
+            return await coro_fn()
+
+        loop = asyncio.get_running_loop()
+        token = await loop.run_in_executor(None, self._acquire, key)
+        if token is None:
+            deadline = time.time() + self.lock_ttl_seconds
+            found = False
+            while time.time() < deadline:
+                found, result = await loop.run_in_executor(None, self._poll, key)
+                if found is not None:
+                    break
+                await asyncio.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+            if found:
+                log_single_flight_event(call_site, 'coalesced_remote')
+                return result
+            token = await loop.run_in_executor(None, self._acquire, key) or uuid.uuid4().hex
+
+        try:
+            log_single_flight_event(call_site, 'call')
+            result = await coro_fn()
+            await loop.run_in_executor(None, self._publish, key, result)
+            return result
+        finally:
+            await loop.run_in_executor(None, self._release, key, token)
+
+
+def create_single_flight():
+    """Create the configured single-flight group, or None when disabled."""
+    if not SINGLE_FLIGHT_ENABLED:
+        return None
+
+    redis_url = REDIS_URL if SINGLE_FLIGHT_REDIS_ENABLED else None
+    try:
+        group = SingleFlight(redis_url=redis_url)
+        print(f"✅ Single-flight coalescing enabled ({'across workers via Redis' if redis_url else 'per worker'})")
+    except Exception as e:
+        print(f"⚠️  Redis connection failed, coalescing per worker only: {e}")
+        group = SingleFlight()
+    return group
@@ -47,9 +47,40 @@ if [ ! -d "knowledge_base" ]; then
     echo "⚠️  Warning: knowledge_base directory not found."
 fi
 
+# Optionally start the shared embedding server so workers don't each load the model
+if [ "${EMBEDDING_SERVER_ENABLED:-false}" = "true" ]; then
+    EMBEDDING_SERVER_SOCKET=${EMBEDDING_SERVER_SOCKET:-/tmp/clinico-embedding.sock}
+    echo "🧮 Starting embedding server on $EMBEDDING_SERVER_SOCKET..."
+    python embedding_server.py &
+
+    for _ in $(seq 1 120); do
+        [ -S "$EMBEDDING_SERVER_SOCKET" ] && break
+        sleep 1
+    done
+
+    if [ -S "$EMBEDDING_SERVER_SOCKET" ]; then
+        echo "✅ Embedding server is ready."
+    else
+        echo "⚠️  Warning: embedding server did not start; workers will load the model in-process."
+    fi
+fi
+
+# Async mode: uvicorn workers serving asgi_app (orchestration endpoints are async,
+# everything else is the Flask app mounted underneath)
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    echo "🏃 Starting Uvicorn server (ASGI mode)..."
+    exec uvicorn asgi_app:app \
+        --host 0.0.0.0 \
+        --port "$PORT" \
+        --workers 3 \
+        --timeout-keep-alive 5 \
+        --log-level info
+fi
+
 # Start the Flask application using Gunicorn
 echo "🏃 Starting Gunicorn server..."
 exec gunicorn \
+    --config gunicorn.conf.py \
     --bind "0.0.0.0:$PORT" \
     --workers 3 \
     --worker-class sync \